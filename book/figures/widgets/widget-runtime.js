@@ -0,0 +1,165 @@
+/* Shared widget runtime (generated by scripts/widget_runtime.py) */
+var Widget = (function() {
+  var kB = 1.380649e-23;
+  var tau0 = 1e-09;
+  var FONT = 'Source Serif 4, Georgia, serif';
+  var C = {text:'#1e293b', grid:'#e8e6e1', ax:'#334155', border:'#d6d3cd'};
+
+  /* --- Neel relaxation --- */
+
+  /* Grain volume (zm³) with relaxation time tau (s) at T_K (K) for an
+     anisotropy energy density K_J (J/m³) */
+  function calcV(tau, T_K, K_J) {
+    return (kB * T_K * Math.log(tau / tau0)) / Math.max(K_J, 1e-5) * 1e21;
+  }
+
+  /* calcV over an array of K_J, clipped to [0, vMax] for plotting */
+  function vCurve(tau, T_K, K_J, vMax) {
+    var out = new Array(K_J.length);
+    for (var i = 0; i < K_J.length; i++)
+      out[i] = Math.min(Math.max(calcV(tau, T_K, K_J[i]), 0), vMax);
+    return out;
+  }
+
+  /* Magnetite Ms(T_K) relative to room temperature; 0 above Tc */
+  function msRatio(T_K) {
+    if (T_K >= 853.15) return 0;
+    return Math.pow((853.15 - T_K) / (853.15 - 293.15), 0.38);
+  }
+
+  /* Linear interpolation; x_arr must be sorted ascending */
+  function interp(x_new, x_arr, y_arr) {
+    var n = x_new.length, nArr = x_arr.length;
+    var result = new Array(n);
+    for (var i = 0; i < n; i++) {
+      var xn = x_new[i];
+      if (xn <= x_arr[0])        { result[i] = y_arr[0]; continue; }
+      if (xn >= x_arr[nArr - 1]) { result[i] = y_arr[nArr - 1]; continue; }
+      var lo = 0, hi = nArr - 1;
+      while (hi - lo > 1) {
+        var mid = (lo + hi) >> 1;
+        if (x_arr[mid] <= xn) lo = mid; else hi = mid;
+      }
+      var frac = (xn - x_arr[lo]) / (x_arr[hi] - x_arr[lo]);
+      result[i] = y_arr[lo] + frac * (y_arr[hi] - y_arr[lo]);
+    }
+    return result;
+  }
+
+  /* --- Plot styling --- */
+
+  function axis(title, extra) {
+    var a = {
+      showgrid:true, gridcolor:C.grid, gridwidth:1,
+      zeroline:false, linecolor:C.ax, linewidth:1.5, mirror:true,
+      ticks:'inside', ticklen:5,
+      tickfont:{family:FONT, size:11},
+    };
+    if (title) a.title = {text:title, font:{size:13}};
+    return Object.assign(a, extra);
+  }
+
+  function legend(extra) {
+    return Object.assign({
+      bgcolor:'rgba(255,255,255,0.92)',
+      bordercolor:C.border, borderwidth:1,
+      font:{size:11},
+      x:0.98, y:0.98, xanchor:'right', yanchor:'top',
+      borderpad:6,
+    }, extra);
+  }
+
+  function layout(extra) {
+    return Object.assign({
+      width:600, height:390,
+      margin:{l:68, r:24, t:10, b:50},
+      paper_bgcolor:'transparent',
+      plot_bgcolor:'#fff',
+      font:{family:FONT, size:12, color:C.text},
+      legend:legend(),
+      hovermode:'closest',
+    }, extra);
+  }
+
+  /* Text label on a white background */
+  function note(x, y, text, color, size) {
+    return {x:x, y:y, text:text, showarrow:false,
+            font:{size:size || 12, color:color, family:FONT},
+            bgcolor:'rgba(255,255,255,0.85)', borderpad:2};
+  }
+
+  function plot(id, traces, lay) {
+    return Plotly.newPlot(id, traces, lay, {displayModeBar:false, responsive:true});
+  }
+
+  /* --- Slider with Play/Pause and Reset ---
+     opts.slider, opts.play, opts.reset: element ids
+     opts.show(idx):   draw frame idx (the player sets the slider)
+     opts.label:       play button text (default 'Play')
+     opts.step:        +1 plays toward slider.max, -1 toward slider.min
+     opts.interval:    ms between frames (default 200)
+     opts.forwardOnly: the slider cannot be dragged back past the
+                       furthest frame reached; Reset starts over */
+  function player(opts) {
+    var slider = document.getElementById(opts.slider);
+    var btnPlay = document.getElementById(opts.play);
+    var btnReset = document.getElementById(opts.reset);
+    var step = opts.step || 1;
+    var playHTML = '&#9654; ' + (opts.label || 'Play');
+    var timer = null, reached = null;
+
+    function first() { return step > 0 ? Number(slider.min) : Number(slider.max); }
+    function past(idx) { return idx < Number(slider.min) || idx > Number(slider.max); }
+
+    function show(idx) {
+      slider.value = idx;
+      if (reached === null || (idx - reached) * step > 0) reached = idx;
+      opts.show(idx);
+    }
+
+    function stop() {
+      clearInterval(timer);
+      timer = null;
+      btnPlay.innerHTML = playHTML;
+      btnPlay.classList.remove('active');
+    }
+
+    function reset() {
+      stop();
+      reached = null;
+      show(first());
+    }
+
+    slider.addEventListener('input', function() {
+      var idx = parseInt(this.value);
+      if (opts.forwardOnly && reached !== null && (idx - reached) * step < 0) {
+        this.value = reached;
+        return;
+      }
+      show(idx);
+    });
+
+    btnPlay.addEventListener('click', function() {
+      if (timer !== null) { stop(); return; }
+      btnPlay.innerHTML = '&#9646;&#9646; Pause';
+      btnPlay.classList.add('active');
+      var idx = parseInt(slider.value);
+      timer = setInterval(function() {
+        idx += step;
+        if (past(idx)) { stop(); return; }
+        show(idx);
+      }, opts.interval || 200);
+    });
+
+    btnReset.addEventListener('click', reset);
+
+    return {show:show, stop:stop, reset:reset};
+  }
+
+  return {
+    kB:kB, tau0:tau0, FONT:FONT, colors:C,
+    calcV:calcV, vCurve:vCurve, msRatio:msRatio, interp:interp,
+    axis:axis, legend:legend, layout:layout, note:note, plot:plot,
+    player:player,
+  };
+})();
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+"""
+Audit the size of everything under book/figures.
+
+For each file this records its size in bytes and, for raster images, its
+pixel dimensions. It then finds the `:width:` each figure is displayed at in
+book/chapters/*.md, converts that to CSS pixels and reports the effective
+DPI. Figures are flagged when they:
+
+- are larger than the build's size warning (1 MB)
+- have more pixels than MAX_PIXEL_RATIO times their display width, so they
+  could be downscaled with no visible loss even on HiDPI screens
+- are PNGs that no chapter or widget uses (see figure_registry.py)
+
+--check compares the audit against a committed baseline
+(scripts/figure_audit_baseline.json). It fails if a file grew by more than
+the tolerance, or if a new file is over the size warning. Run with
+--update-baseline after an intentional change.
+
+Only the Python standard library is used (image headers are parsed
+directly), so the audit can run before anything else is installed.
+
+Usage:
+    python scripts/audit_figures.py                    # Full report
+    python scripts/audit_figures.py --flagged          # Only flagged figures
+    python scripts/audit_figures.py --check            # Fail on regressions
+    python scripts/audit_figures.py --update-baseline  # Accept current sizes
+    python scripts/audit_figures.py --json audit.json  # Machine-readable report
+"""
+
+import argparse
+import json
+import re
+import struct
+import sys
+from pathlib import Path
+
+from figure_registry import CHAPTERS_DIR, FIGURES_DIR, PROJECT_ROOT, figure_index, referenced_paths
+
+BASELINE_PATH = PROJECT_ROOT / "scripts" / "figure_audit_baseline.json"
+
+# mystmd warns about files larger than this
+SIZE_WARNING = 1_000_000
+
+# Width of the book's article column in CSS pixels; `:width: 100%` renders
+# at this size
+CONTENT_WIDTH_PX = 720
+
+# CSS pixels per inch
+CSS_DPI = 96
+
+# Pixels per CSS pixel worth keeping (2 covers HiDPI/retina screens)
+MAX_PIXEL_RATIO = 2.0
+
+# Relative growth allowed before --check reports a regression
+DEFAULT_TOLERANCE = 0.05
+
+RASTER_SUFFIXES = {".png", ".jpg", ".jpeg"}
+
+_WIDTH_RE = re.compile(r"^([\d.]+)\s*(%|px)?$")
+
+
+def image_size(path: Path):
+    """Pixel (width, height) read from a PNG or JPEG header, or None."""
+    with open(path, "rb") as f:
+        head = f.read(26)
+        if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:2] != b"\xff\xd8":
+            return None
+        # JPEG: walk the segments to the start-of-frame marker
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+                continue
+            length = struct.unpack(">H", f.read(2))[0]
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">xHH", f.read(5))
+                return width, height
+            f.seek(length - 2, 1)
+
+
+def parse_width(value: str):
+    """Display width in CSS pixels for a `:width:` value, or None."""
+    match = _WIDTH_RE.match(value.strip())
+    if not match:
+        return None
+    number, unit = float(match.group(1)), match.group(2)
+    if unit == "%":
+        return CONTENT_WIDTH_PX * min(number, 100) / 100
+    return number
+
+
+def find_display_widths(chapters_dir: Path = CHAPTERS_DIR):
+    """Map each referenced figure to its widest display width in CSS pixels.
+
+    Without a :width: option a figure fills the article column. The PNG
+    fallback of a figure published as SVG counts as shown at the SVG's width.
+
+    Returns:
+        Dict of {path relative to book/figures: (css px, "chapter.md:line")}
+    """
+    widths = {}
+    for md_name, refs in figure_index(chapters_dir).items():
+        for ref in refs:
+            display = parse_width(ref["width"] or "") or CONTENT_WIDTH_PX
+            paths = [ref["path"]]
+            if ref["path"].endswith(".svg"):
+                paths.append(ref["path"][:-len(".svg")] + ".png")
+            for path in paths:
+                if path not in widths or display > widths[path][0]:
+                    widths[path] = (display, f"{md_name}:{ref['line']}")
+    return widths
+
+
+def audit(figures_dir: Path = FIGURES_DIR, chapters_dir: Path = CHAPTERS_DIR):
+    """Collect size information for every file under `figures_dir`.
+
+    Returns:
+        Dict of {path relative to figures_dir: record}, where a record has
+        "bytes" and, where known, "width"/"height" (pixels), "display_px",
+        "effective_dpi", "source" and a list of "flags"
+    """
+    displays = find_display_widths(chapters_dir)
+    referenced = referenced_paths(figure_index(chapters_dir))
+    report = {}
+    for path in sorted(p for p in figures_dir.rglob("*") if p.is_file()):
+        key = path.relative_to(figures_dir).as_posix()
+        if key.startswith(".") or "/." in key:
+            continue
+        record = {"bytes": path.stat().st_size, "flags": []}
+        if record["bytes"] > SIZE_WARNING:
+            record["flags"].append("over size warning")
+
+        size = image_size(path) if path.suffix.lower() in RASTER_SUFFIXES else None
+        if size:
+            record["width"], record["height"] = size
+        if key in displays:
+            display_px, source = displays[key]
+            record["display_px"] = round(display_px)
+            record["source"] = source
+            if size:
+                record["effective_dpi"] = round(size[0] / (display_px / CSS_DPI))
+                ratio = size[0] / display_px
+                if ratio > MAX_PIXEL_RATIO:
+                    record["flags"].append(f"oversampled {ratio:.1f}x")
+        elif (path.suffix.lower() == ".png" and "variants" not in path.parts
+              and key not in referenced):
+            record["flags"].append("unreferenced")
+        report[key] = record
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE):
+    """Lines describing size regressions of `report` against `baseline`."""
+    problems = []
+    for key, record in report.items():
+        old = baseline.get(key)
+        if old is None:
+            if record["bytes"] > SIZE_WARNING:
+                problems.append(f"{key}: new file of {format_bytes(record['bytes'])} "
+                                f"is over the {format_bytes(SIZE_WARNING)} size warning")
+            continue
+        if record["bytes"] > old["bytes"] * (1 + tolerance):
+            growth = 100 * (record["bytes"] / old["bytes"] - 1)
+            problems.append(f"{key}: {format_bytes(old['bytes'])} -> "
+                            f"{format_bytes(record['bytes'])} (+{growth:.0f}%)")
+        if "width" in record and "width" in old and record["width"] > old["width"]:
+            problems.append(f"{key}: {old['width']}x{old['height']} -> "
+                            f"{record['width']}x{record['height']} px")
+    return problems
+
+
+def format_bytes(n: float) -> str:
+    """Human-readable size (e.g. "1.4 MB")."""
+    for unit in ("B", "KB", "MB"):
+        if abs(n) < 1024 or unit == "MB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def print_report(report: dict, flagged_only: bool = False):
+    """Print a table of the audit, largest files first."""
+    rows = sorted(report.items(), key=lambda item: item[1]["bytes"], reverse=True)
+    print(f"{'File':<45} {'Size':>9} {'Pixels':>11} {'Shown':>6} {'DPI':>5}  Flags")
+    for key, record in rows:
+        if flagged_only and not record["flags"]:
+            continue
+        pixels = f"{record['width']}x{record['height']}" if "width" in record else "-"
+        shown = f"{record['display_px']}px" if "display_px" in record else "-"
+        dpi = str(record.get("effective_dpi", "-"))
+        print(f"{key:<45} {format_bytes(record['bytes']):>9} {pixels:>11} {shown:>6} "
+              f"{dpi:>5}  {', '.join(record['flags'])}")
+
+    total = sum(r["bytes"] for r in report.values())
+    flagged = [r for r in report.values() if r["flags"]]
+    print(f"\n{len(report)} files, {format_bytes(total)} total; {len(flagged)} flagged "
+          f"({format_bytes(sum(r['bytes'] for r in flagged))})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit figure sizes in book/figures")
+    parser.add_argument("--flagged", action="store_true", help="Only list flagged files")
+    parser.add_argument(
+        "--check", action="store_true",
+        help="Exit with an error if files grew compared to the baseline"
+    )
+    parser.add_argument(
+        "--update-baseline", action="store_true",
+        help=f"Save the current sizes as the baseline ({BASELINE_PATH.name})"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=DEFAULT_TOLERANCE,
+        help=f"Relative growth allowed by --check (default: {DEFAULT_TOLERANCE})"
+    )
+    parser.add_argument("--json", type=Path, help="Also write the full report as JSON")
+    args = parser.parse_args()
+
+    report = audit()
+    print_report(report, flagged_only=args.flagged)
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=1) + "\n", encoding="utf-8")
+        print(f"Report: {args.json}")
+
+    if args.update_baseline:
+        baseline = {
+            key: {k: record[k] for k in ("bytes", "width", "height") if k in record}
+            for key, record in report.items()
+        }
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=1, sort_keys=True) + "\n",
+                                 encoding="utf-8")
+        print(f"Baseline updated: {BASELINE_PATH}")
+
+    if args.check:
+        if not BASELINE_PATH.exists():
+            print(f"\nERROR: No baseline at {BASELINE_PATH}; run with --update-baseline")
+            sys.exit(1)
+        baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+        problems = compare(report, baseline, args.tolerance)
+        if problems:
+            print(f"\nFAILED: {len(problems)} size regression(s) against the baseline:")
+            for line in problems:
+                print(f"  {line}")
+            print("If these are intended, run: python scripts/audit_figures.py --update-baseline")
+            sys.exit(1)
+        print("\nNo size regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 """
-Generate a self-contained HTML file for CRM acquisition visualization.
+Generate the HTML widget for CRM acquisition visualization.
 
 Shows how a population of hematite grains precipitating at room
 temperature acquires a chemical remanent magnetization (CRM) as
@@ -9,107 +9,43 @@ Temperature and anisotropy are fixed; only grain volume increases.
 The iso-tau curves are therefore static and the grain population
 ellipse migrates upward.
 
-Style matches VRM and TRM widgets (Source Serif 4, control bar, etc.).
+The status line also gives the CRM acquired by a Monte Carlo population
+of hematite grains matching the sketched one (remanence.py), growing in
+steps of 100 s.
+
+Styles, the Neel relaxation helpers and the play/reset logic come from
+the shared widget runtime (widget_runtime.py).
 """
 
-import os
-
-html_content = r"""<!DOCTYPE html>
-<html lang="en">
-<head>
-<meta charset="utf-8">
-<meta name="viewport" content="width=device-width, initial-scale=1">
-<title>CRM Acquisition: Grain Growth at Room Temperature</title>
-<script src="https://cdn.plot.ly/plotly-2.35.2.min.js"></script>
-<style>
-  @import url('https://fonts.googleapis.com/css2?family=Source+Serif+4:ital,opsz,wght@0,8..60,300;0,8..60,400;0,8..60,600;1,8..60,400&family=JetBrains+Mono:wght@400&display=swap');
-
-  *{box-sizing:border-box;margin:0;padding:0}
-  body{
-    font-family:'Source Serif 4',Georgia,serif;
-    background:#f8f7f4;
-    color:#1e293b;
-    padding:20px 20px 40px;
-    min-height:100vh;
-  }
-  .container{max-width:620px;margin:0 auto}
+import json
 
-  .description{
-    font-size:0.84rem;
-    color:#475569;
-    line-height:1.55;
-    margin-bottom:14px;
-  }
-  .description b{color:#1e293b}
-  .description .pill{
-    font-family:'JetBrains Mono',monospace;
-    font-size:0.8rem;
-    background:#ece9e3;
-    padding:1px 5px;border-radius:3px;
-  }
+import numpy as np
 
-  .controls{
-    display:flex;align-items:center;gap:12px;
-    flex-wrap:wrap;
-    margin-bottom:12px;
-    padding:10px 14px;
-    background:#fff;
-    border:1px solid #d6d3cd;
-    border-radius:8px;
-    box-shadow:0 1px 3px rgba(0,0,0,0.04);
-  }
-  .controls label{font-size:0.9rem;font-weight:600;white-space:nowrap}
-  .slider-wrap{flex:1;min-width:180px;display:flex;align-items:center;gap:10px}
-  .slider-wrap input[type=range]{
-    flex:1;height:6px;-webkit-appearance:none;appearance:none;
-    background:#d6d3cd;border-radius:3px;outline:none;cursor:pointer;
-  }
-  .slider-wrap input[type=range]::-webkit-slider-thumb{
-    -webkit-appearance:none;width:18px;height:18px;
-    background:#b91c1c;border:2px solid #fff;border-radius:50%;
-    box-shadow:0 1px 4px rgba(0,0,0,0.25);cursor:pointer;
-  }
-  .slider-wrap input[type=range]::-moz-range-thumb{
-    width:18px;height:18px;
-    background:#b91c1c;border:2px solid #fff;border-radius:50%;
-    box-shadow:0 1px 4px rgba(0,0,0,0.25);cursor:pointer;
-  }
-  .time-val{
-    font-family:'JetBrains Mono',monospace;
-    font-size:1.05rem;font-weight:600;
-    min-width:90px;text-align:right;
-    color:#b91c1c;
-  }
-  .btn{
-    font-family:inherit;font-size:0.82rem;font-weight:600;
-    padding:5px 12px;border:1px solid #d6d3cd;border-radius:5px;
-    background:#fff;color:#1e293b;cursor:pointer;
-    transition:background 0.15s,border-color 0.15s;
-    white-space:nowrap;
-  }
-  .btn:hover{background:#f1f0ec;border-color:#94a3b8}
-  .btn.active{background:#b91c1c;color:#fff;border-color:#b91c1c}
-
-  .status{
-    font-size:0.86rem;line-height:1.6;
-    padding:7px 14px;
-    margin-bottom:10px;
-    background:#fff;
-    border:1px solid #d6d3cd;
-    border-radius:8px;
-  }
-  .status .lbl{font-weight:600}
-
-  #plot{
-    background:#fff;
-    border:1px solid #d6d3cd;
-    border-radius:8px;
-    box-shadow:0 1px 3px rgba(0,0,0,0.04);
-    overflow:hidden;
-  }
-</style>
-</head>
-<body>
+from neel import T_ROOM
+from remanence import lognormal_population, simulate
+from widget_runtime import write_page
+
+# Growth factors of the slider steps, as in the widget
+GROWTH = 0.03 + 0.97 * np.arange(30) / 29
+STEP_TIME = 100.0   # s at each growth step
+
+# Hematite: Ms at room temperature (A/m) and Curie temperature (K); its
+# anisotropy is held fixed (exponent 0), as in the widget
+MS_HEMATITE = 2.5e3
+TC_HEMATITE = 675.0 + 273.15
+
+# Lognormal grain population spanning the sketched ellipse at full growth
+N_GRAINS = 10**5
+V_MEDIAN, K_MEDIAN = 0.35e-21, 0.6e3   # m^3, J/m^3
+SIGMA_V, SIGMA_K = 0.15, 0.35
+
+# CRM after each growth step, as a percentage of the final value
+V, K = lognormal_population(N_GRAINS, V_MEDIAN, K_MEDIAN, SIGMA_V, SIGMA_K, seed=0)
+crm, _, _ = simulate(V, K, STEP_TIME, T_ROOM, growth=GROWTH, Ms=MS_HEMATITE,
+                     exponent=0.0, Tc=TC_HEMATITE)
+crm_pct = np.round(100 * crm / crm[-1]).astype(int).tolist()
+
+body = r"""
 <div class="container">
   <div class="description">
     At fixed temperature, <b>hematite</b> grains precipitating from solution
@@ -137,15 +73,15 @@ html_content = r"""<!DOCTYPE html>
 
   <div class="status" id="status">
     <span class="lbl">Grain Volume:</span> 3 % of maximum
+    &nbsp;|&nbsp; <span class="lbl">CRM:</span> %%CRM0%% % of final
   </div>
 
   <div id="plot"></div>
 </div>
+"""
 
-<script>
+script = r"""
 /* --- Physics constants --- */
-var kB = 1.380649e-23;
-var tau0 = 1e-9;
 var T_K = 293.15;   /* fixed room temperature */
 
 /* Hematite grain population (reference = fully grown) */
@@ -154,6 +90,9 @@ var refCy = 0.35;   /* zm³   — center volume at full growth */
 var ellW  = 0.8;    /* kJ/m³ — spread in K */
 var ellH  = 0.20;   /* zm³   — spread in volume at full growth */
 
+/* CRM (% of final) after each growth step, from the Monte Carlo population */
+var crmPct = %%CRM%%;
+
 /* --- Growth steps: 30 steps, volume factor 0.03 to 1.0 --- */
 var nSteps = 30;
 var gFactors = [];
@@ -186,49 +125,22 @@ var tauDefs = [
   {label: '4.5 Gyr', val: 4.5e9 * 3.15e7, color: '#D55E00', w: 2.5}
 ];
 
-function calcV(tau, kj) {
-  return (kB * T_K * Math.log(tau / tau0)) / Math.max(kj, 1e-5) * 1e21;
-}
-
-function interp(x_new, x_arr, y_arr) {
-  var n = x_new.length, nArr = x_arr.length;
-  var result = new Array(n);
-  for (var i = 0; i < n; i++) {
-    var xn = x_new[i];
-    if (xn <= x_arr[0])        { result[i] = y_arr[0]; continue; }
-    if (xn >= x_arr[nArr - 1]) { result[i] = y_arr[nArr - 1]; continue; }
-    var lo = 0, hi = nArr - 1;
-    while (hi - lo > 1) {
-      var mid = (lo + hi) >> 1;
-      if (x_arr[mid] <= xn) lo = mid; else hi = mid;
-    }
-    var frac = (xn - x_arr[lo]) / (x_arr[hi] - x_arr[lo]);
-    result[i] = y_arr[lo] + frac * (y_arr[hi] - y_arr[lo]);
-  }
-  return result;
-}
-
 /* --- Precompute static tau curves --- */
-var tauCurves = [];
-for (var t = 0; t < tauDefs.length; t++) {
-  var curve = new Array(nK);
-  for (var i = 0; i < nK; i++)
-    curve[i] = Math.min(Math.max(calcV(tauDefs[t].val, K_J[i]), 0), 0.5);
-  tauCurves[t] = curve;
-}
+var tauCurves = tauDefs.map(function(d) { return Widget.vCurve(d.val, T_K, K_J, 0.5); });
 
 /* Precompute boundary (tau = 100 s) at ellipse x positions — constant */
-var bnd_at_ex = interp(ex, K_kJ, tauCurves[0]);
+var bnd_at_ex = Widget.interp(ex, K_kJ, tauCurves[0]);
+
+/* Grain population at growth factor g: outline, blocked and SP parts */
+function computeFrame(g) {
+  var ey  = ey_base.map(function(y) { return y * g; });
+  var ssd = ey.map(function(y, i) { return Math.min(Math.max(y, bnd_at_ex[i]), 0.6); });
+  var sp  = ey.map(function(y, i) { return Math.min(y, bnd_at_ex[i]); });
+  return {ey: ey, ssd_y: ssd, sp_y: sp};
+}
 
 /* --- Initial state (smallest grains) --- */
-var g0 = gFactors[0];
-var initEy  = ey_base.map(function(y) { return y * g0; });
-var initSsd = initEy.map(function(y, i) {
-  return Math.min(Math.max(y, bnd_at_ex[i]), 0.6);
-});
-var initSp  = initEy.map(function(y, i) {
-  return Math.min(y, bnd_at_ex[i]);
-});
+var init = computeFrame(gFactors[0]);
 
 /* --- Traces ---
    0: SSD fill (gold)        — dynamic (y only)
@@ -236,19 +148,16 @@ var initSp  = initEy.map(function(y, i) {
    2: Ellipse outline        — dynamic (y only)
    3–5: tau curves            — STATIC
 */
-var ff = 'Source Serif 4, Georgia, serif';
-var gridC = '#e8e6e1', axC = '#334155';
-
 var traces = [
-  {x: ex, y: initSsd, fill: 'toself', mode: 'lines',
+  {x: ex, y: init.ssd_y, fill: 'toself', mode: 'lines',
    line: {width: 0.5, color: 'gray'}, fillcolor: 'rgba(255,215,0,0.5)',
    hoverinfo: 'skip', showlegend: false},
 
-  {x: ex, y: initSp, fill: 'toself', mode: 'lines',
+  {x: ex, y: init.sp_y, fill: 'toself', mode: 'lines',
    line: {width: 0.5, color: 'gray'}, fillcolor: 'rgba(173,216,230,0.6)',
    hoverinfo: 'skip', showlegend: false},
 
-  {x: ex, y: initEy, mode: 'lines',
+  {x: ex, y: init.ey, mode: 'lines',
    line: {width: 1.5, color: 'gray'},
    hoverinfo: 'skip', showlegend: false}
 ];
@@ -262,119 +171,45 @@ for (var t = 0; t < tauDefs.length; t++) {
   });
 }
 
-var layout = {
-  width: 600, height: 390,
+Widget.plot('plot', traces, Widget.layout({
   margin: {l: 68, r: 80, t: 10, b: 50},
-  paper_bgcolor: 'transparent',
-  plot_bgcolor: '#fff',
-  font: {family: ff, size: 12, color: '#1e293b'},
-
-  xaxis: {
-    title: {text: 'Anisotropy Energy Density (kJ/m\u00B3)', font: {size: 13}},
-    range: [0, 3],
-    showgrid: true, gridcolor: gridC, gridwidth: 1,
-    zeroline: false, linecolor: axC, linewidth: 1.5, mirror: true,
-    ticks: 'inside', ticklen: 5,
-    tickfont: {family: ff, size: 11}
-  },
-  yaxis: {
-    title: {text: 'Grain Volume (zm\u00B3)', font: {size: 13}},
-    range: [0, 0.48],
-    showgrid: true, gridcolor: gridC, gridwidth: 1,
-    zeroline: false, linecolor: axC, linewidth: 1.5, mirror: true,
-    ticks: 'inside', ticklen: 5,
-    tickfont: {family: ff, size: 11}
-  },
-
-  legend: {
-    bgcolor: 'rgba(255,255,255,0.92)',
-    bordercolor: '#d6d3cd', borderwidth: 1,
-    font: {size: 11},
-    x: 0.98, y: 0.98, xanchor: 'right', yanchor: 'top',
-    borderpad: 6
-  },
-
+  xaxis: Widget.axis('Anisotropy Energy Density (kJ/m\u00B3)', {range: [0, 3]}),
+  yaxis: Widget.axis('Grain Volume (zm\u00B3)', {range: [0, 0.48]}),
   annotations: [
-    {x: 0.15, y: 0.04, text: 'Superparamagnetic<br>(growing)',
-     showarrow: false, font: {size: 12, color: '#0072B2', family: ff},
-     bgcolor: 'rgba(255,255,255,0.85)', borderpad: 2},
-    {x: 1.8, y: 0.38, text: 'Blocked<br>(CRM acquired)',
-     showarrow: false, font: {size: 12, color: '#B8860B', family: ff},
-     bgcolor: 'rgba(255,255,255,0.85)', borderpad: 2}
-  ],
-
-  hovermode: 'closest'
-};
-
-Plotly.newPlot('plot', traces, layout, {displayModeBar: false, responsive: true});
+    Widget.note(0.15, 0.04, 'Superparamagnetic<br>(growing)', '#0072B2'),
+    Widget.note(1.8, 0.38, 'Blocked<br>(CRM acquired)', '#B8860B')
+  ]
+}));
 
 /* --- Interactivity --- */
-var slider   = document.getElementById('tSlider');
 var tValEl   = document.getElementById('tVal');
 var statusEl = document.getElementById('status');
-var btnPlay  = document.getElementById('btnPlay');
-var btnReset = document.getElementById('btnReset');
-
-function updateToIdx(idx) {
-  var g = gFactors[idx];
-  var ey_new = ey_base.map(function(y) { return y * g; });
-  var ssd_y  = ey_new.map(function(y, i) {
-    return Math.min(Math.max(y, bnd_at_ex[i]), 0.6);
-  });
-  var sp_y   = ey_new.map(function(y, i) {
-    return Math.min(y, bnd_at_ex[i]);
-  });
-
-  /* Only traces 0–2 update; tau curves (3–5) are static */
-  Plotly.restyle('plot', {y: [ssd_y, sp_y, ey_new]}, [0, 1, 2]);
 
-  var pct = Math.round(g * 100);
-  tValEl.textContent = pct + ' %';
-  slider.value = idx;
-  statusEl.innerHTML =
-    '<span class="lbl">Grain Volume:</span> ' + pct + ' % of maximum';
-}
-
-slider.addEventListener('input', function() {
-  updateToIdx(parseInt(this.value));
-});
-
-var playing = false, playTimer = null;
-
-function stopPlay() {
-  playing = false;
-  clearInterval(playTimer);
-  btnPlay.innerHTML = '&#9654; Grow';
-  btnPlay.classList.remove('active');
-}
-
-btnPlay.addEventListener('click', function() {
-  if (playing) { stopPlay(); return; }
-  playing = true;
-  btnPlay.innerHTML = '&#9646;&#9646; Pause';
-  btnPlay.classList.add('active');
-  var idx = parseInt(slider.value);
-  playTimer = setInterval(function() {
-    idx++;
-    if (idx >= nSteps) { stopPlay(); return; }
-    updateToIdx(idx);
-  }, 200);
-});
-
-btnReset.addEventListener('click', function() {
-  stopPlay();
-  updateToIdx(0);
+Widget.player({
+  slider: 'tSlider', play: 'btnPlay', reset: 'btnReset',
+  label: 'Grow', interval: 200,
+  show: function(idx) {
+    var g = gFactors[idx];
+    var f = computeFrame(g);
+
+    /* Only traces 0–2 update; tau curves (3–5) are static */
+    Plotly.restyle('plot', {y: [f.ssd_y, f.sp_y, f.ey]}, [0, 1, 2]);
+
+    var pct = Math.round(g * 100);
+    tValEl.textContent = pct + ' %';
+    statusEl.innerHTML =
+      '<span class="lbl">Grain Volume:</span> ' + pct + ' % of maximum' +
+      ' &nbsp;|&nbsp; <span class="lbl">CRM:</span> ' + crmPct[idx] + ' % of final';
+  }
 });
-</script>
-</body>
-</html>"""
+"""
 
 # --- Write output ---
-output_path = '../book/figures/chapter7/crm_widget.html'
-os.makedirs(os.path.dirname(output_path), exist_ok=True)
-with open(output_path, 'w') as f:
-    f.write(html_content)
+body = body.replace('%%CRM0%%', str(crm_pct[0]))
+script = script.replace('%%CRM%%', json.dumps(crm_pct, separators=(',', ':')))
+output_path = write_page('../book/figures/chapter7/crm_widget.html',
+                         'CRM Acquisition: Grain Growth at Room Temperature', body, script)
 
-sz = os.path.getsize(output_path)
+sz = output_path.stat().st_size
 print(f"Written to {output_path}")
 print(f"File size: {sz / 1e3:.0f} KB")
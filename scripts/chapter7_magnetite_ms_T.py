@@ -9,29 +9,27 @@ barrier grows faster than the magnetization itself during cooling.
 import numpy as np
 import matplotlib.pyplot as plt
 
+from neel import TC_MAGNETITE, anisotropy, ms_ratio
+
 # --- Wong (2011) colorblind-safe palette ---
 COLOR_BLUE = '#0072B2'
 COLOR_VERMILLION = '#D55E00'
 
-# --- Physical Constants for Magnetite ---
-Tc = 580.0           # Curie temperature (°C)
+# --- Physical Constants for Magnetite (Tc, gamma and Ms(T) from neel.py) ---
+Tc = TC_MAGNETITE - 273.15   # Curie temperature (°C)
 Ms_0 = 480000.0      # Saturation magnetization at room temp (A/m)
 K_0 = 25000.0        # Anisotropy constant at room temp (J/m³)
-gamma = 0.38         # Exponent for magnetite
 
 # --- Temperature arrays ---
 T_celsius = np.linspace(0, Tc, 200)
 T_kelvin = T_celsius + 273.15
-Tc_kelvin = Tc + 273.15
-T_room_k = 20 + 273.15  # Reference room temp (20°C)
 
-# --- Ms(T) and K(T) ---
-ms_actual = Ms_0 * ((Tc_kelvin - T_kelvin) / (Tc_kelvin - T_room_k))**gamma
-ms_actual = np.maximum(ms_actual, 0)
+# --- Ms(T) and K(T), relative to room temperature (20°C) ---
+ms_actual = Ms_0 * ms_ratio(T_kelvin)
 
 # For shape anisotropy, K = 1/2 * dN * Ms^2
 # Therefore K(T) scales with the square of Ms(T)
-k_actual = K_0 * (ms_actual / Ms_0)**2
+k_actual = anisotropy(K_0, T_kelvin)
 
 ms_norm = ms_actual / Ms_0
 k_norm = k_actual / K_0
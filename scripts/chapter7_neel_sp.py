@@ -12,28 +12,11 @@ from matplotlib.patches import Ellipse, PathPatch, Patch
 from matplotlib.path import Path
 from matplotlib.legend_handler import HandlerPatch
 
-# --- Physical Constants ---
-k_B = 1.380649e-23  # Boltzmann constant (J/K)
-tau_0 = 1e-9        # Frequency factor (seconds), typical value for magnetite
+from neel import blocking_volume
 
 # --- Wong (2011) colorblind-safe palette ---
 tau_colors = {'1 ms': '#009E73', '100 s': '#0072B2', '1 Myr': '#E69F00', '4.5 Gyr': '#D55E00'}
 
-
-def calculate_volume_for_relaxation(tau, K, T):
-    """Rearranges the Neel equation to solve for Volume (v).
-
-    Parameters:
-        tau (float): The relaxation time in seconds.
-        K (float or numpy.ndarray): The anisotropy constant in J/m^3.
-        T (float): The temperature in Kelvin.
-
-    Returns:
-        float or numpy.ndarray: The calculated grain volume in m^3.
-    """
-    return (k_B * T * np.log(tau / tau_0)) / K
-
-
 # --- Setup ---
 T_room = 300  # Kelvin
 
@@ -47,11 +30,9 @@ taus = {
 K_axis_kJ = np.linspace(0.01, 6.0, 1000)
 K_axis_J = K_axis_kJ * 1000
 
-# Pre-compute volume curves in zm³
-v_curves = {}
-for label, t_val in taus.items():
-    v_m3 = calculate_volume_for_relaxation(t_val, K_axis_J, T_room)
-    v_curves[label] = v_m3 * 1e21
+# Volume curves in zm³, one row per tau
+v_grid = blocking_volume(np.array(list(taus.values()))[:, None], K_axis_J, T_room) * 1e21
+v_curves = dict(zip(taus, v_grid))
 
 # --- Curve label positions ---
 label_settings = {
@@ -65,9 +46,8 @@ label_settings = {
 fig, ax = plt.subplots(figsize=(10, 7))
 
 # Iso-tau curves with inline labels
-for label, t_val in taus.items():
-    v_m3 = calculate_volume_for_relaxation(t_val, K_axis_J, T_room)
-    ax.plot(K_axis_kJ, v_m3 * 1e21, color=tau_colors[label], linewidth=2.5)
+for label in taus:
+    ax.plot(K_axis_kJ, v_curves[label], color=tau_colors[label], linewidth=2.5)
     cfg = label_settings[label]
     ax.text(cfg['x'], cfg['y'], rf'$\tau$ = {label}',
             color=tau_colors[label], fontsize=14, fontweight='bold',
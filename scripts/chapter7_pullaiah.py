@@ -0,0 +1,193 @@
+"""
+Time-temperature (Pullaiah) nomogram for magnetite and hematite.
+
+Each curve follows one grain: the relaxation time at which it blocks,
+against temperature. Along a curve
+
+    T ln(tau / tau0) / Ms(T)^n = const
+
+with n = 2 for magnetite (shape anisotropy, K ~ Ms^2) and n = 4 for
+hematite (Hc ~ Ms^3, after Pullaiah et al. 1975). Ms(T) comes from
+neel.ms_ratio() (gamma = 0.38). Curves are labelled by their blocking
+temperature on laboratory timescales (100 s).
+
+All curves of a mineral come from one call to neel.blocking_temperature()
+over the (grains x log t) grid. blocking_grid() does the same over
+(log t x V x K) for whole grain populations. Both are vectorized, and a
+full parameter set takes a few milliseconds.
+
+Writes the static figure and a compact dataset for interactive use. For
+each mineral, the dataset has the curves at every log t step and a table
+of T against log10(T / ms_ratio(T)^n). The blocking temperature of any
+grain at any tau can be read off that table, because it depends only on
+u = K V / (k_B ln(tau / tau0)).
+
+Usage:
+    python chapter7_pullaiah.py                  # Figure and dataset in book/figures/chapter7/
+    python chapter7_pullaiah.py --grid 200       # ... and time a 200 x 200 (V x K) grid
+
+    from chapter7_pullaiah import MINERALS, nomogram
+    T_b = nomogram(np.arange(50, 551, 50), np.linspace(0, 18, 73), **MINERALS["magnetite"])
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from neel import GAMMA, K_B, TAU_0, TAU_BLOCK, TC_MAGNETITE, blocking_temperature, ms_ratio
+
+FIGURE_PATH = Path("../book/figures/chapter7/pullaiah_nomogram.png")
+DATASET_PATH = Path("../book/figures/chapter7/pullaiah_nomogram.json")
+
+# Curie temperature (K), Ms(T) exponent and K ~ Ms^exponent
+MINERALS = {
+    "magnetite": {"Tc": TC_MAGNETITE, "gamma": GAMMA, "exponent": 2.0},
+    "hematite": {"Tc": 675.0 + 273.15, "gamma": GAMMA, "exponent": 4.0},
+}
+
+# Laboratory (100 s) blocking temperatures of the plotted grains (C)
+CURVES = {
+    "magnetite": [50, 100, 150, 200, 250, 300, 350, 400, 450, 500, 550, 570],
+    "hematite": [50, 100, 150, 200, 250, 300, 350, 400, 450, 500, 550, 600, 650, 665],
+}
+
+# log10 relaxation times (s) of the curves, and reference times
+LOG_T = np.linspace(0.0, 18.0, 73)
+YEAR = 365.25 * 24 * 3600
+REFERENCE_TIMES = {
+    "100 s": 100, "1 hr": 3600, "1 yr": YEAR, "1 kyr": 1e3 * YEAR,
+    "1 Myr": 1e6 * YEAR, "1 Gyr": 1e9 * YEAR,
+}
+
+# Points in each mineral's table of T against log10 u
+TABLE_SIZE = 200
+
+# Wong (2011) vermillion, as in the other chapter 7 figures
+CURVE_COLOR = '#D55E00'
+
+
+def lab_energy(T_lab_C, Tc, gamma, exponent):
+    """Energy barrier K(20 C) V (J) of grains blocking at T_lab_C (C) in 100 s."""
+    T_lab = np.asarray(T_lab_C, dtype=float) + 273.15
+    return K_B * T_lab * np.log(TAU_BLOCK / TAU_0) / ms_ratio(T_lab, Tc, gamma) ** exponent
+
+
+def nomogram(T_lab_C, log_t, Tc, gamma, exponent):
+    """Blocking temperatures (C) of grains along their nomogram curves.
+
+    Args:
+        T_lab_C: Laboratory (100 s) blocking temperatures picking the grains (C)
+        log_t: log10 of the relaxation times (s)
+        Tc, gamma, exponent: Mineral, see MINERALS
+
+    Returns:
+        Array of shape (grains, relaxation times)
+    """
+    energy = lab_energy(T_lab_C, Tc, gamma, exponent)[:, None]
+    return blocking_temperature(energy, 1.0, 10.0 ** np.asarray(log_t), exponent, Tc, gamma) - 273.15
+
+
+def blocking_grid(log_t, V, K_ref, Tc, gamma, exponent):
+    """Blocking temperatures (C) over a (log t x V x K) grid.
+
+    Args:
+        log_t: log10 of the relaxation times (s)
+        V: Grain volumes (m^3)
+        K_ref: Anisotropy energy densities at 20 C (J/m^3)
+        Tc, gamma, exponent: Mineral, see MINERALS
+
+    Returns:
+        Array of shape (relaxation times, volumes, anisotropies)
+    """
+    tau, V, K_ref = np.ix_(10.0 ** np.asarray(log_t), V, K_ref)
+    return blocking_temperature(V, K_ref, tau, exponent, Tc, gamma) - 273.15
+
+
+def inverse_table(Tc, gamma, exponent, size: int = TABLE_SIZE):
+    """T (C) against log10 u = log10(T / ms_ratio(T)^exponent), from 0 C to
+    just below Tc; interpolating it gives the blocking temperature of a
+    grain with u = K V / (k_B ln(tau / tau0))."""
+    T = 273.15 + (Tc - 273.15) * np.sin(np.linspace(0, np.pi / 2, size + 1)[:-1])
+    log_u = np.log10(T) - exponent * np.log10(ms_ratio(T, Tc, gamma))
+    return T - 273.15, log_u
+
+
+def dataset(log_t=LOG_T):
+    """Compact nomogram data for interactive figures (rounded for JSON)."""
+    data = {"tau0": TAU_0, "kB": K_B, "log_t": np.round(log_t, 3).tolist(), "minerals": {}}
+    for name, mineral in MINERALS.items():
+        T_table, log_u = inverse_table(**mineral)
+        data["minerals"][name] = {
+            "Tc": round(mineral["Tc"] - 273.15, 2),
+            "gamma": mineral["gamma"],
+            "exponent": mineral["exponent"],
+            "T_lab": CURVES[name],
+            "curves": np.round(nomogram(CURVES[name], log_t, **mineral), 1).tolist(),
+            "table": {"T": np.round(T_table, 2).tolist(), "log_u": np.round(log_u, 5).tolist()},
+        }
+    return data
+
+
+def plot(path: Path, log_t=LOG_T):
+    """Two-panel nomogram figure: a) magnetite, b) hematite."""
+    fig, axes = plt.subplots(1, 2, figsize=(16, 5.6), sharey=True)
+    for ax, (name, mineral), letter in zip(axes, MINERALS.items(), "ab"):
+        T_b = nomogram(CURVES[name], log_t, **mineral)
+        for curve in T_b:
+            ax.plot(curve, 10.0 ** log_t, color=CURVE_COLOR, linewidth=1.8)
+        for label, tau in REFERENCE_TIMES.items():
+            ax.axhline(tau, color='black', linewidth=1.5)
+        ax.text(0.02, 0.97, f'{letter}) {name}', transform=ax.transAxes,
+                fontsize=16, va='top', bbox=dict(facecolor='white', edgecolor='none', pad=2))
+        ax.set_yscale('log')
+        ax.set_xlim(20, round(mineral["Tc"] - 273.15, -2) + 20)
+        ax.set_ylim(1, 1e18)
+        ax.set_xlabel('Temperature (°C)', fontsize=16)
+        ax.tick_params(axis='both', labelsize=14)
+
+    axes[0].set_ylabel('Relaxation time (seconds)', fontsize=16)
+    right = axes[1].secondary_yaxis('right')
+    right.set_yticks(list(REFERENCE_TIMES.values()), labels=list(REFERENCE_TIMES))
+    right.tick_params(labelsize=14)
+
+    fig.tight_layout()
+    fig.savefig(path, dpi=200, bbox_inches='tight', facecolor='white')
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-temperature nomogram for magnetite and hematite")
+    parser.add_argument("--figure", type=Path, default=FIGURE_PATH,
+                        help=f"Figure path (default: {FIGURE_PATH})")
+    parser.add_argument("--dataset", type=Path, default=DATASET_PATH,
+                        help=f"Dataset path (default: {DATASET_PATH})")
+    parser.add_argument("--grid", type=int, default=0,
+                        help="Also time blocking_grid() on an N x N (V x K) grid")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    data = dataset()
+    elapsed = time.perf_counter() - started
+    args.dataset.write_text(json.dumps(data, separators=(',', ':')))
+    print(f"Dataset ({elapsed * 1e3:.0f} ms): {args.dataset} "
+          f"({args.dataset.stat().st_size / 1e3:.0f} KB)")
+
+    plot(args.figure)
+    print(f"Figure: {args.figure}")
+
+    if args.grid:
+        V = np.geomspace(1e-24, 1e-21, args.grid)
+        K = np.linspace(1e3, 5e4, args.grid)
+        for name, mineral in MINERALS.items():
+            started = time.perf_counter()
+            T_b = blocking_grid(LOG_T, V, K, **mineral)
+            elapsed = time.perf_counter() - started
+            print(f"{name}: {T_b.size} blocking temperatures in {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
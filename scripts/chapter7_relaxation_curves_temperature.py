@@ -10,27 +10,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.lines import Line2D
 
-# --- Physical Constants ---
-k_B = 1.380649e-23  # Boltzmann constant (J/K)
-tau_0 = 1e-9        # Frequency factor (seconds), typical value for magnetite
-
-
-def calculate_volume_for_relaxation(tau, K, T):
-    """Rearranges the Neel equation to solve for Volume (v).
-
-    Calculates the grain volume required to maintain magnetization for a given
-    relaxation time, based on the anisotropy and temperature.
-
-    Parameters:
-        tau (float): The relaxation time in seconds.
-        K (float or numpy.ndarray): The anisotropy constant in J/m^3.
-        T (float): The temperature in Kelvin.
-
-    Returns:
-        float or numpy.ndarray: The calculated grain volume in m^3.
-    """
-    v = (k_B * T * np.log(tau / tau_0)) / K
-    return v
+from neel import T_ROOM, blocking_volume
 
 
 def plot_neel_curves(T_k, K_kJ, K_J, taus, tau_colors, ax,
@@ -55,10 +35,10 @@ def plot_neel_curves(T_k, K_kJ, K_J, taus, tau_colors, ax,
     show_legend_labels : bool
         If False, sets label to '_nolegend_'.
     """
-    for label, t_val in taus.items():
-        v_m3 = calculate_volume_for_relaxation(t_val, K_J, T_k)
+    v_grid = blocking_volume(np.array(list(taus.values()))[:, None], K_J, T_k) * 1e21
+    for label, v_zm3 in zip(taus, v_grid):
         leg = f'$\\tau$ = {label}{label_suffix}' if show_legend_labels else '_nolegend_'
-        ax.plot(K_kJ, v_m3 * 1e21, color=tau_colors[label],
+        ax.plot(K_kJ, v_zm3, color=tau_colors[label],
                 linestyle=linestyle, linewidth=2.5, alpha=alpha, label=leg)
 
 
@@ -85,7 +65,7 @@ taus = {
 tau_colors = {'100 s': '#0072B2', '1 Myr': '#E69F00', '4.5 Gyr': '#D55E00'}
 
 T_high_K = 550 + 273.15
-T_low_K = 20 + 273.15
+T_low_K = T_ROOM
 
 K_axis_kJ = np.linspace(0.01, 6.0, 1000)
 K_axis_J = K_axis_kJ * 1000
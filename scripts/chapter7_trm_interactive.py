@@ -1,5 +1,5 @@
 """
-Generate a self-contained HTML file for TRM acquisition visualization.
+Generate the HTML widget for TRM acquisition visualization.
 
 All physics computation happens in JavaScript for a compact file.
 Shows how a grain population acquires a thermoremanent magnetization
@@ -7,107 +7,36 @@ Shows how a grain population acquires a thermoremanent magnetization
 temperature, with the grain population migrating rightward in V-K
 space as anisotropy energy grows.
 
-Style matches chapter7_vrm_interactive.py (Source Serif 4, control bar, etc.).
+The status line also gives the TRM acquired by a Monte Carlo population
+matching the sketched one (remanence.py), cooled in 10 C steps of 100 s.
+
+Styles, the Neel relaxation helpers (including magnetite's Ms(T), from
+neel.py) and the play/reset logic come from the shared widget runtime
+(widget_runtime.py).
 """
 
-import os
-
-html_content = r"""<!DOCTYPE html>
-<html lang="en">
-<head>
-<meta charset="utf-8">
-<meta name="viewport" content="width=device-width, initial-scale=1">
-<title>TRM Acquisition: Cooling from Curie Temperature</title>
-<script src="https://cdn.plot.ly/plotly-2.35.2.min.js"></script>
-<style>
-  @import url('https://fonts.googleapis.com/css2?family=Source+Serif+4:ital,opsz,wght@0,8..60,300;0,8..60,400;0,8..60,600;1,8..60,400&family=JetBrains+Mono:wght@400&display=swap');
-
-  *{box-sizing:border-box;margin:0;padding:0}
-  body{
-    font-family:'Source Serif 4',Georgia,serif;
-    background:#f8f7f4;
-    color:#1e293b;
-    padding:20px 20px 40px;
-    min-height:100vh;
-  }
-  .container{max-width:620px;margin:0 auto}
+import json
 
-  .description{
-    font-size:0.84rem;
-    color:#475569;
-    line-height:1.55;
-    margin-bottom:14px;
-  }
-  .description b{color:#1e293b}
-  .description .pill{
-    font-family:'JetBrains Mono',monospace;
-    font-size:0.8rem;
-    background:#ece9e3;
-    padding:1px 5px;border-radius:3px;
-  }
+import numpy as np
 
-  .controls{
-    display:flex;align-items:center;gap:12px;
-    flex-wrap:wrap;
-    margin-bottom:12px;
-    padding:10px 14px;
-    background:#fff;
-    border:1px solid #d6d3cd;
-    border-radius:8px;
-    box-shadow:0 1px 3px rgba(0,0,0,0.04);
-  }
-  .controls label{font-size:0.9rem;font-weight:600;white-space:nowrap}
-  .slider-wrap{flex:1;min-width:180px;display:flex;align-items:center;gap:10px}
-  .slider-wrap input[type=range]{
-    flex:1;height:6px;-webkit-appearance:none;appearance:none;
-    background:#d6d3cd;border-radius:3px;outline:none;cursor:pointer;
-  }
-  .slider-wrap input[type=range]::-webkit-slider-thumb{
-    -webkit-appearance:none;width:18px;height:18px;
-    background:#b91c1c;border:2px solid #fff;border-radius:50%;
-    box-shadow:0 1px 4px rgba(0,0,0,0.25);cursor:pointer;
-  }
-  .slider-wrap input[type=range]::-moz-range-thumb{
-    width:18px;height:18px;
-    background:#b91c1c;border:2px solid #fff;border-radius:50%;
-    box-shadow:0 1px 4px rgba(0,0,0,0.25);cursor:pointer;
-  }
-  .time-val{
-    font-family:'JetBrains Mono',monospace;
-    font-size:1.05rem;font-weight:600;
-    min-width:90px;text-align:right;
-    color:#b91c1c;
-  }
-  .btn{
-    font-family:inherit;font-size:0.82rem;font-weight:600;
-    padding:5px 12px;border:1px solid #d6d3cd;border-radius:5px;
-    background:#fff;color:#1e293b;cursor:pointer;
-    transition:background 0.15s,border-color 0.15s;
-    white-space:nowrap;
-  }
-  .btn:hover{background:#f1f0ec;border-color:#94a3b8}
-  .btn.active{background:#b91c1c;color:#fff;border-color:#b91c1c}
-
-  .status{
-    font-size:0.86rem;line-height:1.6;
-    padding:7px 14px;
-    margin-bottom:10px;
-    background:#fff;
-    border:1px solid #d6d3cd;
-    border-radius:8px;
-  }
-  .status .lbl{font-weight:600}
-
-  #plot{
-    background:#fff;
-    border:1px solid #d6d3cd;
-    border-radius:8px;
-    box-shadow:0 1px 3px rgba(0,0,0,0.04);
-    overflow:hidden;
-  }
-</style>
-</head>
-<body>
+from remanence import lognormal_population, simulate
+from widget_runtime import write_page
+
+# Slider temperatures (C), as in the widget
+TEMPS_C = np.arange(20, 561, 10)
+STEP_TIME = 100.0   # s at each temperature while cooling
+
+# Lognormal grain population spanning the sketched ellipse at room temperature
+N_GRAINS = 10**5
+V_MEDIAN, K_MEDIAN = 0.19e-21, 1.3e3   # m^3, J/m^3
+SIGMA_V, SIGMA_K = 0.4, 0.3
+
+# TRM at each temperature on cooling, as a percentage of the final value
+V, K = lognormal_population(N_GRAINS, V_MEDIAN, K_MEDIAN, SIGMA_V, SIGMA_K, seed=0)
+trm, _, _ = simulate(V, K, STEP_TIME, TEMPS_C[::-1] + 273.15)
+trm_pct = np.round(100 * trm / trm[-1]).astype(int)[::-1].tolist()
+
+body = r"""
 <div class="container">
   <div class="description">
     During cooling, <b>M<sub>s</sub></b> grows and anisotropy energy
@@ -134,24 +63,21 @@ html_content = r"""<!DOCTYPE html>
 
   <div class="status" id="status">
     <span class="lbl">Temperature:</span> 560 &deg;C
+    &nbsp;|&nbsp; <span class="lbl">TRM:</span> %%TRM0%% % of final
   </div>
 
   <div id="plot"></div>
 </div>
+"""
 
-<script>
-/* --- Physics constants --- */
-var kB = 1.380649e-23;
-var tau0 = 1e-9;
-var Tc_K = 853;        /* magnetite Curie temperature in K */
-var gamma = 0.38;
-var Troom_K = 293.15;
-var ms_room = Math.pow(1 - Troom_K / Tc_K, gamma);
-
+script = r"""
 /* Grain population ellipse (reference at room temperature) */
 var refCx = 1.3, refCy = 0.19;   /* kJ/m³, zm³ */
 var ellW = 1.6, ellH = 0.30;
 
+/* TRM (% of final) at each temperature, from the Monte Carlo population */
+var trmPct = %%TRM%%;
+
 /* --- Temperature steps: 20 to 560 °C in steps of 10 --- */
 var temps = [];
 for (var t = 20; t <= 560; t += 10) temps.push(t);
@@ -168,13 +94,11 @@ for (var i = 0; i < nK; i++) {
 /* --- Ellipse angular coords (constant) --- */
 var nE = 200;
 var cosTheta = new Array(nE);
-var sinTheta = new Array(nE);
 var ey_base = new Array(nE);      /* ey never changes */
 for (var i = 0; i < nE; i++) {
   var th = 2 * Math.PI * i / (nE - 1);
   cosTheta[i] = Math.cos(th);
-  sinTheta[i] = Math.sin(th);
-  ey_base[i] = refCy + (ellH / 2) * sinTheta[i];
+  ey_base[i] = refCy + (ellH / 2) * Math.sin(th);
 }
 
 /* --- Reference tau values --- */
@@ -184,40 +108,10 @@ var tauDefs = [
   {label: '4.5 Gyr', val: 4.5e9 * 3.15e7, color: '#D55E00', dash: 'solid', w: 2.5}
 ];
 
-/* --- Helper functions --- */
-function msRatio(T_K) {
-  if (T_K >= Tc_K) return 0;
-  return Math.pow(1 - T_K / Tc_K, gamma) / ms_room;
-}
-
-function calcV(tau, T_K, kj) {
-  /* V in zm³ for a single K value in J/m³ */
-  return (kB * T_K * Math.log(tau / tau0)) / Math.max(kj, 1e-5) * 1e21;
-}
-
-function interp(x_new, x_arr, y_arr) {
-  /* Linear interpolation; x_arr must be sorted ascending */
-  var n = x_new.length, nArr = x_arr.length;
-  var result = new Array(n);
-  for (var i = 0; i < n; i++) {
-    var xn = x_new[i];
-    if (xn <= x_arr[0])       { result[i] = y_arr[0]; continue; }
-    if (xn >= x_arr[nArr - 1]){ result[i] = y_arr[nArr - 1]; continue; }
-    var lo = 0, hi = nArr - 1;
-    while (hi - lo > 1) {
-      var mid = (lo + hi) >> 1;
-      if (x_arr[mid] <= xn) lo = mid; else hi = mid;
-    }
-    var frac = (xn - x_arr[lo]) / (x_arr[hi] - x_arr[lo]);
-    result[i] = y_arr[lo] + frac * (y_arr[hi] - y_arr[lo]);
-  }
-  return result;
-}
-
 /* --- Compute one frame at temperature T_C (°C) --- */
 function computeFrame(T_C) {
   var T_K = T_C + 273.15;
-  var msr = msRatio(T_K);
+  var msr = Widget.msRatio(T_K);
   var sf = msr * msr;            /* K ∝ Ms² */
 
   var cx = refCx * sf;
@@ -227,42 +121,25 @@ function computeFrame(T_C) {
   var ex = new Array(nE);
   for (var i = 0; i < nE; i++) ex[i] = cx + (w / 2) * cosTheta[i];
 
-  /* tau = 100 s boundary at this temperature */
-  var bnd = new Array(nK);
-  for (var i = 0; i < nK; i++)
-    bnd[i] = Math.min(Math.max(calcV(100, T_K, K_J[i]), 0), 0.5);
+  /* Reference tau curves at this temperature; the first (tau = 100 s)
+     is the blocking boundary */
+  var refs = tauDefs.map(function(d) { return Widget.vCurve(d.val, T_K, K_J, 0.5); });
 
   /* Boundary interpolated at ellipse x positions */
-  var v_at_ex = interp(ex, K_kJ, bnd);
+  var v_at_ex = Widget.interp(ex, K_kJ, refs[0]);
 
-  /* SSD / blocked (above boundary) */
-  var ssd_y = new Array(nE);
-  for (var i = 0; i < nE; i++)
+  /* SSD / blocked (above boundary), SP / unblocked (below boundary) */
+  var ssd_y = new Array(nE), sp_y = new Array(nE);
+  for (var i = 0; i < nE; i++) {
     ssd_y[i] = Math.min(Math.max(ey_base[i], v_at_ex[i]), 0.6);
-
-  /* SP / unblocked (below boundary) */
-  var sp_y = new Array(nE);
-  for (var i = 0; i < nE; i++)
     sp_y[i] = Math.min(ey_base[i], v_at_ex[i]);
-
-  /* Reference tau curves at this temperature */
-  var refs = [];
-  for (var t = 0; t < tauDefs.length; t++) {
-    var rv = new Array(nK);
-    for (var i = 0; i < nK; i++)
-      rv[i] = Math.min(Math.max(calcV(tauDefs[t].val, T_K, K_J[i]), 0), 0.5);
-    refs.push(rv);
   }
 
   return {ex: ex, ssd_y: ssd_y, sp_y: sp_y, refs: refs, msr: msr};
 }
 
 /* --- Initial state (560 °C) --- */
-var initIdx = temps.length - 1;
-var init = computeFrame(temps[initIdx]);
-
-var ff = 'Source Serif 4, Georgia, serif';
-var gridC = '#e8e6e1', axC = '#334155';
+var init = computeFrame(temps[temps.length - 1]);
 
 /* --- Traces ---
    0: SSD fill (gold)        – dynamic (x & y)
@@ -295,116 +172,47 @@ for (var t = 0; t < tauDefs.length; t++) {
   });
 }
 
-var layout = {
-  width: 600, height: 390,
-  margin: {l: 68, r: 24, t: 10, b: 50},
-  paper_bgcolor: 'transparent',
-  plot_bgcolor: '#fff',
-  font: {family: ff, size: 12, color: '#1e293b'},
-
-  xaxis: {
-    title: {text: 'Anisotropy Energy Density (kJ/m\u00B3)', font: {size: 13}},
-    range: [0, 4],
-    showgrid: true, gridcolor: gridC, gridwidth: 1,
-    zeroline: false, linecolor: axC, linewidth: 1.5, mirror: true,
-    ticks: 'inside', ticklen: 5,
-    tickfont: {family: ff, size: 11}
-  },
-  yaxis: {
-    title: {text: 'Grain Volume (zm\u00B3)', font: {size: 13}},
-    range: [0, 0.48],
-    showgrid: true, gridcolor: gridC, gridwidth: 1,
-    zeroline: false, linecolor: axC, linewidth: 1.5, mirror: true,
-    ticks: 'inside', ticklen: 5,
-    tickfont: {family: ff, size: 11}
-  },
-
-  legend: {
-    bgcolor: 'rgba(255,255,255,0.92)',
-    bordercolor: '#d6d3cd', borderwidth: 1,
-    font: {size: 11},
-    x: 0.98, y: 0.98, xanchor: 'right', yanchor: 'top',
-    borderpad: 6
-  },
-
+Widget.plot('plot', traces, Widget.layout({
+  xaxis: Widget.axis('Anisotropy Energy Density (kJ/m\u00B3)', {range: [0, 4]}),
+  yaxis: Widget.axis('Grain Volume (zm\u00B3)', {range: [0, 0.48]}),
   annotations: [
-    {x: 0.2, y: 0.05, text: 'Superparamagnetic<br>(unblocked)',
-     showarrow: false, font: {size: 12, color: '#0072B2', family: ff},
-     bgcolor: 'rgba(255,255,255,0.85)', borderpad: 2},
-    {x: 2.8, y: 0.30, text: 'Blocked<br>(TRM acquired)',
-     showarrow: false, font: {size: 12, color: '#B8860B', family: ff},
-     bgcolor: 'rgba(255,255,255,0.85)', borderpad: 2}
-  ],
-
-  hovermode: 'closest'
-};
-
-Plotly.newPlot('plot', traces, layout, {displayModeBar: false, responsive: true});
+    Widget.note(0.2, 0.05, 'Superparamagnetic<br>(unblocked)', '#0072B2'),
+    Widget.note(2.8, 0.30, 'Blocked<br>(TRM acquired)', '#B8860B')
+  ]
+}));
 
 /* --- Interactivity --- */
-var slider  = document.getElementById('tSlider');
-var tValEl  = document.getElementById('tVal');
+var tValEl   = document.getElementById('tVal');
 var statusEl = document.getElementById('status');
-var btnPlay  = document.getElementById('btnPlay');
-var btnReset = document.getElementById('btnReset');
-
-function updateToIdx(idx) {
-  var T_C = temps[idx];
-  var f = computeFrame(T_C);
-
-  Plotly.restyle('plot',
-    {x: [f.ex, f.ex, f.ex], y: [f.ssd_y, f.sp_y, ey_base]}, [0, 1, 2]);
-  Plotly.restyle('plot',
-    {y: [f.refs[0], f.refs[1], f.refs[2]]}, [3, 4, 5]);
-
-  tValEl.textContent = T_C + ' \u00B0C';
-  slider.value = idx;
-  statusEl.innerHTML =
-    '<span class="lbl">Temperature:</span> ' + T_C + ' \u00B0C' +
-    ' &nbsp;|&nbsp; <span class="lbl">M<sub>s</sub>/M<sub>s\u2080</sub>:</span> ' +
-    f.msr.toFixed(2);
-}
-
-slider.addEventListener('input', function() {
-  updateToIdx(parseInt(this.value));
-});
-
-var playing = false, playTimer = null;
-
-function stopPlay() {
-  playing = false;
-  clearInterval(playTimer);
-  btnPlay.innerHTML = '&#9654; Cool';
-  btnPlay.classList.remove('active');
-}
-
-btnPlay.addEventListener('click', function() {
-  if (playing) { stopPlay(); return; }
-  playing = true;
-  btnPlay.innerHTML = '&#9646;&#9646; Pause';
-  btnPlay.classList.add('active');
-  var idx = parseInt(slider.value);
-  playTimer = setInterval(function() {
-    idx--;
-    if (idx < 0) { stopPlay(); return; }
-    updateToIdx(idx);
-  }, 200);
-});
 
-btnReset.addEventListener('click', function() {
-  stopPlay();
-  updateToIdx(temps.length - 1);
+Widget.player({
+  slider: 'tSlider', play: 'btnPlay', reset: 'btnReset',
+  label: 'Cool', step: -1, interval: 200,
+  show: function(idx) {
+    var T_C = temps[idx];
+    var f = computeFrame(T_C);
+
+    Plotly.restyle('plot',
+      {x: [f.ex, f.ex, f.ex], y: [f.ssd_y, f.sp_y, ey_base]}, [0, 1, 2]);
+    Plotly.restyle('plot',
+      {y: [f.refs[0], f.refs[1], f.refs[2]]}, [3, 4, 5]);
+
+    tValEl.textContent = T_C + ' \u00B0C';
+    statusEl.innerHTML =
+      '<span class="lbl">Temperature:</span> ' + T_C + ' \u00B0C' +
+      ' &nbsp;|&nbsp; <span class="lbl">M<sub>s</sub>/M<sub>s\u2080</sub>:</span> ' +
+      f.msr.toFixed(2) +
+      ' &nbsp;|&nbsp; <span class="lbl">TRM:</span> ' + trmPct[idx] + ' % of final';
+  }
 });
-</script>
-</body>
-</html>"""
+"""
 
 # --- Write output ---
-output_path = '../book/figures/chapter7/trm_widget.html'
-os.makedirs(os.path.dirname(output_path), exist_ok=True)
-with open(output_path, 'w') as f:
-    f.write(html_content)
+body = body.replace('%%TRM0%%', str(trm_pct[-1]))
+script = script.replace('%%TRM%%', json.dumps(trm_pct, separators=(',', ':')))
+output_path = write_page('../book/figures/chapter7/trm_widget.html',
+                         'TRM Acquisition: Cooling from Curie Temperature', body, script)
 
-sz = os.path.getsize(output_path)
+sz = output_path.stat().st_size
 print(f"Written to {output_path}")
 print(f"File size: {sz / 1e3:.0f} KB")
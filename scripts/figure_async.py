@@ -0,0 +1,158 @@
+"""
+Asyncio orchestration of external conversion commands.
+
+An alternative to running one blocking subprocess.run() per figure on a
+thread pool. All commands run from one event loop with:
+
+- a semaphore limiting how many run at once (--jobs)
+- a per-command timeout, after which the process is killed
+- streamed output: each process's stdout/stderr is read line by line as it
+  is written and only the last LOG_TAIL lines are kept for the report, so a
+  chatty Ghostscript never fills memory
+- clean cancellation: each command writes to a `.part` file that is renamed
+  into place only when it succeeds; on failure, timeout or Ctrl-C the
+  process is killed and the partial file removed
+
+Used by the Ghostscript backend's --async mode (ghostscript_backend.py).
+
+Usage:
+    from figure_async import Job, run_jobs
+
+    jobs = [Job("magnetite", ["gs", ..., f"-sOutputFile={part}", ...], png_path, part)]
+    for ok, messages in run_jobs(jobs, concurrency=8, timeout=120):
+        ...
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from pathlib import Path
+
+import figure_profile
+
+# Output lines kept per command for the report
+LOG_TAIL = 20
+
+
+class Job:
+    """One external command that produces one output file.
+
+    Args:
+        name: Name used in messages and the profile (e.g. the figure stem)
+        cmd: Command line; it must write to `partial`
+        output: Final output file
+        partial: Where the command writes; renamed to `output` on success
+            (default: `output` with ".part" appended)
+        stage: Stage name for figure_profile
+    """
+
+    def __init__(self, name: str, cmd, output: Path, partial: Path = None, stage: str = ""):
+        self.name = name
+        self.cmd = [str(arg) for arg in cmd]
+        self.output = Path(output)
+        self.partial = Path(partial) if partial else partial_path(self.output)
+        self.stage = stage or name
+
+
+def partial_path(output: Path) -> Path:
+    """The `.part` file a Job for `output` writes to by default."""
+    return Path(output).with_name(Path(output).name + ".part")
+
+
+async def _drain(stream, tail: deque):
+    async for line in stream:
+        tail.append(line.decode(errors="replace").rstrip())
+
+
+async def _kill(proc):
+    """Kill `proc` if it is running and reap it, even if cancelled meanwhile.
+
+    Returns:
+        Whether a cancellation arrived while waiting (the caller re-raises it
+        once its own cleanup is done)
+    """
+    if proc.returncode is None:
+        proc.kill()
+    try:
+        await asyncio.shield(proc.wait())
+    except asyncio.CancelledError:
+        await proc.wait()
+        return True
+    return False
+
+
+async def run_job(job: Job, semaphore: asyncio.Semaphore, timeout: float = None):
+    """Run one Job under `semaphore`.
+
+    Returns:
+        Tuple of (success, list of report lines)
+    """
+    async with semaphore:
+        started = time.perf_counter()
+        tail = deque(maxlen=LOG_TAIL)
+        ok = False
+        proc = None
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *job.cmd, stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+            )
+            try:
+                await asyncio.wait_for(asyncio.gather(_drain(proc.stdout, tail), proc.wait()),
+                                       timeout)
+            except asyncio.TimeoutError:
+                return False, [f"  FAILED: {job.name} timed out after {timeout:g} s"]
+
+            if proc.returncode != 0:
+                detail = tail[-1] if tail else f"exit code {proc.returncode}"
+                return False, [f"  FAILED: {detail}"]
+            if not job.partial.exists():
+                return False, [f"  FAILED: {job.name} wrote no output"]
+            os.replace(job.partial, job.output)
+            ok = True
+            return True, []
+        except OSError as e:
+            return False, [f"  FAILED: {e}"]
+        finally:
+            # Also runs on cancellation (Ctrl-C): never leave a process or a
+            # half-written file behind
+            cancelled = await _kill(proc) if proc is not None else False
+            if not ok and job.partial.exists():
+                job.partial.unlink()
+            if proc is not None:
+                with figure_profile.figure(job.name):
+                    figure_profile.record(job.stage, time.perf_counter() - started, pid=proc.pid)
+            if cancelled:
+                raise asyncio.CancelledError
+
+
+async def _run_all(jobs, concurrency: int, timeout: float = None):
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.create_task(run_job(job, semaphore, timeout)) for job in jobs]
+    try:
+        return await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        # gather() has cancelled the jobs; let them finish cleaning up
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def run_jobs(jobs, concurrency: int = 1, timeout: float = None):
+    """Run Jobs concurrently and wait for all of them.
+
+    On Ctrl-C every running process is killed, partial outputs are removed
+    and KeyboardInterrupt is raised.
+
+    Args:
+        jobs: Job objects
+        concurrency: Most commands running at once
+        timeout: Seconds each command may run, or None for no limit
+
+    Returns:
+        List of (success, report lines), in the order of `jobs`
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    return asyncio.run(_run_all(jobs, concurrency, timeout))
@@ -0,0 +1,455 @@
+"""
+Figure-build engine shared by the EPS figure converters.
+
+A backend describes how one figure is built as a chain of stages, each
+producing one file from its inputs, for example:
+
+    ghostscript:  EPS --(png)--> PNG
+    inkscape:     EPS --(svg)--> SVG --(png)--> PNG
+
+The engine plans every figure against the build manifest (figure_cache.py)
+as a dependency graph. A stage runs when its output is missing or stale, or
+when a stage it depends on runs. Editing an SVG therefore only reruns the PNG
+stage, and changing an EPS reruns the whole chain. The engine then hands the
+stale stages to the backend, post-processes the PNGs (figure_postprocess.py),
+compares them with the committed PNGs (figure_diff.py; a PNG whose pixels
+did not visibly change is restored byte for byte), records the results in
+the manifest and writes the responsive variants
+(figure_variants.py). Backends with an SVG source can also publish line-art
+figures as SVG (figure_vector.py).
+
+With --profile PATH every stage of every figure is timed, child processes'
+peak memory is recorded, and the trace is written to PATH (CSV for a .csv
+name, JSON otherwise) with a summary of the slowest figures and stages
+(figure_profile.py).
+
+Which figures to build, and the chapter folder each one goes to, come from
+the figure registry (figure_registry.py), which scans the chapters. Only
+figures the book references are built.
+
+convert_figures.py (ghostscript_backend.py) and convert_figures_inkscape.py
+(inkscape_backend.py) are thin command-line wrappers around main().
+
+A backend is a class with:
+
+    name                     Short name used in messages
+    add_arguments(group)     (static) Add backend-specific options
+    __init__(args)
+    produces_raster          Whether any stage writes a PNG
+    check()                  Check external tools; print why not and return False
+    stages(figure)           The Figure's Stage list, in dependency order
+    run(work, jobs)          Run [(figure, stage names)], yielding (ok, report lines)
+                             for each item in order
+    summary(figures)         Report lines printed after the totals
+
+and optionally:
+
+    vector                   Whether to publish figures as SVG (figure_vector.py)
+    vector_source(figure)    The SVG to publish the figure from
+
+Usage:
+    from figure_build import main
+    from ghostscript_backend import GhostscriptBackend
+
+    main(GhostscriptBackend, description="Convert EPS figures to PNG")
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import figure_diff
+import figure_postprocess
+import figure_profile
+import figure_variants
+import figure_vector
+from figure_cache import BuildManifest
+from figure_registry import (
+    EPS_DIR, FIGURES_DIR, chapter_dir_name, chapter_figures, figure_chapters, parse_chapter,
+)
+
+
+class Figure:
+    """A figure to build.
+
+    Args:
+        stem: Figure name without extension (e.g. "magnetite")
+        dir_name: Chapter folder it belongs to (e.g. "chapter4"), or None
+        png_dir: Directory for its PNG
+    """
+
+    def __init__(self, stem: str, dir_name: str = None, png_dir: Path = FIGURES_DIR):
+        self.stem = stem
+        self.dir_name = dir_name
+        self.png_dir = Path(png_dir)
+
+
+class Stage:
+    """One step of a figure's build.
+
+    Args:
+        name: Stage name (e.g. "svg", "png")
+        output: File the stage writes
+        inputs: Files the output is built from; inputs that are not the output
+            of an earlier stage are sources and must exist
+        params: Everything besides the inputs that affects the output
+        editable: The output may be edited by hand, so it is kept (and not
+            rebuilt) when it no longer matches what the build last wrote
+        raster: The output is a PNG for post-processing and variants
+    """
+
+    def __init__(self, name: str, output: Path, inputs, params: dict,
+                 editable: bool = False, raster: bool = False):
+        self.name = name
+        self.output = Path(output)
+        self.inputs = [Path(p) for p in inputs]
+        self.params = params
+        self.editable = editable
+        self.raster = raster
+
+
+def missing_sources(stages):
+    """Source files (inputs no stage produces) that do not exist."""
+    produced = {stage.output for stage in stages}
+    return [p for stage in stages for p in stage.inputs
+            if p not in produced and not p.exists()]
+
+
+def plan_stages(manifest: BuildManifest, stages, force: bool = False):
+    """Decide which stages of one figure need to run.
+
+    A stage runs if it is forced, its output is missing, a stage producing
+    one of its inputs runs, or the manifest says its output is stale.
+    Editable outputs that predate the manifest are adopted and kept, and
+    ones edited since they were built are kept with a note (--force
+    overwrites both).
+
+    Returns:
+        Tuple of (names of the stages to run, report lines to print)
+    """
+    producer = {stage.output: stage.name for stage in stages}
+    run = []
+    notes = []
+
+    for stage in stages:
+        upstream = {producer[p] for p in stage.inputs if p in producer}
+        if force or not stage.output.exists() or upstream & set(run):
+            run.append(stage.name)
+            continue
+        if manifest.is_current(stage.output, stage.inputs, stage.params):
+            continue
+        if stage.editable:
+            if not manifest.is_tracked(stage.output):
+                # Pre-existing output of unknown provenance: keep it as-is
+                manifest.adopt(stage.output, stage.inputs, stage.params)
+                continue
+            if manifest.is_modified(stage.output):
+                notes.append(f"  KEEP (hand-edited {stage.output.suffix[1:].upper()}, "
+                             f"input changed; use --force to regenerate): {stage.output.name}")
+                continue
+        run.append(stage.name)
+
+    return tuple(run), notes
+
+
+def describe_dirs(label: str, dirs) -> str:
+    """One summary line naming the directory (or directories) written to."""
+    dirs = list(dict.fromkeys(Path(d) for d in dirs))
+    if len(dirs) == 1:
+        return f"{label} directory: {dirs[0]}"
+    return f"{label} directories: {len(dirs)} under {os.path.commonpath(dirs)}"
+
+
+def build(backend, figures, manifest: BuildManifest, force: bool = False, jobs: int = 1,
+          postprocess: dict = None, variant_widths=None, diff_threshold: float = None):
+    """Bring the given figures up to date with `backend`.
+
+    Args:
+        backend: Backend instance (see the module docstring)
+        figures: Figure objects to build
+        manifest: Build manifest used for planning; updated in place
+        force: Rebuild every stage regardless of the manifest
+        jobs: Number of figures to process in parallel
+        postprocess: Options for figure_postprocess (max_bytes, colors), or
+            None to keep the raw PNGs
+        variant_widths: Widths for figure_variants, or None for no variants
+        diff_threshold: Compare new PNGs with the committed ones, keeping
+            the committed file when at most this fraction of pixels changed
+            (figure_diff), or None to skip the comparison. Comparisons that
+            fail, and figures whose aspect ratio changed, count as failed
+
+    Returns:
+        Tuple of (converted, up to date, failed) figure counts
+    """
+    converted = 0
+    up_to_date = 0
+    failed = 0
+
+    # Plan in the parent so only stale figures are sent to the backend and
+    # the manifest has a single writer
+    pp_params = figure_postprocess.postprocess_params(**postprocess) if postprocess else None
+    work = []
+    rasters = []
+    for figure in figures:
+        stages = backend.stages(figure)
+        for stage in stages:
+            if stage.raster:
+                stage.params = dict(stage.params, postprocess=pp_params)
+
+        missing = missing_sources(stages)
+        if missing:
+            print(f"  SKIP (not found): {missing[0].name}")
+            failed += 1
+            continue
+
+        run, notes = plan_stages(manifest, stages, force)
+        for line in notes:
+            print(line)
+        if not run:
+            if not notes:
+                print(f"  Up to date: {figure.stem}")
+            up_to_date += 1
+            rasters += [(figure, s.output) for s in stages if s.raster and s.output.exists()]
+            continue
+        work.append((figure, [s for s in stages if s.name in run]))
+
+    # Record intermediate outputs as they arrive; PNGs are recorded once
+    # post-processing has finished with them
+    rendered = []
+    for figure, _ in work:
+        figure.png_dir.mkdir(parents=True, exist_ok=True)
+    results = backend.run([(figure, tuple(s.name for s in todo)) for figure, todo in work], jobs)
+    try:
+        for (figure, todo), (ok, messages) in zip(work, results):
+            for line in messages:
+                print(line)
+            if not ok:
+                failed += 1
+                continue
+            for stage in todo:
+                if not stage.raster:
+                    manifest.record(stage.output, stage.inputs, stage.params)
+            raster = [stage for stage in todo if stage.raster]
+            if raster:
+                rendered.append((figure, raster[-1]))
+            else:
+                converted += 1
+    finally:
+        results.close()
+
+    if postprocess and rendered:
+        ok_list = figure_postprocess.postprocess_files(
+            [stage.output for _, stage in rendered], postprocess["max_bytes"],
+            postprocess["colors"], jobs,
+        )
+    else:
+        ok_list = [True] * len(rendered)
+
+    if diff_threshold is not None:
+        results = figure_diff.verify_files(
+            [stage.output for (_, stage), ok in zip(rendered, ok_list) if ok], diff_threshold, jobs,
+        )
+        # A reshaped figure no longer fits the layout it was sized for (a
+        # plain resize, e.g. a new --dpi, is only reported). Rejected figures
+        # are neither recorded nor counted as converted, so the next run
+        # renders them again
+        rejected = {
+            path for path, result in results.items() if result["status"] in ("failed", "reshaped")
+        }
+        ok_list = [ok and Path(stage.output) not in rejected
+                   for (_, stage), ok in zip(rendered, ok_list)]
+        if rejected:
+            print(f"  Diff: {len(rejected)} figure(s) failed the comparison or changed aspect ratio")
+
+    for (figure, stage), ok in zip(rendered, ok_list):
+        if ok:
+            manifest.record(stage.output, stage.inputs, stage.params)
+            rasters.append((figure, stage.output))
+            converted += 1
+        else:
+            failed += 1
+
+    if variant_widths:
+        _, variants_failed = figure_variants.build_variants(
+            manifest, [png for _, png in rasters], variant_widths, jobs, force,
+        )
+        failed += variants_failed
+
+    if getattr(backend, "vector", False):
+        _, vector_failed = figure_vector.build_vectors(
+            manifest, [(backend.vector_source(figure), png) for figure, png in rasters], jobs, force,
+        )
+        failed += vector_failed
+
+    return converted, up_to_date, failed
+
+
+def build_parser(backend_class, description: str):
+    """Argument parser with the shared options plus the backend's own."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--chapter", "-c",
+        help="Chapter number (1-16) or 'appendix' to convert"
+    )
+    parser.add_argument(
+        "--all", action="store_true", help="Convert every figure the book references"
+    )
+    parser.add_argument("--files", nargs="+", help="Specific EPS files to convert")
+    parser.add_argument(
+        "--output-dir", "-o", type=Path,
+        help="PNG output directory (default: the figure's book/figures/chapter<N>/)"
+    )
+    parser.add_argument("--dpi", type=int, default=300, help="Resolution (default: 300)")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1,
+        help="Number of figures to convert in parallel (default: 1)"
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Reconvert figures even if they are up to date (overwrites hand-edited files)"
+    )
+    parser.add_argument(
+        "--no-postprocess", action="store_true",
+        help="Skip flattening, downscaling and recompressing the PNGs"
+    )
+    parser.add_argument(
+        "--max-bytes", type=int, default=figure_postprocess.MAX_BYTES,
+        help=f"Downscale PNGs larger than this (default: {figure_postprocess.MAX_BYTES})"
+    )
+    parser.add_argument(
+        "--colors", type=int,
+        help="Quantize PNGs with more than 256 colours to this many (lossy)"
+    )
+    parser.add_argument(
+        "--variants", action="store_true",
+        help="Also write responsive WebP/AVIF width variants (see figure_variants.py)"
+    )
+    parser.add_argument(
+        "--variant-widths", type=int, nargs="+", default=list(figure_variants.DEFAULT_WIDTHS),
+        help="Widths in pixels for --variants (default: 480 960 1920)"
+    )
+    parser.add_argument(
+        "--no-diff", action="store_true",
+        help="Skip comparing new PNGs with the committed ones (see figure_diff.py)"
+    )
+    parser.add_argument(
+        "--diff-threshold", type=float, default=figure_diff.DIFF_THRESHOLD,
+        help="Keep the committed PNG when at most this fraction of pixels visibly changed "
+             f"(default: {figure_diff.DIFF_THRESHOLD})"
+    )
+    parser.add_argument(
+        "--profile", type=Path, metavar="PATH",
+        help="Write per-stage timings and peak child memory to PATH (.csv or .json) "
+             "and print the slowest figures and stages"
+    )
+    backend_class.add_arguments(parser.add_argument_group(f"{backend_class.name} options"))
+    return parser
+
+
+def main(backend_class, description: str = "Convert EPS figures to PNG"):
+    """Command-line entry point for a converter using `backend_class`."""
+    parser = build_parser(backend_class, description)
+    args = parser.parse_args()
+
+    if not args.chapter and not args.all and not args.files:
+        parser.print_help()
+        print("\nERROR: Must specify --chapter <N>, --all, or --files <file1.eps ...>")
+        sys.exit(1)
+
+    if args.jobs < 1:
+        print(f"ERROR: --jobs must be at least 1 (got {args.jobs})")
+        sys.exit(1)
+
+    if args.colors is not None and not 2 <= args.colors <= 256:
+        print(f"ERROR: --colors must be between 2 and 256 (got {args.colors})")
+        sys.exit(1)
+
+    if not 0 <= args.diff_threshold < 1:
+        print(f"ERROR: --diff-threshold must be at least 0 and below 1 (got {args.diff_threshold})")
+        sys.exit(1)
+
+    chapter_key = None
+    if args.chapter:
+        try:
+            chapter_key = parse_chapter(args.chapter)
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+
+    backend = backend_class(args)
+    if not backend.check():
+        sys.exit(1)
+
+    postprocess = not args.no_postprocess and backend.produces_raster
+    variants = args.variants and backend.produces_raster
+    diff = not args.no_diff and backend.produces_raster
+    if (postprocess or variants or diff) and not figure_postprocess.check_pillow():
+        sys.exit(1)
+
+    if not EPS_DIR.exists():
+        print(f"ERROR: EPS directory not found: {EPS_DIR}")
+        print("Make sure the original textbook repo is at ../Essentials-of-Paleomagnetism/")
+        sys.exit(1)
+
+    # Determine figures to convert, as (chapter key, stem) pairs
+    registry = chapter_figures()
+    if args.files:
+        chapter_of = figure_chapters()
+        selected = [(chapter_of.get(Path(f).stem), Path(f).stem) for f in args.files]
+    elif args.all:
+        selected = [(key, stem) for key, stems in registry.items() for stem in stems]
+    else:
+        selected = [(chapter_key, stem) for stem in registry.get(chapter_key, [])]
+
+    figures = []
+    seen = set()
+    for key, stem in selected:
+        # Drop repeated names so two workers never write the same output file
+        if stem in seen:
+            continue
+        seen.add(stem)
+        dir_name = chapter_dir_name(key) if key is not None else None
+        if args.output_dir:
+            png_dir = args.output_dir
+        elif dir_name:
+            png_dir = FIGURES_DIR / dir_name
+        else:
+            png_dir = FIGURES_DIR
+        figures.append(Figure(stem, dir_name, png_dir))
+
+    # Referenced figures that were never EPS files (plots made by the
+    # scripts in this repo, photos) are not ours to convert
+    if not args.files:
+        convertible = [f for f in figures if not missing_sources(backend.stages(f))]
+        skipped = len(figures) - len(convertible)
+        if skipped:
+            print(f"  Skipping {skipped} referenced figure(s) with no source file to convert")
+        figures = convertible
+
+    if args.profile:
+        trace_path = args.profile.with_name(args.profile.name + ".trace")
+        figure_profile.enable(trace_path)
+
+    manifest = BuildManifest()
+    try:
+        converted, up_to_date, failed = build(
+            backend, figures, manifest, force=args.force, jobs=args.jobs,
+            postprocess={"max_bytes": args.max_bytes, "colors": args.colors} if postprocess else None,
+            variant_widths=args.variant_widths if variants else None,
+            diff_threshold=args.diff_threshold if diff else None,
+        )
+    finally:
+        manifest.save()
+
+    print(f"\nDone: {converted} converted, {up_to_date} up to date, {failed} failed")
+    for line in backend.summary(figures):
+        print(line)
+
+    if args.profile:
+        figure_profile.disable()
+        events = figure_profile.load(trace_path)
+        trace_path.unlink()
+        figure_profile.write(events, args.profile)
+        figure_profile.summarize(events)
+        print(f"\nProfile: {args.profile} ({len(events)} events)")
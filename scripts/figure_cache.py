@@ -0,0 +1,156 @@
+"""
+Incremental build manifest for the EPS figure converters.
+
+Both convert_figures.py and convert_figures_inkscape.py record every file
+they generate here, together with the content hashes of its inputs and the
+conversion parameters (dpi, fontmap, font replacements, tool versions) that
+produced it. On the next run an output whose inputs and parameters are
+unchanged is skipped.
+
+File hashes are cached against (size, mtime), so checking an unchanged
+figure costs one stat() per file rather than a full read.
+
+Usage:
+    from figure_cache import BuildManifest, tool_version
+
+    manifest = BuildManifest()
+    params = {"dpi": 300, "gs": tool_version("gs")}
+    if not manifest.is_current(png_path, [eps_path], params):
+        convert(eps_path, png_path)
+        manifest.record(png_path, [eps_path], params)
+    manifest.save()
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+from functools import lru_cache
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+MANIFEST_PATH = PROJECT_ROOT / ".figure-cache.json"
+
+# Bump when the manifest layout changes; older manifests are discarded
+MANIFEST_VERSION = 1
+
+
+@lru_cache(maxsize=None)
+def tool_version(tool: str) -> str:
+    """Return the first line of `<tool> --version`, or "" if unavailable."""
+    try:
+        result = subprocess.run([tool, "--version"], capture_output=True, text=True)
+    except FileNotFoundError:
+        return ""
+    lines = result.stdout.strip().splitlines()
+    return lines[0] if lines else ""
+
+
+def params_key(params: dict) -> str:
+    """Stable digest of a conversion parameter dict."""
+    blob = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class BuildManifest:
+    """Persistent record of generated figures and what they were built from.
+
+    Args:
+        path: Location of the JSON manifest (default: .figure-cache.json
+            at the project root)
+    """
+
+    def __init__(self, path: Path = MANIFEST_PATH):
+        self.path = Path(path)
+        self._files = {}
+        self._outputs = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            if data.get("version") == MANIFEST_VERSION:
+                self._files = data.get("files", {})
+                self._outputs = data.get("outputs", {})
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return os.path.relpath(Path(path).resolve(), PROJECT_ROOT.resolve())
+
+    def file_hash(self, path: Path):
+        """SHA-256 of a file, re-read only when its size or mtime changed.
+
+        Returns None if the file does not exist.
+        """
+        key = self._key(path)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self._files.pop(key, None)
+            return None
+
+        cached = self._files.get(key)
+        if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+            return cached["sha256"]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        sha = digest.hexdigest()
+        self._files[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha}
+        return sha
+
+    def is_current(self, output: Path, inputs, params: dict) -> bool:
+        """Whether `output` exists and was built from these inputs and params."""
+        entry = self._outputs.get(self._key(output))
+        if entry is None or entry["params"] != params_key(params):
+            return False
+        if self.file_hash(output) is None:
+            return False
+        recorded = entry["inputs"]
+        if sorted(recorded) != sorted(self._key(p) for p in inputs):
+            return False
+        return all(self.file_hash(p) == recorded[self._key(p)] for p in inputs)
+
+    def is_tracked(self, output: Path) -> bool:
+        """Whether `output` has been recorded by a previous build."""
+        return self._key(output) in self._outputs
+
+    def is_modified(self, output: Path) -> bool:
+        """Whether a recorded output has been edited since it was built.
+
+        Adopted outputs (see adopt()) always count as modified.
+        """
+        entry = self._outputs.get(self._key(output))
+        if entry is None:
+            return False
+        sha = self.file_hash(output)
+        return sha is not None and sha != entry["sha256"]
+
+    def record(self, output: Path, inputs, params: dict):
+        """Record that `output` was just built from `inputs` with `params`."""
+        self._outputs[self._key(output)] = {
+            "inputs": {self._key(p): self.file_hash(p) for p in inputs},
+            "params": params_key(params),
+            "sha256": self.file_hash(output),
+        }
+
+    def adopt(self, output: Path, inputs, params: dict):
+        """Track a pre-existing output that this build did not produce.
+
+        Its content is not trusted to match the inputs, so it is reported as
+        modified from then on and never silently overwritten.
+        """
+        self._outputs[self._key(output)] = {
+            "inputs": {self._key(p): self.file_hash(p) for p in inputs},
+            "params": params_key(params),
+            "sha256": None,
+        }
+
+    def save(self):
+        """Write the manifest atomically."""
+        data = {"version": MANIFEST_VERSION, "files": self._files, "outputs": self._outputs}
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(data, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp_path, self.path)
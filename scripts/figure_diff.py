@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+"""
+Compare regenerated PNG figures with the versions committed to git.
+
+Each new PNG is decoded and compared with the committed file (HEAD) pixel
+by pixel. Both images get a small box blur, so sub-pixel anti-aliasing jitter
+between tool versions does not count. They are then converted to CIELAB,
+and a pixel counts as changed when its colour difference (Delta E 1976)
+exceeds the just-noticeable difference.
+
+- If no more than the threshold fraction of pixels changed (0.1% by
+  default), the committed file is restored byte for byte. Regenerating a
+  figure then leaves no near-identical binary for git to store.
+- Otherwise the new file is kept, and a heatmap of the changed pixels
+  (red over a faded copy of the new figure) is written to .figure-diffs/
+  for review. This is how font or layout regressions show up.
+
+Figures that are not committed yet, or whose pixel size changed, are kept
+as written. A change of pixel size alone (a new --dpi, or a post-processing
+downscale) is reported as "resized" for review; one that also changes the
+aspect ratio by more than ASPECT_TOLERANCE is reported as "reshaped", and
+the figure converters count it as failed.
+
+Both figure converters run this on every PNG they write (disable with
+--no-diff); it can also be run on PNGs in the working tree directly.
+
+Usage:
+    python scripts/figure_diff.py book/figures/chapter4/*.png            # Report only
+    python scripts/figure_diff.py --restore book/figures/chapter4/*.png  # Undo no-op changes
+    python scripts/convert_figures_inkscape.py --svg-to-png --chapter 4 --diff-threshold 0.01
+
+Requires Pillow and NumPy: `mamba install pillow numpy`
+"""
+
+import argparse
+import io
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DIFF_DIR = PROJECT_ROOT / ".figure-diffs"
+
+# Largest fraction of changed pixels treated as "no visible change"
+DIFF_THRESHOLD = 0.001
+
+# Delta E above which a pixel counts as changed (just-noticeable difference)
+JND = 2.3
+
+# Relative change of width / height above which a resize counts as reshaping
+ASPECT_TOLERANCE = 0.01
+
+# Box blur radius in pixels applied to both images before comparing
+BLUR_RADIUS = 1
+
+# Delta E at which the heatmap is fully red
+HEATMAP_SATURATION = 20.0
+
+# sRGB (D65) to CIE XYZ
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+
+def committed_versions(paths, root: Path = PROJECT_ROOT):
+    """The committed (HEAD) contents of files, read with one git process.
+
+    Returns:
+        Dict of {path: bytes}; files that are not committed, lie outside
+        the repository, or cannot be read because git is unavailable are
+        left out
+    """
+    root = Path(root).resolve()
+    names = {}
+    for path in paths:
+        try:
+            names[Path(path)] = Path(path).resolve().relative_to(root).as_posix()
+        except ValueError:
+            continue
+    if not names:
+        return {}
+
+    request = "".join(f"HEAD:{name}\n" for name in names.values()).encode()
+    try:
+        result = subprocess.run(["git", "-C", str(root), "cat-file", "--batch"],
+                                input=request, capture_output=True)
+    except FileNotFoundError:
+        return {}
+    if result.returncode != 0:
+        return {}
+
+    blobs = {}
+    out = result.stdout
+    pos = 0
+    for path in names:
+        end = out.index(b"\n", pos)
+        header = out[pos:end].split()
+        pos = end + 1
+        if len(header) != 3 or header[1] != b"blob":
+            continue
+        size = int(header[2])
+        blobs[path] = out[pos:pos + size]
+        pos += size + 1
+    return blobs
+
+
+def srgb_to_lab(rgb):
+    """CIELAB of an (H, W, 3) uint8 or float sRGB array."""
+    c = np.asarray(rgb, dtype=np.float64) / 255
+    linear = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _RGB_TO_XYZ.T / _WHITE
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([
+        116 * f[..., 1] - 16,
+        500 * (f[..., 0] - f[..., 1]),
+        200 * (f[..., 1] - f[..., 2]),
+    ], axis=-1)
+
+
+def box_blur(array, radius: int):
+    """Mean over a (2r+1)^2 window (edges padded), via cumulative sums."""
+    if radius <= 0:
+        return np.asarray(array, dtype=np.float64)
+    size = 2 * radius + 1
+    padded = np.pad(np.asarray(array, dtype=np.float64),
+                    [(radius, radius), (radius, radius)] + [(0, 0)] * (array.ndim - 2), mode="edge")
+    summed = padded.cumsum(axis=0).cumsum(axis=1)
+    summed = np.pad(summed, [(1, 0), (1, 0)] + [(0, 0)] * (array.ndim - 2))
+    window = (summed[size:, size:] - summed[:-size, size:]
+              - summed[size:, :-size] + summed[:-size, :-size])
+    return window / size ** 2
+
+
+def delta_e(old_rgb, new_rgb, blur: int = BLUR_RADIUS):
+    """Per-pixel Delta E 1976 between two equally sized sRGB arrays."""
+    old_lab = srgb_to_lab(box_blur(old_rgb, blur))
+    new_lab = srgb_to_lab(box_blur(new_rgb, blur))
+    return np.sqrt(((old_lab - new_lab) ** 2).sum(axis=-1))
+
+
+def _rgb(image):
+    return np.asarray(image.convert("RGB"))
+
+
+def heatmap(new_rgb, delta):
+    """Changed pixels in red over a faded greyscale copy of the new figure."""
+    grey = new_rgb @ np.array([0.299, 0.587, 0.114])
+    base = 255 - 0.3 * (255 - grey)
+    weight = np.clip(delta / HEATMAP_SATURATION, 0, 1) * (delta > JND)
+    out = np.stack([
+        base + weight * (255 - base),
+        base * (1 - weight),
+        base * (1 - weight),
+    ], axis=-1)
+    return Image.fromarray(out.round().astype(np.uint8), "RGB")
+
+
+def compare_png(png_path: Path, committed: bytes, threshold: float = DIFF_THRESHOLD,
+                restore: bool = True, diff_dir: Path = DIFF_DIR):
+    """Compare a PNG with its committed version.
+
+    Args:
+        png_path: Newly written PNG
+        committed: Contents of the committed PNG
+        threshold: Largest fraction of changed pixels treated as unchanged
+        restore: Write the committed bytes back when below the threshold
+        diff_dir: Where heatmaps go (mirroring the path under the repository)
+
+    Returns:
+        Dict with "status" ("identical", "unchanged", "changed", "resized"
+        or "reshaped"), and for compared images "changed" (fraction of pixels),
+        "max_delta" and, if written, "heatmap"
+    """
+    png_path = Path(png_path)
+    new_bytes = png_path.read_bytes()
+    if new_bytes == committed:
+        return {"status": "identical"}
+
+    with Image.open(io.BytesIO(committed)) as old_image, Image.open(png_path) as new_image:
+        if old_image.size != new_image.size:
+            (old_w, old_h), (new_w, new_h) = old_image.size, new_image.size
+            reshaped = abs((new_w / new_h) / (old_w / old_h) - 1) > ASPECT_TOLERANCE
+            return {"status": "reshaped" if reshaped else "resized",
+                    "old_size": old_image.size, "new_size": new_image.size}
+        old_rgb, new_rgb = _rgb(old_image), _rgb(new_image)
+
+    delta = delta_e(old_rgb, new_rgb)
+    result = {"changed": float((delta > JND).mean()), "max_delta": float(delta.max())}
+    if result["changed"] <= threshold:
+        if restore:
+            tmp_path = png_path.with_name(png_path.name + ".tmp")
+            tmp_path.write_bytes(committed)
+            os.replace(tmp_path, png_path)
+        return dict(result, status="unchanged")
+
+    try:
+        relative = png_path.resolve().relative_to(PROJECT_ROOT.resolve())
+    except ValueError:
+        relative = Path(png_path.name)
+    heatmap_path = Path(diff_dir) / relative
+    heatmap_path.parent.mkdir(parents=True, exist_ok=True)
+    heatmap(new_rgb, delta).save(heatmap_path, optimize=True)
+    return dict(result, status="changed", heatmap=heatmap_path)
+
+
+def verify_files(png_paths, threshold: float = DIFF_THRESHOLD, jobs: int = 1,
+                 restore: bool = True):
+    """Compare PNGs with their committed versions and print a report.
+
+    Returns:
+        Dict of {PNG path: result of compare_png()}, with status "new" for
+        uncommitted files and "failed" for files that could not be compared
+    """
+    png_paths = [Path(p) for p in png_paths]
+    committed = committed_versions(png_paths)
+
+    def run(png_path):
+        if png_path not in committed:
+            return {"status": "new"}
+        try:
+            return compare_png(png_path, committed[png_path], threshold, restore)
+        except (OSError, ValueError) as exc:
+            return {"status": "failed", "error": exc}
+
+    results = {}
+    counts = {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for png_path, result in zip(png_paths, pool.map(run, png_paths)):
+            results[png_path] = result
+            status = result["status"]
+            counts[status] = counts.get(status, 0) + 1
+            if status == "unchanged":
+                action = "kept the committed file" if restore else "matches the committed file"
+                print(f"  Unchanged: {png_path.name} ({100 * result['changed']:.3f}% of pixels "
+                      f"differ; {action})")
+            elif status == "changed":
+                print(f"  CHANGED: {png_path.name} ({100 * result['changed']:.2f}% of pixels, "
+                      f"max Delta E {result['max_delta']:.0f}); heatmap: {result['heatmap']}")
+            elif status == "resized":
+                print(f"  Resized: {png_path.name} {result['old_size'][0]}x{result['old_size'][1]}"
+                      f" -> {result['new_size'][0]}x{result['new_size'][1]} (same aspect ratio; "
+                      f"review the change)")
+            elif status == "reshaped":
+                print(f"  RESHAPED: {png_path.name} {result['old_size'][0]}x{result['old_size'][1]}"
+                      f" -> {result['new_size'][0]}x{result['new_size'][1]} (aspect ratio changed)")
+            elif status == "failed":
+                print(f"  FAILED diff: {png_path.name} ({result['error']})")
+    if counts:
+        print("  Compared with committed PNGs: "
+              + ", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PNG figures with their committed versions")
+    parser.add_argument("pngs", nargs="+", type=Path, help="PNG files in the working tree")
+    parser.add_argument(
+        "--threshold", type=float, default=DIFF_THRESHOLD,
+        help=f"Fraction of changed pixels treated as unchanged (default: {DIFF_THRESHOLD})"
+    )
+    parser.add_argument(
+        "--restore", action="store_true",
+        help="Restore the committed file where the change is below the threshold"
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1,
+        help="Number of figures to compare in parallel (default: 1)"
+    )
+    args = parser.parse_args()
+
+    if Image is None:
+        print("ERROR: Pillow not found.")
+        print("Install with: mamba install pillow")
+        sys.exit(1)
+
+    if args.jobs < 1:
+        print(f"ERROR: --jobs must be at least 1 (got {args.jobs})")
+        sys.exit(1)
+
+    png_paths = [p for p in args.pngs if p.exists()]
+    for missing in sorted(set(args.pngs) - set(png_paths)):
+        print(f"  SKIP (not found): {missing}")
+
+    results = verify_files(png_paths, args.threshold, args.jobs, restore=args.restore)
+    if any(result["status"] == "changed" for result in results.values()):
+        print(f"\nHeatmaps: {DIFF_DIR}")
+
+
+if __name__ == "__main__":
+    main()
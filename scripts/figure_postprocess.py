@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+"""
+Post-process rendered PNG figures for the book.
+
+Replaces the manual ImageMagick steps from CONVERSION_STRATEGY.md with one
+in-process pass per figure:
+
+1. Flatten transparency onto white (needed for dark mode)
+2. Downscale figures whose encoded size exceeds the budget (1.5 MB)
+3. Store figures with at most 256 colours as palette PNGs (lossless);
+   --colors N quantizes other figures to N colours (lossy, opt-in)
+4. Recompress with maximum zlib effort
+
+A figure is only rewritten if its pixels changed or the result is smaller.
+Both figure converters run this on every PNG they write (disable with
+--no-postprocess); it can also be run on existing PNGs directly.
+
+Usage:
+    python scripts/figure_postprocess.py book/figures/chapter8/*.png
+    python scripts/figure_postprocess.py --jobs 8 book/figures/*/*.png
+    python scripts/figure_postprocess.py --colors 64 book/figures/chapter2/harmonics.png
+
+Requires Pillow and NumPy: `mamba install pillow numpy`
+"""
+
+import argparse
+import io
+import math
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+import figure_profile
+
+try:
+    import PIL
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Largest PNG the book build accepts without a size warning
+MAX_BYTES = 1_500_000
+
+# Never shrink a figure below this fraction of its rendered width
+MIN_SCALE = 0.25
+
+BACKGROUND = (255, 255, 255)
+
+
+def check_pillow() -> bool:
+    """Check that Pillow is available."""
+    if Image is None:
+        print("ERROR: Pillow not found.")
+        print("Install with: mamba install pillow")
+        return False
+    return True
+
+
+def postprocess_params(max_bytes: int = MAX_BYTES, colors: int = None) -> dict:
+    """Everything that affects the post-processed pixels and encoding."""
+    return {
+        "stage": "png-postprocess",
+        "background": list(BACKGROUND),
+        "max_bytes": max_bytes,
+        "colors": colors,
+        "pillow": PIL.__version__,
+    }
+
+
+def flatten_alpha(image):
+    """Composite an image onto BACKGROUND, dropping its alpha channel.
+
+    Returns:
+        Tuple of (image, whether it had transparency)
+    """
+    if image.mode == "P" and "transparency" in image.info:
+        image = image.convert("RGBA")
+    if image.mode in ("RGBA", "LA", "PA"):
+        rgba = image.convert("RGBA")
+        flat = Image.new("RGB", rgba.size, BACKGROUND)
+        flat.paste(rgba, mask=rgba.getchannel("A"))
+        return flat, True
+    if image.mode not in ("RGB", "L"):
+        return image.convert("RGB"), False
+    return image, False
+
+
+def to_palette(image):
+    """Exact palette version of an RGB image, or None if it has > 256 colours."""
+    if image.mode != "RGB":
+        return None
+    rgb = np.asarray(image)
+    packed = (rgb[..., 0].astype(np.uint32) << 16) | (rgb[..., 1].astype(np.uint32) << 8) | rgb[..., 2]
+    colours, index = np.unique(packed.ravel(), return_inverse=True)
+    if len(colours) > 256:
+        return None
+    palette = np.stack([colours >> 16, (colours >> 8) & 0xFF, colours & 0xFF], axis=1)
+    result = Image.fromarray(index.reshape(rgb.shape[:2]).astype(np.uint8), "P")
+    result.putpalette(palette.astype(np.uint8).ravel().tolist())
+    return result
+
+
+def encode_png(image, dpi=None) -> bytes:
+    """Encode with maximum zlib effort."""
+    buffer = io.BytesIO()
+    options = {"optimize": True}
+    if dpi:
+        options["dpi"] = dpi
+    image.save(buffer, format="PNG", **options)
+    return buffer.getvalue()
+
+
+def _encode_smallest(image, colors, dpi):
+    """Encode `image`, as a palette PNG when that is possible or requested.
+
+    Returns:
+        Tuple of (PNG bytes, description of the palette step or None)
+    """
+    palette = to_palette(image)
+    if palette is not None:
+        return encode_png(palette, dpi), "palette"
+    if colors:
+        quantized = image.quantize(colors=colors, method=Image.Quantize.MEDIANCUT,
+                                   dither=Image.Dither.NONE)
+        return encode_png(quantized, dpi), f"quantized to {colors} colours"
+    return encode_png(image, dpi), None
+
+
+def postprocess_png(png_path: Path, max_bytes: int = MAX_BYTES, colors: int = None):
+    """Flatten, downscale, palettize and recompress one PNG in place.
+
+    Args:
+        png_path: PNG file to rewrite
+        max_bytes: Downscale until the encoded file is at most this large
+        colors: Quantize figures with more than 256 colours to this many
+            (lossy); None keeps them truecolour
+
+    Returns:
+        Tuple of (bytes before, bytes after, list of steps applied)
+    """
+    png_path = Path(png_path)
+    before = png_path.stat().st_size
+    steps = []
+
+    with Image.open(png_path) as image:
+        image.load()
+    dpi = image.info.get("dpi")
+
+    image, flattened = flatten_alpha(image)
+    if flattened:
+        steps.append("flattened")
+
+    data, palette_step = _encode_smallest(image, colors, dpi)
+    original, original_dpi = image, dpi
+    while len(data) > max_bytes and image.width > original.width * MIN_SCALE:
+        # Encoded size scales roughly with pixel count
+        scale = max(0.5, math.sqrt(max_bytes / len(data)) * 0.95)
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = original.resize(size, Image.LANCZOS)
+        if dpi:
+            # Keep the physical size the same so figures render at their old width
+            dpi = tuple(d * image.width / original.width for d in original_dpi)
+        data, palette_step = _encode_smallest(image, colors, dpi)
+    if image is not original:
+        steps.append(f"downscaled to {image.width}x{image.height}")
+    if palette_step:
+        steps.append(palette_step)
+
+    pixels_changed = flattened or image is not original or (
+        palette_step is not None and palette_step != "palette")
+    if not pixels_changed and len(data) >= before:
+        return before, before, []
+
+    tmp_path = png_path.with_name(png_path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, png_path)
+    if len(data) < before:
+        steps.append("recompressed")
+    return before, len(data), steps
+
+
+def format_bytes(n: float) -> str:
+    """Human-readable size (e.g. "1.4 MB")."""
+    for unit in ("B", "KB", "MB"):
+        if abs(n) < 1024 or unit == "MB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def postprocess_files(png_paths, max_bytes: int = MAX_BYTES, colors: int = None,
+                      jobs: int = 1):
+    """Post-process several PNGs in parallel and print a bytes-saved report.
+
+    Pillow and NumPy release the GIL while resizing and encoding, so figures
+    are processed on a thread pool rather than in separate processes.
+
+    Returns:
+        List of booleans (success) in the order of `png_paths`
+    """
+    def run(png_path):
+        try:
+            with figure_profile.figure(png_path.stem), figure_profile.span("postprocess"):
+                return postprocess_png(png_path, max_bytes, colors)
+        except (OSError, ValueError) as exc:
+            return exc
+
+    png_paths = [Path(p) for p in png_paths]
+    results = []
+    total_before = 0
+    total_after = 0
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for png_path, result in zip(png_paths, pool.map(run, png_paths)):
+            if isinstance(result, Exception):
+                print(f"  FAILED post-processing: {png_path.name} ({result})")
+                results.append(False)
+                continue
+            before, after, steps = result
+            total_before += before
+            total_after += after
+            if steps:
+                saved = before - after
+                print(f"  Optimized: {png_path.name} {format_bytes(before)} -> "
+                      f"{format_bytes(after)} (saved {format_bytes(saved)}; {', '.join(steps)})")
+            results.append(True)
+
+    if total_before:
+        saved = total_before - total_after
+        print(f"  Post-processing saved {format_bytes(saved)} "
+              f"({100 * saved / total_before:.1f}% of {format_bytes(total_before)})")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flatten, downscale and recompress PNG figures")
+    parser.add_argument("pngs", nargs="+", type=Path, help="PNG files to process in place")
+    parser.add_argument(
+        "--max-bytes", type=int, default=MAX_BYTES,
+        help=f"Downscale figures larger than this many bytes (default: {MAX_BYTES})"
+    )
+    parser.add_argument(
+        "--colors", type=int,
+        help="Quantize figures with more than 256 colours to this many (lossy)"
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1,
+        help="Number of figures to process in parallel (default: 1)"
+    )
+    args = parser.parse_args()
+
+    if not check_pillow():
+        sys.exit(1)
+
+    if args.jobs < 1:
+        print(f"ERROR: --jobs must be at least 1 (got {args.jobs})")
+        sys.exit(1)
+
+    if args.colors is not None and not 2 <= args.colors <= 256:
+        print(f"ERROR: --colors must be between 2 and 256 (got {args.colors})")
+        sys.exit(1)
+
+    png_paths = []
+    missing = 0
+    for png_path in args.pngs:
+        if not png_path.exists():
+            print(f"  SKIP (not found): {png_path}")
+            missing += 1
+            continue
+        png_paths.append(png_path)
+
+    results = postprocess_files(png_paths, args.max_bytes, args.colors, args.jobs)
+    print(f"\nDone: {sum(results)} processed, {results.count(False) + missing} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Per-stage timing and child-process memory profile for the figure build.
+
+With --profile, every stage of every figure (gs EPS->PDF, Inkscape PDF->SVG,
+font replacement, SVG->PNG, post-processing, variants) is timed, and for
+stages that run an external tool the child's peak resident set size is read
+from os.wait4(). Events from all worker processes are appended to one trace
+file named in an environment variable, so they survive fork or spawn.
+
+At the end of the build the events are written as JSON or CSV and the
+slowest figures and stages are summarized.
+
+Usage:
+    python scripts/convert_figures_inkscape.py --all --jobs 8 --profile profile.csv
+
+    import figure_profile
+
+    with figure_profile.figure("magnetite"):
+        result = figure_profile.run(["gs", ...], "eps->pdf")
+        with figure_profile.span("fonts"):
+            rewrite_fonts(...)
+"""
+
+import csv
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Trace file shared by the build's processes; profiling is on when it is set
+TRACE_ENV = "FIGURE_PROFILE_TRACE"
+
+FIELDS = ["figure", "stage", "seconds", "peak_rss_mb", "pid"]
+
+_local = threading.local()
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return TRACE_ENV in os.environ
+
+
+def enable(trace_path: Path):
+    """Start a new trace; must be called before worker pools are created."""
+    Path(trace_path).write_text("", encoding="utf-8")
+    os.environ[TRACE_ENV] = str(trace_path)
+
+
+def disable():
+    os.environ.pop(TRACE_ENV, None)
+
+
+@contextmanager
+def figure(name: str):
+    """Attribute events recorded by this thread to figure `name`."""
+    previous = getattr(_local, "figure", None)
+    _local.figure = name
+    try:
+        yield
+    finally:
+        _local.figure = previous
+
+
+def record(stage: str, seconds: float, peak_rss: int = None, pid: int = None):
+    """Append one event to the trace (no-op unless profiling is enabled).
+
+    Args:
+        stage: Stage name (e.g. "eps->pdf")
+        seconds: Wall-clock duration
+        peak_rss: Peak resident set size of the child process in bytes
+        pid: Child process id
+    """
+    path = os.environ.get(TRACE_ENV)
+    if path is None:
+        return
+    event = {
+        "figure": getattr(_local, "figure", None) or "",
+        "stage": stage,
+        "seconds": round(seconds, 4),
+        "peak_rss_mb": round(peak_rss / 2**20, 1) if peak_rss else None,
+        "pid": pid,
+    }
+    # One short O_APPEND write per event, so lines from concurrent
+    # processes do not interleave
+    with _lock, open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(event) + "\n")
+
+
+@contextmanager
+def span(stage: str):
+    """Time the enclosed block as `stage`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started)
+
+
+def wait(proc: subprocess.Popen, stage: str, started: float) -> int:
+    """Wait for a child started at perf_counter() `started` and record it.
+
+    Uses os.wait4() where available so the child's peak RSS is known.
+
+    Returns:
+        The child's exit code
+    """
+    if not enabled():
+        return proc.wait()
+    peak_rss = None
+    if hasattr(os, "wait4") and proc.returncode is None:
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        peak_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    else:
+        proc.wait()
+    record(stage, time.perf_counter() - started, peak_rss, proc.pid)
+    return proc.returncode
+
+
+def run(cmd, stage: str, **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run(cmd, capture_output=True, text=True), recorded as `stage`."""
+    if not enabled():
+        return subprocess.run(cmd, capture_output=True, text=True, **kwargs)
+
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True, **kwargs)
+    # Drain stderr on a thread so neither pipe can fill up and block the child
+    stderr = []
+    reader = threading.Thread(target=lambda: stderr.append(proc.stderr.read()), daemon=True)
+    reader.start()
+    stdout = proc.stdout.read()
+    reader.join()
+    proc.stdout.close()
+    proc.stderr.close()
+    returncode = wait(proc, stage, started)
+    return subprocess.CompletedProcess(cmd, returncode, stdout, stderr[0] if stderr else "")
+
+
+def load(trace_path: Path):
+    """Read the events of a trace file."""
+    with open(trace_path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write(events, output_path: Path):
+    """Write events as CSV (.csv) or a JSON list (anything else)."""
+    output_path = Path(output_path)
+    if output_path.suffix.lower() == ".csv":
+        with open(output_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(events)
+    else:
+        output_path.write_text(json.dumps(events, indent=1) + "\n", encoding="utf-8")
+
+
+def summarize(events, top: int = 10):
+    """Print the slowest figures and a per-stage breakdown."""
+    figures = {}
+    stages = {}
+    for event in events:
+        per_figure = figures.setdefault(event["figure"], {})
+        per_figure[event["stage"]] = per_figure.get(event["stage"], 0) + event["seconds"]
+        stats = stages.setdefault(event["stage"], {"count": 0, "total": 0.0, "max": 0.0, "rss": 0.0})
+        stats["count"] += 1
+        stats["total"] += event["seconds"]
+        stats["max"] = max(stats["max"], event["seconds"])
+        stats["rss"] = max(stats["rss"], event["peak_rss_mb"] or 0)
+
+    print(f"\nSlowest figures (of {len(figures)}):")
+    ranked = sorted(figures.items(), key=lambda item: sum(item[1].values()), reverse=True)
+    for name, per_stage in ranked[:top]:
+        parts = ", ".join(f"{stage} {seconds:.2f}" for stage, seconds in
+                          sorted(per_stage.items(), key=lambda item: -item[1]))
+        print(f"  {name or '(none)':<30} {sum(per_stage.values()):7.2f} s  ({parts})")
+
+    print("\nStages:")
+    print(f"  {'Stage':<18} {'Count':>5} {'Total s':>9} {'Mean s':>8} {'Max s':>8} {'Peak RSS':>9}")
+    for stage, stats in sorted(stages.items(), key=lambda item: -item[1]["total"]):
+        rss = f"{stats['rss']:.0f} MB" if stats["rss"] else "-"
+        print(f"  {stage:<18} {stats['count']:5d} {stats['total']:9.2f} "
+              f"{stats['total'] / stats['count']:8.3f} {stats['max']:8.2f} {rss:>9}")
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+"""
+Figure registry shared by the figure converters and the size audit.
+
+The figures of each chapter are found by scanning the `{figure}` and
+`{image}` directives in book/chapters/*.md, so the book itself is the only
+list to maintain. A figure belongs to the chapter folder it is referenced in
+(e.g. `../figures/chapter5/bf.png` is figure "bf" of chapter 5), and the
+converters build it from the EPS of the same name, so only figures the book
+actually uses are converted.
+
+Parsing results are cached per Markdown file against its size and mtime in
+.figure-index.json (not committed), so only edited chapters are re-read.
+
+Run as a script to list the figures per chapter and report PNGs in
+book/figures that no chapter references.
+
+Usage:
+    python scripts/figure_registry.py             # Figures per chapter + orphans
+    python scripts/figure_registry.py --orphans   # Only unreferenced PNGs
+
+    from figure_registry import chapter_figures, parse_chapter, chapter_dir_name
+
+    key = parse_chapter("appendix")
+    stems = chapter_figures()[key]
+    output_dir = FIGURES_DIR / chapter_dir_name(key)
+"""
+
+import argparse
+import json
+import os
+import re
+from pathlib import Path
+
+# Paths
+PROJECT_ROOT = Path(__file__).parent.parent
+ORIGINAL_REPO = PROJECT_ROOT.parent / "Essentials-of-Paleomagnetism"
+EPS_DIR = ORIGINAL_REPO / "EPSFiles"
+SVG_DIR = ORIGINAL_REPO / "SVGFiles"
+FIGURES_DIR = PROJECT_ROOT / "book" / "figures"
+CHAPTERS_DIR = PROJECT_ROOT / "book" / "chapters"
+INDEX_PATH = PROJECT_ROOT / ".figure-index.json"
+
+# Bump when the cached reference format changes
+INDEX_VERSION = 1
+
+NUM_CHAPTERS = 16
+
+# Start of a figure/image directive, e.g. ":::{figure} ../figures/chapter5/bf.png"
+_DIRECTIVE_RE = re.compile(r"^\s*(?::{3,}|`{3,})\{(?:figure|image)\}\s+(\S+)")
+_OPTION_RE = re.compile(r"^\s*:(\w+):\s*(.*?)\s*$")
+_CHAPTER_DIR_RE = re.compile(r"^(?:chapter(\d+)|(appendix))$")
+
+
+def scan_markdown(md_path: Path):
+    """Figure references in one Markdown file.
+
+    Returns:
+        List of {"path": path relative to book/figures, "line": line number,
+        "width": the :width: option or None}, in document order. References
+        outside book/figures are ignored.
+    """
+    refs = []
+    lines = Path(md_path).read_text(encoding="utf-8").splitlines()
+    for i, line in enumerate(lines):
+        match = _DIRECTIVE_RE.match(line)
+        if not match:
+            continue
+        target = (Path(md_path).parent / match.group(1)).resolve()
+        try:
+            path = target.relative_to(FIGURES_DIR.resolve()).as_posix()
+        except ValueError:
+            continue
+
+        width = None
+        for option in lines[i + 1:]:
+            opt = _OPTION_RE.match(option)
+            if not opt:
+                break
+            if opt.group(1) == "width":
+                width = opt.group(2)
+        refs.append({"path": path, "line": i + 1, "width": width})
+    return refs
+
+
+def figure_index(chapters_dir: Path = CHAPTERS_DIR, cache_path: Path = INDEX_PATH):
+    """Figure references of every chapter, re-parsing only changed files.
+
+    Returns:
+        Dict of {Markdown file name: scan_markdown() result}, sorted by name
+    """
+    cached = {}
+    if cache_path.exists():
+        try:
+            data = json.loads(cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        if data.get("version") == INDEX_VERSION:
+            cached = data.get("files", {})
+
+    files = {}
+    changed = False
+    for md_path in sorted(chapters_dir.glob("*.md")):
+        st = md_path.stat()
+        entry = cached.get(md_path.name)
+        if entry is None or entry["size"] != st.st_size or entry["mtime_ns"] != st.st_mtime_ns:
+            entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "refs": scan_markdown(md_path)}
+            changed = True
+        files[md_path.name] = entry
+
+    if changed or files.keys() != cached.keys():
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+        tmp_path.write_text(json.dumps({"version": INDEX_VERSION, "files": files}), encoding="utf-8")
+        os.replace(tmp_path, cache_path)
+
+    return {name: entry["refs"] for name, entry in files.items()}
+
+
+def chapter_key(dir_name: str):
+    """CHAPTER key for a book/figures folder name, or None if it is not one."""
+    match = _CHAPTER_DIR_RE.match(dir_name)
+    if not match:
+        return None
+    return int(match.group(1)) if match.group(1) else "appendix"
+
+
+def chapter_figures(index: dict = None):
+    """Map each chapter to the figures it references.
+
+    Args:
+        index: Result of figure_index() (scanned if not given)
+
+    Returns:
+        Dict of {chapter key (int or "appendix"): [figure stems]}, each list in
+        order of first reference
+    """
+    if index is None:
+        index = figure_index()
+    figures = {}
+    for refs in index.values():
+        for ref in refs:
+            parts = ref["path"].split("/")
+            key = chapter_key(parts[0]) if len(parts) == 2 else None
+            if key is None:
+                continue
+            stems = figures.setdefault(key, [])
+            stem = Path(parts[1]).stem
+            if stem not in stems:
+                stems.append(stem)
+    return dict(sorted(figures.items(), key=lambda item: str(item[0]).zfill(3)))
+
+
+def figure_chapters(index: dict = None):
+    """Map each figure stem to the chapter key it belongs to."""
+    return {stem: key for key, stems in chapter_figures(index).items() for stem in stems}
+
+
+def referenced_paths(index: dict = None):
+    """Paths relative to book/figures that the chapters use.
+
+    A figure published as SVG (see figure_vector.py) keeps its PNG as the
+    fallback, so the PNG of every referenced SVG is included. So are the
+    fallback of every widget (see widget_embed.py) and its poster image.
+    """
+    from widget_embed import WIDGETS, poster
+
+    if index is None:
+        index = figure_index()
+    paths = set()
+    for refs in index.values():
+        for ref in refs:
+            paths.add(ref["path"])
+            if ref["path"].endswith(".svg"):
+                paths.add(ref["path"][:-len(".svg")] + ".png")
+    for widget in WIDGETS.values():
+        paths.update((widget["fallback"], poster(widget["fallback"])))
+    return paths
+
+
+def orphaned_figures(index: dict = None, figures_dir: Path = FIGURES_DIR):
+    """PNGs under book/figures that no chapter references.
+
+    Generated responsive variants (variants/ folders), the PNG fallbacks
+    of published SVGs and widget fallbacks are not counted.
+    """
+    referenced = referenced_paths(index)
+    return sorted(
+        p for p in figures_dir.rglob("*.png")
+        if "variants" not in p.relative_to(figures_dir).parts[:-1]
+        and p.relative_to(figures_dir).as_posix() not in referenced
+    )
+
+
+def parse_chapter(value: str):
+    """Turn a --chapter argument into a chapter key.
+
+    Raises:
+        ValueError: If `value` is not a chapter number or "appendix"
+    """
+    if value.lower() == "appendix":
+        return "appendix"
+    try:
+        key = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid chapter: {value} (use a number 1-{NUM_CHAPTERS} or 'appendix')")
+    if not 1 <= key <= NUM_CHAPTERS:
+        raise ValueError(f"Unknown chapter: {key}")
+    return key
+
+
+def chapter_dir_name(key) -> str:
+    """Output folder name for a chapter key (e.g. "chapter4" or "appendix")."""
+    return "appendix" if key == "appendix" else f"chapter{key}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List book figures and unreferenced PNGs")
+    parser.add_argument("--orphans", action="store_true", help="Only report unreferenced PNGs")
+    args = parser.parse_args()
+
+    index = figure_index()
+
+    if not args.orphans:
+        for key, stems in chapter_figures(index).items():
+            with_eps = sum((EPS_DIR / f"{stem}.eps").exists() for stem in stems)
+            print(f"  {chapter_dir_name(key):<10} {len(stems):3d} figures ({with_eps} from EPS)")
+        print()
+
+    orphans = orphaned_figures(index)
+    total = 0
+    for path in orphans:
+        size = path.stat().st_size
+        total += size
+        print(f"  Orphaned: {path.relative_to(FIGURES_DIR).as_posix()} ({size / 1024:.1f} KB)")
+    print(f"\n{len(orphans)} unreferenced PNG(s), {total / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+"""
+Generate responsive width variants of book figures for `srcset`.
+
+Each PNG is decoded once and resized in-process to a set of widths
+(480/960/1920 px by default), and every width is encoded as WebP, and as
+AVIF when Pillow was built with AVIF support. Widths larger than the
+original are skipped. The original PNG remains the fallback.
+
+Variants are written to a `variants/` folder next to the PNG, and
+book/figures/variants.json maps each figure to its variants:
+
+    {
+      "chapter4/magnetite.png": {
+        "width": 2400, "height": 1800,
+        "sources": {
+          "image/webp": [["chapter4/variants/magnetite-480w.webp", 480], ...],
+          "image/avif": [...]
+        }
+      }
+    }
+
+Only the manifest is delivered: the book build does not read it, so
+chapter pages still show the full PNG (MyST figures have no `srcset`).
+widget_embed.py uses it to pick widget posters.
+
+The figure converters run this stage after rasterizing when given
+--variants; it can also be run on existing PNGs directly. Variants are
+tracked in the build manifest (see figure_cache.py), so they are only
+re-encoded when their PNG or the width/encoding settings change.
+
+Usage:
+    python scripts/figure_variants.py book/figures/chapter4/*.png
+    python scripts/figure_variants.py --widths 640 1280 book/figures/chapter5/bf.png
+    python scripts/convert_figures.py --chapter 4 --variants
+
+Requires Pillow: `mamba install pillow`
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import figure_profile
+from figure_cache import BuildManifest
+
+try:
+    import PIL
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+PROJECT_ROOT = Path(__file__).parent.parent
+FIGURES_DIR = PROJECT_ROOT / "book" / "figures"
+MANIFEST_PATH = FIGURES_DIR / "variants.json"
+
+DEFAULT_WIDTHS = (480, 960, 1920)
+
+# (MIME type, file suffix, Pillow save options)
+ENCODINGS = [
+    ("image/webp", "webp", {"quality": 85, "method": 6}),
+    ("image/avif", "avif", {"quality": 60}),
+]
+
+
+def check_pillow() -> bool:
+    """Check that Pillow is available."""
+    if Image is None:
+        print("ERROR: Pillow not found.")
+        print("Install with: mamba install pillow")
+        return False
+    return True
+
+
+def available_encodings():
+    """The entries of ENCODINGS this Pillow build can write."""
+    return [enc for enc in ENCODINGS if features.check(enc[1])]
+
+
+def variant_params(widths) -> dict:
+    """Everything besides the PNG that affects the variant files."""
+    return {
+        "stage": "png->variants",
+        "widths": sorted(set(widths)),
+        "encodings": [[suffix, options] for _, suffix, options in available_encodings()],
+        "pillow": PIL.__version__,
+    }
+
+
+def _figure_key(path: Path) -> str:
+    """Manifest key: path relative to book/figures, with forward slashes."""
+    try:
+        return Path(os.path.relpath(path.resolve(), FIGURES_DIR.resolve())).as_posix()
+    except ValueError:
+        return path.resolve().as_posix()
+
+
+def make_variants(png_path: Path, widths=DEFAULT_WIDTHS, out_dir: Path = None):
+    """Write resized WebP/AVIF variants of one PNG.
+
+    Args:
+        png_path: Source PNG (the full-resolution rasterization)
+        widths: Target widths in pixels; widths >= the original are skipped,
+            and the original width is used if none are smaller
+        out_dir: Output folder (default: `variants/` next to the PNG)
+
+    Returns:
+        Tuple of (manifest key, manifest entry) for variants.json
+    """
+    png_path = Path(png_path)
+    out_dir = Path(out_dir) if out_dir else png_path.parent / "variants"
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(png_path) as image:
+        image.load()
+        orig_w, orig_h = image.size
+        targets = sorted({w for w in widths if w < orig_w}) or [orig_w]
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        sources = {}
+        for width in targets:
+            height = max(1, round(orig_h * width / orig_w))
+            resized = image if width == orig_w else image.resize((width, height), Image.LANCZOS)
+            for mime, suffix, options in available_encodings():
+                variant = out_dir / f"{png_path.stem}-{width}w.{suffix}"
+                resized.save(variant, **options)
+                sources.setdefault(mime, []).append([_figure_key(variant), width])
+
+    entry = {"width": orig_w, "height": orig_h, "sources": sources}
+    return _figure_key(png_path), entry
+
+
+def load_manifest(manifest_path: Path = MANIFEST_PATH) -> dict:
+    """Read variants.json, or {} if it does not exist yet."""
+    if not manifest_path.exists():
+        return {}
+    return json.loads(manifest_path.read_text(encoding="utf-8"))
+
+
+def update_manifest(entries: dict, manifest_path: Path = MANIFEST_PATH):
+    """Merge {figure key: entry} into variants.json (written atomically)."""
+    manifest = load_manifest(manifest_path)
+    manifest.update(entries)
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+    os.replace(tmp_path, manifest_path)
+
+
+def _variant_files(entry: dict):
+    return [FIGURES_DIR / path for srcs in entry["sources"].values() for path, _ in srcs]
+
+
+def build_variants(manifest: BuildManifest, png_paths, widths=DEFAULT_WIDTHS,
+                   jobs: int = 1, force: bool = False):
+    """Bring the variants of each PNG up to date and update variants.json.
+
+    Pillow releases the GIL while resizing and encoding, so figures are
+    processed on a thread pool rather than in separate processes.
+
+    Args:
+        manifest: Build manifest used to skip figures whose variants are current
+        png_paths: Rasterized figures to derive variants from
+        widths: Target widths in pixels
+        jobs: Number of figures to encode in parallel
+        force: Re-encode even if the variants are up to date
+
+    Returns:
+        Tuple of (number of figures encoded, number that failed)
+    """
+    params = variant_params(widths)
+    existing = load_manifest()
+
+    pending = []
+    for png_path in png_paths:
+        entry = existing.get(_figure_key(Path(png_path)))
+        if (not force and entry is not None and
+                all(manifest.is_current(f, [png_path], params) for f in _variant_files(entry))):
+            continue
+        pending.append(Path(png_path))
+
+    def encode(png_path):
+        try:
+            with figure_profile.figure(png_path.stem), figure_profile.span("variants"):
+                return make_variants(png_path, widths)
+        except OSError as exc:
+            return exc
+
+    built = 0
+    failed = 0
+    entries = {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for png_path, result in zip(pending, pool.map(encode, pending)):
+            if isinstance(result, OSError):
+                print(f"  FAILED variants: {png_path.name} ({result})")
+                failed += 1
+                continue
+            key, entry = result
+            for variant in _variant_files(entry):
+                manifest.record(variant, [png_path], params)
+            entries[key] = entry
+            built += 1
+            sizes = sorted({w for srcs in entry["sources"].values() for _, w in srcs})
+            print(f"  Variants: {png_path.name} ({', '.join(f'{w}w' for w in sizes)})")
+
+    if entries:
+        update_manifest(entries)
+    return built, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate responsive figure variants")
+    parser.add_argument("pngs", nargs="+", type=Path, help="PNG files to process")
+    parser.add_argument(
+        "--widths", type=int, nargs="+", default=list(DEFAULT_WIDTHS),
+        help=f"Variant widths in pixels (default: {' '.join(map(str, DEFAULT_WIDTHS))})"
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1,
+        help="Number of figures to encode in parallel (default: 1)"
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Re-encode variants even if they are up to date"
+    )
+    args = parser.parse_args()
+
+    if not check_pillow():
+        sys.exit(1)
+
+    if args.jobs < 1:
+        print(f"ERROR: --jobs must be at least 1 (got {args.jobs})")
+        sys.exit(1)
+
+    formats = ", ".join(suffix for _, suffix, _ in available_encodings())
+    print(f"Encoding variants as: {formats}")
+
+    png_paths = []
+    missing = 0
+    for png_path in args.pngs:
+        if not png_path.exists():
+            print(f"  SKIP (not found): {png_path}")
+            missing += 1
+            continue
+        png_paths.append(png_path)
+
+    manifest = BuildManifest()
+    try:
+        built, failed = build_variants(manifest, png_paths, args.widths, args.jobs, args.force)
+    finally:
+        manifest.save()
+
+    up_to_date = len(png_paths) - built - failed
+    print(f"\nDone: {built} encoded, {up_to_date} up to date, {failed + missing} failed")
+    print(f"Manifest: {MANIFEST_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+"""
+Publish line-art figures as SVG instead of PNG.
+
+Most EPS figures are line art, which a 300 dpi PNG stores far less
+compactly than the vectors it was drawn from. For each figure rendered by
+the Inkscape converter, the editable SVG is exported again as a plain SVG
+with its text converted to paths (so it looks the same without Source Sans
+Pro installed), optimized and minified (svg_optimize.py) and compared with the
+post-processed PNG. The SVG is published when:
+
+- its gzip size (what the browser downloads) is smaller than the PNG
+- it has at most MAX_ELEMENTS drawing elements (more render slowly)
+- it embeds no raster images (those gain nothing from being vectors)
+
+A published SVG is written next to its PNG (e.g.
+book/figures/chapter11/fisher.svg) and the chapter's figure directive is
+switched from fisher.png to fisher.svg. The PNG is kept as the fallback for
+exports that cannot use SVG. When a figure no longer qualifies, its SVG is
+removed and the directive is switched back.
+
+Decisions are recorded in book/figures/vector.json with the hashes of the
+files they were made from, so figures are only re-classified when their SVG
+or PNG changes:
+
+    {
+      "chapter11/fisher.png": {
+        "format": "svg", "svg": "chapter11/fisher.svg",
+        "svg_bytes": 21873, "svg_gzip_bytes": 6120, "png_bytes": 184233,
+        "elements": 412, ...
+      }
+    }
+
+Usage:
+    python scripts/convert_figures_inkscape.py --chapter 11 --vector
+
+    # Classify existing figures (source SVGs are looked up in SVGFiles/)
+    python scripts/figure_vector.py book/figures/chapter11/*.png
+"""
+
+import argparse
+import gzip
+import sys
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import figure_profile
+from figure_cache import BuildManifest, params_key, tool_version
+from figure_registry import CHAPTERS_DIR, FIGURES_DIR, SVG_DIR, figure_index
+from figure_variants import load_manifest, update_manifest
+from svg_optimize import PRECISION, SVG_NS, TOLERANCE, optimize_svg
+
+MANIFEST_PATH = FIGURES_DIR / "vector.json"
+
+# Browsers slow down noticeably on SVGs with more elements than this
+MAX_ELEMENTS = 20_000
+
+# Elements that draw something
+DRAWING_TAGS = {
+    f"{{{SVG_NS}}}{tag}"
+    for tag in ("path", "line", "polyline", "polygon", "rect", "circle", "ellipse", "use", "text")
+}
+
+
+def vector_params(max_elements: int = MAX_ELEMENTS) -> dict:
+    """Everything that affects the published SVG and the decision."""
+    return {
+        "stage": "web-svg",
+        "precision": PRECISION,
+        "tolerance": TOLERANCE,
+        "max_elements": max_elements,
+        "inkscape": tool_version("inkscape"),
+    }
+
+
+def _figure_key(path: Path) -> str:
+    """vector.json key: path relative to book/figures.
+
+    Raises:
+        ValueError: If `path` is not under book/figures
+    """
+    return Path(path).resolve().relative_to(FIGURES_DIR.resolve()).as_posix()
+
+
+def export_web_svg(svg_path: Path, output_path: Path) -> bool:
+    """Export a plain SVG with text converted to paths using Inkscape."""
+    cmd = [
+        "inkscape", str(svg_path),
+        "--export-plain-svg",
+        "--export-text-to-path",
+        f"--export-filename={output_path}",
+    ]
+    result = figure_profile.run(cmd, "web-svg")
+    return result.returncode == 0 and output_path.exists()
+
+
+def svg_complexity(data: bytes) -> dict:
+    """Count the drawing elements and embedded raster images of an SVG."""
+    root = ET.fromstring(data)
+    elements = 0
+    images = 0
+    for element in root.iter():
+        if element.tag in DRAWING_TAGS:
+            elements += 1
+        elif element.tag == f"{{{SVG_NS}}}image":
+            images += 1
+    return {"elements": elements, "images": images}
+
+
+def classify(svg_data: bytes, png_bytes: int, max_elements: int = MAX_ELEMENTS):
+    """Decide whether a minified SVG should replace its PNG.
+
+    Returns:
+        Tuple of (publish the SVG, dict of the measurements and the reason)
+    """
+    details = dict(svg_complexity(svg_data), svg_bytes=len(svg_data),
+                   svg_gzip_bytes=len(gzip.compress(svg_data, 9)), png_bytes=png_bytes)
+    if details["images"]:
+        details["reason"] = "embeds raster images"
+    elif details["elements"] > max_elements:
+        details["reason"] = f"{details['elements']} elements (limit {max_elements})"
+    elif details["svg_gzip_bytes"] >= png_bytes:
+        details["reason"] = "larger than the PNG"
+    else:
+        details["reason"] = "smaller than the PNG"
+        return True, details
+    return False, details
+
+
+def make_vector(svg_path: Path, png_path: Path, max_elements: int = MAX_ELEMENTS):
+    """Export, minify and classify one figure, publishing its SVG if it wins.
+
+    Args:
+        svg_path: Editable SVG the PNG was rendered from
+        png_path: Post-processed PNG in book/figures
+
+    Returns:
+        Tuple of (vector.json key, entry without input hashes), or None if
+        the export failed
+    """
+    png_path = Path(png_path)
+    web_path = png_path.with_suffix(".svg")
+    tmp_path = web_path.with_name(web_path.name + ".tmp.svg")
+    try:
+        if not export_web_svg(svg_path, tmp_path):
+            return None
+        with figure_profile.span("svg-optimize"):
+            data = optimize_svg(tmp_path.read_bytes(), minify=True)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+    use_svg, entry = classify(data, png_path.stat().st_size, max_elements)
+    if use_svg:
+        web_path.write_bytes(data)
+        entry = dict(format="svg", svg=_figure_key(web_path), **entry)
+    else:
+        if web_path.exists():
+            web_path.unlink()
+        entry = dict(format="png", **entry)
+    return _figure_key(png_path), entry
+
+
+def publish_references(entries: dict, chapters_dir: Path = CHAPTERS_DIR):
+    """Point each chapter's figure directives at the chosen format,
+    printing each directive that is switched.
+
+    Args:
+        entries: {figure key: vector.json entry}
+
+    Returns:
+        List of "chapter.md:line" locations that were switched
+    """
+    switch = {}
+    for key, entry in entries.items():
+        svg_key = Path(key).with_suffix(".svg").as_posix()
+        if entry["format"] == "svg":
+            switch[key] = svg_key
+        else:
+            switch[svg_key] = key
+
+    switched = []
+    for md_name, refs in figure_index(chapters_dir).items():
+        targets = [ref for ref in refs if ref["path"] in switch]
+        if not targets:
+            continue
+        md_path = chapters_dir / md_name
+        lines = md_path.read_text(encoding="utf-8").splitlines(keepends=True)
+        for ref in targets:
+            old_name = Path(ref["path"]).name
+            new_name = Path(switch[ref["path"]]).name
+            lines[ref["line"] - 1] = lines[ref["line"] - 1].replace(old_name, new_name, 1)
+            switched.append(f"{md_name}:{ref['line']}")
+            print(f"  Switched figure reference: {md_name}:{ref['line']} {old_name} -> {new_name}")
+        md_path.write_text("".join(lines), encoding="utf-8")
+    return switched
+
+
+def build_vectors(manifest: BuildManifest, pairs, jobs: int = 1, force: bool = False,
+                  max_elements: int = MAX_ELEMENTS):
+    """Classify figures, publish the SVGs that win and update the chapters.
+
+    Args:
+        manifest: Build manifest used for file hashes and to track SVGs
+        pairs: (editable SVG, PNG) for each figure; PNGs outside
+            book/figures are skipped
+        jobs: Number of figures to export in parallel
+        force: Re-classify even if the SVG and PNG are unchanged
+
+    Returns:
+        Tuple of (number of figures published as SVG, number that failed)
+    """
+    params = vector_params(max_elements)
+    existing = load_manifest(MANIFEST_PATH)
+
+    pending = []
+    for svg_path, png_path in pairs:
+        if not svg_path.exists():
+            continue
+        try:
+            entry = existing.get(_figure_key(png_path))
+        except ValueError:
+            # Chapters only reference figures under book/figures
+            print(f"  SKIP web SVG: {png_path} is outside {FIGURES_DIR}")
+            continue
+        inputs = {"svg": manifest.file_hash(svg_path), "png": manifest.file_hash(png_path)}
+        if (not force and entry is not None and entry.get("inputs") == inputs
+                and entry.get("params") == params_key(params)
+                and (entry["format"] == "png"
+                     or manifest.is_current(png_path.with_suffix(".svg"), [svg_path, png_path], params))):
+            continue
+        pending.append((svg_path, png_path, inputs))
+
+    def run(item):
+        svg_path, png_path, _ = item
+        with figure_profile.figure(png_path.stem):
+            try:
+                return make_vector(svg_path, png_path, max_elements)
+            except (OSError, ET.ParseError) as exc:
+                return exc
+
+    published = 0
+    failed = 0
+    entries = {}
+    # The work is in the Inkscape child processes, so threads are enough
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for (svg_path, png_path, inputs), result in zip(pending, pool.map(run, pending)):
+            if result is None or isinstance(result, Exception):
+                detail = f" ({result})" if result is not None else ""
+                print(f"  FAILED web SVG: {png_path.stem}{detail}")
+                failed += 1
+                continue
+            key, entry = result
+            if entry["format"] == "svg":
+                manifest.record(png_path.with_suffix(".svg"), [svg_path, png_path], params)
+                print(f"  Vector: {png_path.stem}.svg {entry['svg_gzip_bytes'] / 1024:.1f} KB "
+                      f"gzipped vs {entry['png_bytes'] / 1024:.1f} KB PNG")
+                published += 1
+            else:
+                print(f"  Raster: {png_path.name} kept ({entry['reason']})")
+            entries[key] = dict(entry, inputs=inputs, params=params_key(params))
+
+    if entries:
+        update_manifest(entries, MANIFEST_PATH)
+        publish_references(entries)
+    return published, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish line-art figures as SVG")
+    parser.add_argument("pngs", nargs="+", type=Path, help="PNG figures under book/figures")
+    parser.add_argument(
+        "--max-elements", type=int, default=MAX_ELEMENTS,
+        help=f"Keep the PNG for SVGs with more drawing elements (default: {MAX_ELEMENTS})"
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1,
+        help="Number of figures to export in parallel (default: 1)"
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Re-classify figures even if they are unchanged"
+    )
+    args = parser.parse_args()
+
+    if args.jobs < 1:
+        print(f"ERROR: --jobs must be at least 1 (got {args.jobs})")
+        sys.exit(1)
+
+    pairs = []
+    missing = 0
+    for png_path in args.pngs:
+        svg_path = SVG_DIR / png_path.parent.name / f"{png_path.stem}.svg"
+        if not png_path.exists() or not svg_path.exists():
+            print(f"  SKIP (not found): {png_path if not png_path.exists() else svg_path}")
+            missing += 1
+            continue
+        pairs.append((svg_path, png_path))
+
+    manifest = BuildManifest()
+    try:
+        published, failed = build_vectors(manifest, pairs, args.jobs, args.force, args.max_elements)
+    finally:
+        manifest.save()
+
+    print(f"\nDone: {published} published as SVG, {failed + missing} failed")
+    print(f"Manifest: {MANIFEST_PATH}")
+
+
+if __name__ == "__main__":
+    main()
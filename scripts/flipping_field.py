@@ -1,278 +1,129 @@
 """
-Precompute Stoner-Wohlfarth flipping data and generate a self-contained
-HTML file using Plotly.js (loaded from CDN).
+Generate the HTML widget for the Stoner-Wohlfarth flipping field using
+Plotly.js (loaded from CDN).
 
-Hardcoded: q=1.5 prolate spheroid, magnetite (Ms=480 kA/m),
-phi=0, theta_init=180, B range 0-100 mT in 1 mT steps.
+All physics computation happens in JavaScript for a compact file: the
+energy terms and their derivatives, and a grid search that tracks the
+occupied local energy minimum, run in the page. Sliders set the aspect
+ratio q of the prolate spheroid, the field angle phi and Ms, and the B range
+follows the microscopic coercivity 2 K_u / Ms.
+
+Defaults: q=1.5 prolate spheroid, magnetite (Ms=480 kA/m), phi=0,
+theta_init=180, B in 1 mT steps. This script sweeps the defaults in Python
+(stoner_wohlfarth.py) as the reference the JS port must reproduce (flip at
+91 mT).
+
+Styles, plot styling and the play/reset logic come from the shared
+widget runtime (widget_runtime.py).
 
 Features:
   - SVG setup illustration showing grain geometry, M and B arrows
   - Derivative legend on lower panel only
   - Monotonic slider (forward-only; Reset to go back)
+
+--check runs the page's JS solver under node for CHECK_CASES and compares
+its flip fields with the Python sweep (within CHECK_TOLERANCE_MT).
+
+Usage:
+    python flipping_field.py            # Widget in book/figures/chapter5/
+    python flipping_field.py --check    # Compare the JS and Python flip fields
 """
 
-import numpy as np
+import argparse
 import json
-import os
+import subprocess
+import sys
+
+import numpy as np
+
+from stoner_wohlfarth import prolate_anisotropy, sweep
+from widget_runtime import write_page
 
 # --- Constants ---
-mu0 = 4 * np.pi * 1e-7
 Ms = 480e3
 q = 1.5
-
-e = np.sqrt(1.0 - 1.0 / q**2)
-N_a = (1.0 - e**2) / (2.0 * e**3) * (np.log((1.0 + e) / (1.0 - e)) - 2.0 * e)
-N_b = (1.0 - N_a) / 2.0
-K_u = 0.5 * mu0 * (N_b - N_a) * Ms**2
+K_u = float(prolate_anisotropy(q, Ms))
 
 phi_deg = 0.0
-phi = np.deg2rad(phi_deg)
 theta_init_deg = 180.0
 track_window_deg = 30.0
 
+# Tracking grid spacing used by the page
 theta_step_deg = 0.05
-theta_deg_full = np.arange(0.0, 180.0 + theta_step_deg, theta_step_deg)
-theta_full = np.deg2rad(theta_deg_full)
 
 b_values_mT = np.arange(0, 101, 1.0)
 
-def eps_a(th):
-    return K_u * np.sin(th) ** 2
-
-def eps_m(th, b_T):
-    return -Ms * b_T * np.cos(phi - th)
-
-def eps_t(th, b_T):
-    return eps_a(th) + eps_m(th, b_T)
-
-def deps_dtheta(th, b_T):
-    return 2.0 * K_u * np.sin(th) * np.cos(th) - Ms * b_T * np.sin(phi - th)
-
-def d2eps_dtheta2(th, b_T):
-    return 2.0 * K_u * np.cos(2.0 * th) + Ms * b_T * np.cos(phi - th)
-
-def find_stable_stationary_near(center_deg, window_deg, b_T):
-    d1 = deps_dtheta(theta_full, b_T)
-    d2 = d2eps_dtheta2(theta_full, b_T)
-    mask = (theta_deg_full >= center_deg - window_deg) & (theta_deg_full <= center_deg + window_deg)
-    idx = np.where(mask)[0]
-    if idx.size < 2:
-        return None
-    candidates = []
-    for i_end in (0, len(theta_deg_full) - 1):
-        if (theta_deg_full[i_end] >= center_deg - window_deg) and (theta_deg_full[i_end] <= center_deg + window_deg):
-            if np.isfinite(d1[i_end]) and np.isfinite(d2[i_end]):
-                if (np.abs(d1[i_end]) < 1e-6 * K_u) and (d2[i_end] > 0):
-                    candidates.append(i_end)
-    d1_sub = d1[idx]
-    finite = np.isfinite(d1_sub)
-    idx_f = idx[finite]
-    if idx_f.size >= 2:
-        d1_f = d1[idx_f]
-        s = np.sign(d1_f)
-        sc = np.where(s[:-1] * s[1:] < 0)[0]
-        for k in sc:
-            i0 = idx_f[k]
-            i1 = idx_f[k + 1]
-            denom = d1[i0] - d1[i1]
-            if np.abs(denom) < 1e-30:
-                continue
-            t = d1[i0] / denom
-            th_root = theta_full[i0] + t * (theta_full[i1] - theta_full[i0])
-            i_root = int(np.argmin(np.abs(theta_full - th_root)))
-            if (theta_deg_full[i_root] >= center_deg - window_deg) and (theta_deg_full[i_root] <= center_deg + window_deg):
-                if np.isfinite(d2[i_root]) and (d2[i_root] > 0):
-                    candidates.append(i_root)
-    if not candidates:
-        return None
-    candidates = sorted(set(candidates))
-    return int(min(candidates, key=lambda i: abs(theta_deg_full[i] - center_deg)))
-
-# Downsample for plotting
+# (q, phi in deg, Ms in kA/m) of the grains --check sweeps in JS and Python,
+# and the largest difference (mT) allowed between their flip fields
+CHECK_CASES = [(1.5, 0.0, 480.0), (1.2, 15.0, 480.0), (2.0, 30.0, 300.0), (1.8, 60.0, 420.0)]
+CHECK_TOLERANCE_MT = 1.0
+
+# Plot every `step`-th point of the tracking grid
 step = 10
-th_plot_deg = theta_deg_full[::step]
-th_plot = theta_full[::step]
-
-# Precompute all frames
-frames = []
-state_theta = theta_init_deg
-state_flipped = False
-flip_field = None
-
-for b_mT in b_values_mT:
-    b_T = b_mT * 1e-3
-    i_occ = find_stable_stationary_near(state_theta, track_window_deg, b_T)
-    if i_occ is None:
-        et_full = eps_t(theta_full, b_T)
-        i_global = int(np.argmin(et_full))
-        state_theta = float(theta_deg_full[i_global])
-        if not state_flipped:
-            flip_field = float(b_mT)
-        state_flipped = True
-    else:
-        state_theta = float(theta_deg_full[i_occ])
-
-    ea = eps_a(th_plot)
-    em = eps_m(th_plot, b_T)
-    et = ea + em
-    d1 = deps_dtheta(th_plot, b_T) / K_u
-    d2 = d2eps_dtheta2(th_plot, b_T) / K_u
-    i_glob_ds = int(np.argmin(et))
-    i_occ_ds = int(np.argmin(np.abs(th_plot_deg - state_theta)))
-
-    frames.append({
-        'b': float(b_mT),
-        'ea': [round(float(v), 2) for v in ea],
-        'em': [round(float(v), 2) for v in em],
-        'et': [round(float(v), 2) for v in et],
-        'd1': [round(float(v), 4) for v in d1],
-        'd2': [round(float(v), 4) for v in d2],
-        'ig': i_glob_ds,
-        'io': i_occ_ds,
-        'to': round(state_theta, 2),
-        'f': state_flipped,
-    })
-
-print(f"K_u = {K_u:.1f} J/m3")
-print(f"Flip at B = {flip_field} mT")
-print(f"Frames: {len(frames)}, points per frame: {len(th_plot_deg)}")
 
 data_json = json.dumps({
-    'theta': [round(float(v), 2) for v in th_plot_deg],
-    'frames': frames,
-    'K_u': round(K_u, 1),
-    'Ms_kAm': round(Ms / 1e3, 0),
     'q': q,
+    'Ms_kAm': round(Ms / 1e3, 0),
     'phi_deg': phi_deg,
+    'theta_init_deg': theta_init_deg,
+    'track_window_deg': track_window_deg,
+    'theta_step_deg': theta_step_deg,
+    'plot_step': step,
 }, separators=(',', ':'))
 
-print(f"JSON size: {len(data_json) / 1e3:.0f} KB")
-
-html_template = r"""<!DOCTYPE html>
-<html lang="en">
-<head>
-<meta charset="utf-8">
-<meta name="viewport" content="width=device-width, initial-scale=1">
-<title>Stoner-Wohlfarth Magnetization Reversal</title>
-<script src="https://cdn.plot.ly/plotly-2.35.2.min.js"></script>
-<style>
-  @import url('https://fonts.googleapis.com/css2?family=Source+Serif+4:ital,opsz,wght@0,8..60,300;0,8..60,400;0,8..60,600;1,8..60,400&family=JetBrains+Mono:wght@400&display=swap');
-
-  *{box-sizing:border-box;margin:0;padding:0}
-  body{
-    font-family:'Source Serif 4',Georgia,serif;
-    background:#f8f7f4;
-    color:#1e293b;
-    padding:20px 20px 40px;
-    min-height:100vh;
-  }
-  .container{max-width:620px;margin:0 auto}
-
-  h1{
-    font-size:1.45rem;font-weight:600;
-    letter-spacing:-0.01em;
-    margin-bottom:2px;
-    color:#0f172a;
-  }
-  .subtitle{
-    font-size:0.86rem;color:#64748b;
-    margin-bottom:16px;line-height:1.5;
-  }
-  .subtitle span{
-    font-family:'JetBrains Mono',monospace;
-    font-size:0.8rem;
-    background:#ece9e3;
-    padding:1px 5px;border-radius:3px;
-  }
+css = r"""
+/* Setup illustration */
+.setup-row{
+  display:flex;align-items:flex-start;gap:16px;
+  margin-bottom:14px;
+}
+.setup-diagram{
+  flex:0 0 auto;
+  background:#fff;
+  border:1px solid #d6d3cd;
+  border-radius:8px;
+  padding:0;
+  box-shadow:0 1px 3px rgba(0,0,0,0.04);
+  overflow:hidden;
+}
+.setup-caption{
+  flex:1;
+  font-size:0.84rem;
+  color:#475569;
+  line-height:1.55;
+  padding-top:6px;
+}
+.setup-caption b{color:#1e293b}
+
+.params{
+  display:grid;grid-template-columns:repeat(3,1fr);gap:8px 16px;
+  margin-bottom:12px;
+  padding:10px 14px;
+  background:#fff;
+  border:1px solid #d6d3cd;
+  border-radius:8px;
+  box-shadow:0 1px 3px rgba(0,0,0,0.04);
+}
+.params label{font-size:0.84rem;font-weight:600;white-space:nowrap}
+.params .slider-wrap{min-width:0;gap:6px}
+.p-val{
+  font-family:'JetBrains Mono',monospace;
+  font-size:0.8rem;
+  min-width:44px;text-align:right;
+  color:#475569;
+}
+.b-val{
+  font-family:'JetBrains Mono',monospace;
+  font-size:1.05rem;font-weight:600;
+  min-width:72px;text-align:right;
+  color:#b91c1c;
+}
+.status .flipped{color:#b91c1c;font-weight:600}
+.status .tracking{color:#16a34a;font-weight:600}
+.status .note{font-size:0.8rem;color:#94a3b8;font-style:italic}
+"""
 
-  /* Setup illustration */
-  .setup-row{
-    display:flex;align-items:flex-start;gap:16px;
-    margin-bottom:14px;
-  }
-  .setup-diagram{
-    flex:0 0 auto;
-    background:#fff;
-    border:1px solid #d6d3cd;
-    border-radius:8px;
-    padding:0;
-    box-shadow:0 1px 3px rgba(0,0,0,0.04);
-    overflow:hidden;
-  }
-  .setup-caption{
-    flex:1;
-    font-size:0.84rem;
-    color:#475569;
-    line-height:1.55;
-    padding-top:6px;
-  }
-  .setup-caption b{color:#1e293b}
-
-  .controls{
-    display:flex;align-items:center;gap:12px;
-    flex-wrap:wrap;
-    margin-bottom:12px;
-    padding:10px 14px;
-    background:#fff;
-    border:1px solid #d6d3cd;
-    border-radius:8px;
-    box-shadow:0 1px 3px rgba(0,0,0,0.04);
-  }
-  .controls label{font-size:0.9rem;font-weight:600;white-space:nowrap}
-  .slider-wrap{flex:1;min-width:180px;display:flex;align-items:center;gap:10px}
-  .slider-wrap input[type=range]{
-    flex:1;height:6px;-webkit-appearance:none;appearance:none;
-    background:#d6d3cd;border-radius:3px;outline:none;cursor:pointer;
-  }
-  .slider-wrap input[type=range]::-webkit-slider-thumb{
-    -webkit-appearance:none;width:18px;height:18px;
-    background:#b91c1c;border:2px solid #fff;border-radius:50%;
-    box-shadow:0 1px 4px rgba(0,0,0,0.25);cursor:pointer;
-  }
-  .slider-wrap input[type=range]::-moz-range-thumb{
-    width:18px;height:18px;
-    background:#b91c1c;border:2px solid #fff;border-radius:50%;
-    box-shadow:0 1px 4px rgba(0,0,0,0.25);cursor:pointer;
-  }
-  .b-val{
-    font-family:'JetBrains Mono',monospace;
-    font-size:1.05rem;font-weight:600;
-    min-width:72px;text-align:right;
-    color:#b91c1c;
-  }
-  .btn{
-    font-family:inherit;font-size:0.82rem;font-weight:600;
-    padding:5px 12px;border:1px solid #d6d3cd;border-radius:5px;
-    background:#fff;color:#1e293b;cursor:pointer;
-    transition:background 0.15s,border-color 0.15s;
-    white-space:nowrap;
-  }
-  .btn:hover{background:#f1f0ec;border-color:#94a3b8}
-  .btn.active{background:#b91c1c;color:#fff;border-color:#b91c1c}
-
-  .status{
-    font-size:0.86rem;line-height:1.6;
-    padding:7px 14px;
-    margin-bottom:10px;
-    background:#fff;
-    border:1px solid #d6d3cd;
-    border-radius:8px;
-  }
-  .status .lbl{font-weight:600}
-  .status .flipped{color:#b91c1c;font-weight:600}
-  .status .tracking{color:#16a34a;font-weight:600}
-  .status .note{font-size:0.8rem;color:#94a3b8;font-style:italic}
-
-  #plot{
-    background:#fff;
-    border:1px solid #d6d3cd;
-    border-radius:8px;
-    box-shadow:0 1px 3px rgba(0,0,0,0.04);
-    overflow:hidden;
-  }
-</style>
-</head>
-<body>
+body = r"""
 <div class="container">
   <!-- Setup illustration -->
   <div class="setup-row">
@@ -293,8 +144,8 @@ html_template = r"""<!DOCTYPE html>
         <!-- Easy axis dashed line -->
         <line x1="40" y1="50" x2="260" y2="50" stroke="#94a3b8" stroke-width="1" stroke-dasharray="5,4"/>
 
-        <!-- Grain (prolate ellipse, q=1.5) -->
-        <ellipse cx="160" cy="50" rx="72" ry="48" fill="#fef3c7" stroke="#d97706" stroke-width="1.8" opacity="0.85"/>
+        <!-- Grain (prolate ellipse, ry = rx / q) -->
+        <ellipse id="grain" cx="160" cy="50" rx="72" ry="48" fill="#fef3c7" stroke="#d97706" stroke-width="1.8" opacity="0.85"/>
 
         <!-- Easy axis label -->
         <text x="238" y="64" font-family="Source Serif 4,Georgia,serif" font-size="16" fill="#94a3b8" font-style="italic">easy axis</text>
@@ -304,10 +155,10 @@ html_template = r"""<!DOCTYPE html>
         <text x="200" y="44" font-family="Source Serif 4,Georgia,serif" font-size="22" fill="#b91c1c" font-weight="600" font-style="italic">M</text>
         <text x="170" y="68" font-family="Source Serif 4,Georgia,serif" font-size="16" fill="#b91c1c">&theta; = 180&deg;</text>
 
-        <!-- B arrow: points LEFT (phi=0, applied opposite to M) -->
-        <line x1="118" y1="28" x2="52" y2="28" stroke="#2563eb" stroke-width="2.8" marker-end="url(#arrowB)"/>
+        <!-- B arrow: points LEFT at phi=0 (applied opposite to M), rotated by phi -->
+        <line id="bArrow" x1="118" y1="28" x2="52" y2="28" stroke="#2563eb" stroke-width="2.8" marker-end="url(#arrowB)"/>
         <text x="120" y="25" font-family="Source Serif 4,Georgia,serif" font-size="22" fill="#2563eb" font-weight="600" font-style="italic">B</text>
-        <text x="60" y="18" font-family="Source Serif 4,Georgia,serif" font-size="16" fill="#2563eb">&phi; = 0&deg;</text>
+        <text id="phiLabel" x="60" y="18" font-family="Source Serif 4,Georgia,serif" font-size="16" fill="#2563eb">&phi; = 0&deg;</text>
       </svg>
     </div>
     <div class="setup-caption">
@@ -319,6 +170,30 @@ html_template = r"""<!DOCTYPE html>
     </div>
   </div>
 
+  <div class="params">
+    <div>
+      <label for="qSlider">Aspect ratio q</label>
+      <div class="slider-wrap">
+        <input type="range" id="qSlider" min="1.05" max="3" step="0.05">
+        <div class="p-val" id="qVal"></div>
+      </div>
+    </div>
+    <div>
+      <label for="phiSlider">Field angle &phi;</label>
+      <div class="slider-wrap">
+        <input type="range" id="phiSlider" min="0" max="90" step="1">
+        <div class="p-val" id="phiVal"></div>
+      </div>
+    </div>
+    <div>
+      <label for="msSlider">M<sub>s</sub> (kA/m)</label>
+      <div class="slider-wrap">
+        <input type="range" id="msSlider" min="50" max="800" step="10">
+        <div class="p-val" id="msVal"></div>
+      </div>
+    </div>
+  </div>
+
   <div class="controls">
     <label>B&nbsp;(mT):</label>
     <div class="slider-wrap">
@@ -335,20 +210,146 @@ html_template = r"""<!DOCTYPE html>
 
   <div id="plot"></div>
 </div>
+"""
+
+solver_js = r"""
+const P = %%DATA%%;
+
+/* --- Physics (energy model as in stoner_wohlfarth.py; minimum tracked on a grid) --- */
+const mu0 = 4 * Math.PI * 1e-7;
+const DEG = Math.PI / 180;
+
+// Tracking grid 0-180 deg with its sines and cosines (the energy terms
+// below are evaluated at grid index i); the plots use every
+// P.plot_step-th point
+const nFull = Math.round(180 / P.theta_step_deg) + 1;
+const thetaDegFull = new Float64Array(nFull);
+const sinT = new Float64Array(nFull);
+const cosT = new Float64Array(nFull);
+for (let i = 0; i < nFull; i++) {
+  thetaDegFull[i] = i * P.theta_step_deg;
+  sinT[i] = Math.sin(thetaDegFull[i] * DEG);
+  cosT[i] = Math.cos(thetaDegFull[i] * DEG);
+}
+const theta = [];
+for (let i = 0; i < nFull; i += P.plot_step) theta.push(thetaDegFull[i]);
+
+/* Prolate spheroid of aspect ratio q with magnetization Ms (kA/m) and a
+   field at phi (deg) to the easy axis */
+function grainModel(q, MsKAm, phiDeg) {
+  const Ms = MsKAm * 1e3;
+  const e = Math.sqrt(1 - 1 / (q * q));
+  const Na = (1 - e * e) / (2 * e ** 3) * (Math.log((1 + e) / (1 - e)) - 2 * e);
+  const Nb = (1 - Na) / 2;
+  const Ku = 0.5 * mu0 * (Nb - Na) * Ms * Ms;
+  return {Ms: Ms, Ku: Ku, sinPhi: Math.sin(phiDeg * DEG), cosPhi: Math.cos(phiDeg * DEG)};
+}
+
+// cos(phi - th) and sin(phi - th) expanded so no trig runs per point
+function epsA(g, i)      { return g.Ku * sinT[i] * sinT[i]; }
+function epsM(g, i, bT)  { return -g.Ms * bT * (g.cosPhi * cosT[i] + g.sinPhi * sinT[i]); }
+function depsDtheta(g, i, bT) {
+  return 2 * g.Ku * sinT[i] * cosT[i] - g.Ms * bT * (g.sinPhi * cosT[i] - g.cosPhi * sinT[i]);
+}
+function d2epsDtheta2(g, i, bT) {
+  return 2 * g.Ku * (cosT[i] * cosT[i] - sinT[i] * sinT[i])
+    + g.Ms * bT * (g.cosPhi * cosT[i] + g.sinPhi * sinT[i]);
+}
+
+/* Index of the stable stationary point (d1 = 0, d2 > 0) closest to
+   centerDeg within +/- windowDeg, or -1 if the minimum has vanished */
+function findStableStationaryNear(g, centerDeg, windowDeg, bT) {
+  const lo = centerDeg - windowDeg, hi = centerDeg + windowDeg;
+  const inWindow = i => thetaDegFull[i] >= lo && thetaDegFull[i] <= hi;
+  let i0 = Math.max(0, Math.floor(lo / P.theta_step_deg) - 1);
+  let i1 = Math.min(nFull - 1, Math.ceil(hi / P.theta_step_deg) + 1);
+  while (i0 <= i1 && !inWindow(i0)) i0++;
+  while (i1 >= i0 && !inWindow(i1)) i1--;
+  if (i1 - i0 + 1 < 2) return -1;
+
+  const candidates = [];
+  for (const iEnd of [0, nFull - 1]) {
+    if (!inWindow(iEnd)) continue;
+    const d1 = depsDtheta(g, iEnd, bT);
+    if (Math.abs(d1) < 1e-6 * g.Ku && d2epsDtheta2(g, iEnd, bT) > 0) candidates.push(iEnd);
+  }
+  let prev = depsDtheta(g, i0, bT);
+  for (let i = i0 + 1; i <= i1; i++) {
+    const d1 = depsDtheta(g, i, bT);
+    if (prev * d1 < 0 && Math.abs(prev - d1) >= 1e-30) {
+      // Linear interpolation to the zero crossing, snapped to the grid
+      const iRoot = Math.min(nFull - 1, Math.max(0, Math.round(i - 1 + prev / (prev - d1))));
+      if (inWindow(iRoot) && d2epsDtheta2(g, iRoot, bT) > 0) candidates.push(iRoot);
+    }
+    prev = d1;
+  }
+  let best = -1;
+  for (const i of candidates.sort((a, b) => a - b)) {
+    if (best < 0 || Math.abs(thetaDegFull[i] - centerDeg) < Math.abs(thetaDegFull[best] - centerDeg)) best = i;
+  }
+  return best;
+}
+
+/* Follow the occupied minimum from B = 0 in 1 mT steps; when it vanishes
+   the moment drops into the global minimum (flips) */
+function sweep(g, bMax) {
+  const out = [];
+  let stateTheta = P.theta_init_deg, flipped = false;
+  for (let b = 0; b <= bMax; b++) {
+    const bT = b * 1e-3;
+    const iOcc = findStableStationaryNear(g, stateTheta, P.track_window_deg, bT);
+    if (iOcc < 0) {
+      let iGlobal = 0, eMin = Infinity;
+      for (let i = 0; i < nFull; i++) {
+        const et = epsA(g, i) + epsM(g, i, bT);
+        if (et < eMin) { eMin = et; iGlobal = i; }
+      }
+      stateTheta = thetaDegFull[iGlobal];
+      flipped = true;
+    } else {
+      stateTheta = thetaDegFull[iOcc];
+    }
+    out.push({b: b, to: stateTheta, f: flipped});
+  }
+  return out;
+}
 
-<script>
-const DATA = %%DATA%%;
-const theta = DATA.theta;
-const frames = DATA.frames;
+/* Curves and markers at field step idx */
+function computeFrame(idx) {
+  const s = states[idx], bT = s.b * 1e-3, n = theta.length;
+  const ea = new Float64Array(n), em = new Float64Array(n), et = new Float64Array(n);
+  const d1 = new Float64Array(n), d2 = new Float64Array(n);
+  let ig = 0, io = 0;
+  for (let k = 0; k < n; k++) {
+    const i = k * P.plot_step;
+    ea[k] = epsA(grain, i);
+    em[k] = epsM(grain, i, bT);
+    et[k] = ea[k] + em[k];
+    d1[k] = depsDtheta(grain, i, bT) / grain.Ku;
+    d2[k] = d2epsDtheta2(grain, i, bT) / grain.Ku;
+    if (et[k] < et[ig]) ig = k;
+    if (Math.abs(theta[k] - s.to) < Math.abs(theta[io] - s.to)) io = k;
+  }
+  return {b: s.b, ea: ea, em: em, et: et, d1: d1, d2: d2, ig: ig, io: io, to: s.to, f: s.f};
+}
+
+/* B range: 10% past the microscopic coercivity 2 Ku / Ms */
+function fieldMax(g) {
+  return Math.max(20, Math.ceil(1.1 * 2 * g.Ku / g.Ms * 1e3 / 10) * 10);
+}
+"""
+
+ui_js = r"""
+let grain = grainModel(P.q, P.Ms_kAm, P.phi_deg);
+let states = sweep(grain, fieldMax(grain));
 
 const C = {
   ea:'#b91c1c', em:'#2563eb', et:'#1e293b',
   d1:'#1e293b', d2:'#94a3b8',
-  glob:'#0f172a', occ:'#b91c1c', grid:'#e8e6e1', ax:'#334155',
+  glob:'#0f172a', occ:'#b91c1c',
 };
 
-const init = frames[0];
-const ff = 'Source Serif 4, Georgia, serif';
+const init = computeFrame(0);
 
 // --- Traces ---
 // Top panel: indices 0-4 (energy traces + markers) — showlegend on top
@@ -392,88 +393,43 @@ const traces = [
    line:{color:C.occ,width:1.5,dash:'dot'},xaxis:'x2',yaxis:'y2'},
 ];
 
-const axC = {
-  range:[0,180],dtick:20,
-  showgrid:true,gridcolor:C.grid,gridwidth:1,
-  zeroline:false,linecolor:C.ax,linewidth:1.5,mirror:true,
-  ticks:'inside',ticklen:5,
-  tickfont:{family:ff,size:11},
-};
+const axC = {range:[0,180],dtick:20};
 
-const layout = {
-  width:600,height:440,
-  margin:{l:68,r:24,t:10,b:50},
-  paper_bgcolor:'transparent',
-  plot_bgcolor:'#fff',
-  font:{family:ff,size:12,color:'#1e293b'},
-
-  xaxis:{...axC,domain:[0,1],anchor:'y',showticklabels:false},
-  yaxis:{
-    title:{text:'Energy density (J/m\u00B3)',font:{size:13}},
-    domain:[0.50,1],anchor:'x',
-    showgrid:true,gridcolor:C.grid,
-    zeroline:false,linecolor:C.ax,linewidth:1.5,mirror:true,
-    ticks:'inside',ticklen:5,
-    tickfont:{family:ff,size:11},
-  },
-
-  xaxis2:{...axC,domain:[0,1],anchor:'y2',
-    title:{text:'\u03B8 (degrees)',font:{size:13}}},
-  yaxis2:{
-    title:{text:'Normalized derivatives',font:{size:13}},
-    domain:[0,0.40],anchor:'x2',
-    showgrid:true,gridcolor:C.grid,
-    zeroline:false,linecolor:C.ax,linewidth:1.5,mirror:true,
-    ticks:'inside',ticklen:5,
-    tickfont:{family:ff,size:11},
-  },
-
-  /* Energy legend on top panel */
-  legend:{
-    bgcolor:'rgba(255,255,255,0.92)',
-    bordercolor:'#d6d3cd',borderwidth:1,
-    font:{size:11},
-    x:0.02,y:0.99,xanchor:'left',yanchor:'top',
-    borderpad:14,
-  },
-  /* Derivative legend on bottom panel */
-  legend2:{
-    bgcolor:'rgba(255,255,255,0.92)',
-    bordercolor:'#d6d3cd',borderwidth:1,
-    font:{size:11},
-    x:0.02,y:0.40,xanchor:'left',yanchor:'top',
-    borderpad:14,
-  },
+/* Labels next to the global minimum and the occupied state */
+function markerNotes(f, occText) {
+  return [
+    Object.assign(Widget.note(theta[f.ig], f.et[f.ig], 'global<br>min', C.glob, 10),
+                  {xref:'x',yref:'y',xanchor:'left',xshift:10}),
+    Object.assign(Widget.note(theta[f.io], f.et[f.io], occText, C.occ, 10),
+                  {xref:'x',yref:'y',xanchor:'right',xshift:-10}),
+  ];
+}
 
-  hovermode:'x unified',
+Widget.plot('plot', traces, Widget.layout({
+  height:440,
 
-  annotations:[
-    {x:theta[init.ig],y:init.et[init.ig],xref:'x',yref:'y',
-     text:'global<br>min',showarrow:false,xanchor:'left',xshift:10,
-     font:{size:10,color:C.glob,family:ff},
-     bgcolor:'rgba(255,255,255,0.85)',borderpad:2},
-    {x:theta[init.io],y:init.et[init.io],xref:'x',yref:'y',
-     text:'occupied<br>LEM',showarrow:false,xanchor:'right',xshift:-10,
-     font:{size:10,color:C.occ,family:ff},
-     bgcolor:'rgba(255,255,255,0.85)',borderpad:2},
-  ],
-};
+  xaxis:Widget.axis(null, {...axC,domain:[0,1],anchor:'y',showticklabels:false}),
+  yaxis:Widget.axis('Energy density (J/m\u00B3)', {domain:[0.50,1],anchor:'x'}),
+
+  xaxis2:Widget.axis('\u03B8 (degrees)', {...axC,domain:[0,1],anchor:'y2'}),
+  yaxis2:Widget.axis('Normalized derivatives', {domain:[0,0.40],anchor:'x2'}),
+
+  /* Energy legend on top panel, derivative legend on bottom panel */
+  legend:Widget.legend({x:0.02,y:0.99,xanchor:'left',borderpad:14}),
+  legend2:Widget.legend({x:0.02,y:0.40,xanchor:'left',borderpad:14}),
+
+  hovermode:'x unified',
 
-Plotly.newPlot('plot',traces,layout,{displayModeBar:false,responsive:true});
+  annotations:markerNotes(init, 'occupied<br>LEM'),
+}));
 
 // --- Interactivity ---
 const slider = document.getElementById('bSlider');
 const bValEl = document.getElementById('bVal');
 const statusEl = document.getElementById('status');
-const btnPlay = document.getElementById('btnPlay');
-const btnReset = document.getElementById('btnReset');
-
-// Track the max B reached (monotonic forward only)
-let maxReached = 0;
 
 function updateToFrame(idx) {
-  const f = frames[idx];
-  const occText = f.f ? 'flipped<br>here' : 'occupied<br>LEM';
+  const f = computeFrame(idx);
 
   Plotly.update('plot', {
     y:[f.ea, f.em, f.et,
@@ -483,20 +439,10 @@ function updateToFrame(idx) {
        [theta[f.ig]], [theta[f.io]],
        theta, theta, [0,180], [f.to,f.to]],
   }, {
-    annotations:[
-      {x:theta[f.ig],y:f.et[f.ig],xref:'x',yref:'y',
-       text:'global<br>min',showarrow:false,xanchor:'left',xshift:10,
-       font:{size:10,color:C.glob,family:ff},
-       bgcolor:'rgba(255,255,255,0.85)',borderpad:2},
-      {x:theta[f.io],y:f.et[f.io],xref:'x',yref:'y',
-       text:occText,showarrow:false,xanchor:'right',xshift:-10,
-       font:{size:10,color:C.occ,family:ff},
-       bgcolor:'rgba(255,255,255,0.85)',borderpad:2},
-    ],
+    annotations:markerNotes(f, f.f ? 'flipped<br>here' : 'occupied<br>LEM'),
   }, [0,1,2,3,4,5,6,7,8]);
 
   bValEl.textContent = f.b.toFixed(0) + ' mT';
-  slider.value = idx;
 
   if (f.f) {
     statusEl.innerHTML = '<span class="lbl">State:</span> \u03B8 \u2248 ' +
@@ -508,62 +454,137 @@ function updateToFrame(idx) {
   }
 }
 
-// Monotonic slider: only allow forward movement
-slider.addEventListener('input', function() {
-  let requested = parseInt(this.value);
-  if (requested < maxReached) {
-    // Snap back to maxReached — don't allow backward
-    this.value = maxReached;
-    return;
-  }
-  maxReached = requested;
-  updateToFrame(requested);
+// Monotonic slider: only forward movement, Reset goes back to B = 0
+const player = Widget.player({
+  slider:'bSlider', play:'btnPlay', reset:'btnReset',
+  interval:100, forwardOnly:true, show:updateToFrame,
 });
 
-let playing = false, playTimer = null;
+/* --- Grain parameters: re-run the sweep and restart from B = 0 --- */
+const qSlider = document.getElementById('qSlider');
+const phiSlider = document.getElementById('phiSlider');
+const msSlider = document.getElementById('msSlider');
+
+function showParams(q, phiDeg, MsKAm) {
+  document.getElementById('qVal').textContent = q.toFixed(2);
+  document.getElementById('phiVal').textContent = phiDeg.toFixed(0) + '\u00B0';
+  document.getElementById('msVal').textContent = MsKAm.toFixed(0);
+  // Long axis 72 units, short axis at most 48 so the grain fits the diagram
+  const ry = Math.min(48, 72 / q);
+  const grainEl = document.getElementById('grain');
+  grainEl.setAttribute('rx', (ry * q).toFixed(1));
+  grainEl.setAttribute('ry', ry.toFixed(1));
+  document.getElementById('bArrow').setAttribute('transform', 'rotate(' + phiDeg + ' 85 28)');
+  document.getElementById('phiLabel').textContent = '\u03C6 = ' + phiDeg.toFixed(0) + '\u00B0';
+  slider.max = states.length - 1;
+}
 
-function stopPlay() {
-  playing = false;
-  clearInterval(playTimer);
-  btnPlay.innerHTML = '&#9654; Play';
-  btnPlay.classList.remove('active');
+function setParams() {
+  const q = parseFloat(qSlider.value);
+  const phiDeg = parseFloat(phiSlider.value);
+  const MsKAm = parseFloat(msSlider.value);
+  grain = grainModel(q, MsKAm, phiDeg);
+  states = sweep(grain, fieldMax(grain));
+  showParams(q, phiDeg, MsKAm);
+  player.reset();
 }
 
-btnPlay.addEventListener('click', function() {
-  if (playing) { stopPlay(); return; }
-  playing = true;
-  btnPlay.innerHTML = '&#9646;&#9646; Pause';
-  btnPlay.classList.add('active');
-  let idx = maxReached;
-  playTimer = setInterval(function() {
-    idx++;
-    if (idx >= frames.length) { stopPlay(); return; }
-    maxReached = idx;
-    updateToFrame(idx);
-  }, 100);
-});
+qSlider.value = P.q;
+phiSlider.value = P.phi_deg;
+msSlider.value = P.Ms_kAm;
+showParams(P.q, P.phi_deg, P.Ms_kAm);
+[qSlider, phiSlider, msSlider].forEach(el => el.addEventListener('input', setParams));
+"""
 
-btnReset.addEventListener('click', function() {
-  stopPlay();
-  maxReached = 0;
-  updateToFrame(0);
-});
-</script>
-</body>
-</html>"""
-
-html_out = html_template
-html_out = html_out.replace('%%DATA%%', data_json)
-html_out = html_out.replace('%%Q%%', str(q))
-html_out = html_out.replace('%%MS%%', str(int(Ms/1e3)))
-html_out = html_out.replace('%%PHI%%', str(int(phi_deg)))
-html_out = html_out.replace('%%KU%%', str(round(K_u, 1)))
-
-output_path = '../book/figures/chapter5/flipping_field_widget.html'
-os.makedirs(os.path.dirname(output_path), exist_ok=True)
-with open(output_path, 'w') as f:
-    f.write(html_out)
-
-sz = os.path.getsize(output_path)
-print(f"Written to {output_path}")
-print(f"File size: {sz / 1e3:.0f} KB")
\ No newline at end of file
+script = solver_js + ui_js
+
+# Sweeps each (q, phi_deg, Ms_kAm) case with the page's solver and prints
+# [field range, flip field or null] per case
+check_js = r"""
+const cases = %%CASES%%;
+console.log(JSON.stringify(cases.map(([q, phiDeg, MsKAm]) => {
+  const g = grainModel(q, MsKAm, phiDeg);
+  const bMax = fieldMax(g);
+  const flip = sweep(g, bMax).find(s => s.f);
+  return [bMax, flip ? flip.b : null];
+})));
+"""
+
+
+def flip_field(b_mT, q: float, phi_deg: float, Ms: float):
+    """Field (mT) of the 1 mT sweep at which the moment, starting at
+    theta_init_deg, has turned by more than 90 degrees, or None.
+
+    Uses the exact stationary points of stoner_wohlfarth.py; the page
+    repeats the sweep in JS for whatever q, phi and Ms the sliders select.
+    """
+    path_deg = np.rad2deg(sweep(np.asarray(b_mT) * 1e-3, prolate_anisotropy(q, Ms), Ms,
+                                np.deg2rad(phi_deg), np.deg2rad(theta_init_deg)))
+    turned = np.abs((path_deg - theta_init_deg + 180.0) % 360.0 - 180.0)
+    flipped = np.maximum.accumulate(turned > 90.0)
+    return float(b_mT[flipped.argmax()]) if flipped.any() else None
+
+
+def js_flip_fields(cases):
+    """Run the page's JS solver under node.
+
+    Returns:
+        List of (field range in mT, flip field in mT or None), one per
+        (q, phi_deg, Ms_kAm) case
+    """
+    program = (solver_js.replace('%%DATA%%', data_json)
+               + check_js.replace('%%CASES%%', json.dumps(cases)))
+    result = subprocess.run(["node", "-"], input=program, capture_output=True, text=True,
+                            check=True)
+    return json.loads(result.stdout)
+
+
+def check(cases=CHECK_CASES, tolerance: float = CHECK_TOLERANCE_MT) -> bool:
+    """Compare the JS and Python flip fields; prints one line per case."""
+    ok = True
+    print(f"{'q':>5} {'phi':>5} {'Ms':>5} {'JS (mT)':>8} {'Python':>8}")
+    for (q_, phi_, ms_), (b_max, js_flip) in zip(cases, js_flip_fields(cases)):
+        py_flip = flip_field(np.arange(0, b_max + 1, 1.0), q_, phi_, ms_ * 1e3)
+        if js_flip is None or py_flip is None:
+            match = js_flip is py_flip
+        else:
+            match = abs(js_flip - py_flip) <= tolerance
+        ok &= match
+        print(f"{q_:5.2f} {phi_:5.0f} {ms_:5.0f} {str(js_flip):>8} {str(py_flip):>8}"
+              + ("" if match else "  MISMATCH"))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stoner-Wohlfarth flipping field widget")
+    parser.add_argument(
+        "--check", action="store_true",
+        help=f"Check the JS flip fields against Python (within {CHECK_TOLERANCE_MT:g} mT) "
+             "instead of writing the widget; needs node"
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        try:
+            ok = check()
+        except (OSError, subprocess.CalledProcessError) as exc:
+            print(f"ERROR: could not run the JS solver under node ({exc})")
+            sys.exit(1)
+        print("JS and Python flip fields agree" if ok else "FAILED: JS and Python flip fields differ")
+        sys.exit(0 if ok else 1)
+
+    print(f"K_u = {K_u:.1f} J/m3")
+    print(f"Flip at B = {flip_field(b_values_mT, q, phi_deg, Ms)} mT")
+    print(f"Field steps: {len(b_values_mT)}")
+
+    output_path = write_page('../book/figures/chapter5/flipping_field_widget.html',
+                             'Stoner-Wohlfarth Magnetization Reversal', body,
+                             script.replace('%%DATA%%', data_json), css)
+
+    sz = output_path.stat().st_size
+    print(f"Written to {output_path}")
+    print(f"File size: {sz / 1e3:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
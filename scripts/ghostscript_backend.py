@@ -0,0 +1,315 @@
+"""
+Ghostscript-direct backend for the figure-build engine (figure_build.py).
+
+Renders each EPS straight to PNG with Ghostscript, substituting fonts through
+the custom fontmap in scripts/fontmap/. Used by convert_figures.py.
+
+With --batch, all figures are rendered by one Ghostscript process (or --jobs
+processes) instead of one per file; see convert_eps_batch_to_png(). With
+--async, the per-file processes are run from an asyncio event loop with
+streamed output, an optional --timeout, and partial PNGs removed on failure
+or Ctrl-C; see convert_eps_files_async() and figure_async.py.
+
+Requires ghostscript: install via `mamba install ghostscript` or `brew install ghostscript`
+"""
+
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import figure_profile
+from figure_async import Job, partial_path, run_jobs
+from figure_build import Stage, describe_dirs
+from figure_cache import tool_version
+from figure_registry import EPS_DIR, PROJECT_ROOT
+
+FONTMAP_PATH = PROJECT_ROOT / "scripts" / "fontmap" / "Fontmap.custom"
+
+# Printed by the batch driver program after each file so results can be
+# attributed to the right figure
+BATCH_MARKER = "%%ESS-BATCH"
+
+
+def check_ghostscript():
+    """Check that ghostscript is available."""
+    try:
+        subprocess.run(["gs", "--version"], capture_output=True, check=True)
+        return True
+    except FileNotFoundError:
+        print("ERROR: ghostscript (gs) not found.")
+        print("Install with: mamba install ghostscript  OR  brew install ghostscript")
+        return False
+
+
+def convert_eps_to_png(eps_path: Path, png_path: Path, dpi: int = 300, use_fontmap: bool = True,
+                       log=print):
+    """Convert an EPS file to PNG using ghostscript.
+
+    Args:
+        eps_path: Path to the input EPS file
+        png_path: Path for the output PNG file
+        dpi: Resolution in dots per inch (default: 300)
+        use_fontmap: Whether to use custom fontmap for font substitution (default: True)
+        log: Where to send error messages (default: print)
+
+    Note: Font substitution via fontmap may not work for EPS files with embedded
+    font subsets (common in Adobe Illustrator files). In such cases, the embedded
+    fonts will be used as-is.
+    """
+    cmd = eps_to_png_command(eps_path, png_path, dpi, use_fontmap)
+    with figure_profile.figure(eps_path.stem):
+        result = figure_profile.run(cmd, "eps->png")
+    if result.returncode != 0:
+        log(f"  FAILED: {result.stderr.strip()}")
+        return False
+    return True
+
+
+def eps_to_png_command(eps_path: Path, png_path: Path, dpi: int = 300,
+                       use_fontmap: bool = True):
+    """The ghostscript command line rendering one EPS file to `png_path`."""
+    cmd = [
+        "gs",
+        "-dBATCH",
+        "-dNOPAUSE",
+        "-dEPSCrop",
+        "-sDEVICE=png16m",
+        f"-r{dpi}",
+    ]
+
+    # Add fontmap if requested and file exists
+    if use_fontmap and FONTMAP_PATH.exists():
+        cmd.append(f"-sFONTMAP={FONTMAP_PATH}")
+
+    cmd.extend([
+        f"-sOutputFile={png_path}",
+        str(eps_path),
+    ])
+    return cmd
+
+
+def _ps_string(value) -> str:
+    """Encode a path as a PostScript hex string (no escaping needed)."""
+    return "<" + str(value).encode("utf-8").hex() + ">"
+
+
+def convert_eps_batch_to_png(pairs, dpi: int = 300, use_fontmap: bool = True):
+    """Convert several EPS files to PNG in a single ghostscript process.
+
+    Saves the interpreter and font-loading startup that convert_eps_to_png()
+    pays for every file. A small PostScript driver switches OutputFile with
+    setpagedevice before running each EPS inside `stopped`, and prints a
+    marker line with the file's index and outcome, so an error in one figure
+    is attributed to it without aborting the rest of the batch.
+
+    Args:
+        pairs: List of (eps_path, png_path) tuples
+        dpi: Resolution in dots per inch (default: 300)
+        use_fontmap: Whether to use custom fontmap for font substitution (default: True)
+
+    Returns:
+        List of results aligned with `pairs`: True (converted), False (failed),
+        or None if ghostscript exited before reaching that file.
+    """
+    if not pairs:
+        return []
+
+    cmd = [
+        "gs",
+        "-q",
+        "-dBATCH",
+        "-dNOPAUSE",
+        "-dEPSCrop",
+        "-sDEVICE=png16m",
+        f"-r{dpi}",
+    ]
+
+    if use_fontmap and FONTMAP_PATH.exists():
+        cmd.append(f"-sFONTMAP={FONTMAP_PATH}")
+
+    # Files opened from PostScript (rather than named on the command line)
+    # must be explicitly permitted under -dSAFER
+    for eps_path, png_path in pairs:
+        cmd.append(f"--permit-file-read={eps_path}")
+        cmd.append(f"--permit-file-write={png_path}")
+
+    program = []
+    for i, (eps_path, png_path) in enumerate(pairs):
+        program.append(
+            f"<< /OutputFile {_ps_string(png_path)} >> setpagedevice "
+            f"{{ {_ps_string(eps_path)} run }} stopped "
+            f"{{ $error /newerror false put ({BATCH_MARKER} {i} failed) }} "
+            f"{{ ({BATCH_MARKER} {i} ok) }} ifelse "
+            # Leave nothing from this figure on the stacks for the next one
+            "= flush clear cleardictstack"
+        )
+
+    cmd.extend([
+        f"-sOutputFile={pairs[0][1]}",
+        "-c", "\n".join(program),
+    ])
+
+    started = time.time()
+    # A batch is one process, so the profile can only attribute it as a whole
+    with figure_profile.figure(f"(batch of {len(pairs)})"):
+        result = figure_profile.run(cmd, "eps->png (batch)")
+
+    outcomes = {}
+    for line in result.stdout.splitlines():
+        if line.startswith(BATCH_MARKER):
+            _, index, status = line.split()
+            outcomes[int(index)] = status == "ok"
+
+    results = []
+    for i, (eps_path, png_path) in enumerate(pairs):
+        if i not in outcomes:
+            results.append(None)
+            continue
+        # An EPS that never calls showpage "succeeds" without writing a page
+        written = png_path.exists() and png_path.stat().st_mtime >= started - 1
+        results.append(outcomes[i] and written)
+    return results
+
+
+def convert_eps_files_batched(pairs, dpi: int = 300, use_fontmap: bool = True, jobs: int = 1):
+    """Convert EPS files with one or more batched ghostscript processes.
+
+    The files are split into `jobs` contiguous batches run concurrently. Any
+    file a batch did not reach (because ghostscript itself died) is retried
+    on its own with convert_eps_to_png().
+
+    Returns:
+        List of booleans aligned with `pairs`
+    """
+    jobs = max(1, min(jobs, len(pairs)))
+    size = -(-len(pairs) // jobs) if pairs else 0
+    batches = [pairs[i:i + size] for i in range(0, len(pairs), size)] if pairs else []
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        batch_results = pool.map(
+            lambda batch: convert_eps_batch_to_png(batch, dpi, use_fontmap), batches
+        )
+        results = [r for batch in batch_results for r in batch]
+
+    for i, (eps_path, png_path) in enumerate(pairs):
+        if results[i] is None:
+            results[i] = convert_eps_to_png(eps_path, png_path, dpi, use_fontmap)
+    return results
+
+
+def convert_eps_files_async(pairs, dpi: int = 300, use_fontmap: bool = True, jobs: int = 1,
+                            timeout: float = None):
+    """Convert EPS files with one ghostscript process each, run by asyncio.
+
+    Each PNG is written to a `.part` file first, so an interrupted or timed
+    out conversion never leaves a truncated PNG (see figure_async.py).
+
+    Args:
+        pairs: (EPS path, PNG path) for each figure
+        jobs: Most ghostscript processes running at once
+        timeout: Seconds each conversion may take, or None for no limit
+
+    Returns:
+        List of (success, report lines) aligned with `pairs`
+    """
+    work = [
+        Job(eps_path.stem,
+            eps_to_png_command(eps_path, partial_path(png_path), dpi, use_fontmap),
+            png_path, stage="eps->png")
+        for eps_path, png_path in pairs
+    ]
+    return run_jobs(work, concurrency=jobs, timeout=timeout)
+
+
+class GhostscriptBackend:
+    """EPS -> PNG in one Ghostscript step, fonts substituted via the fontmap."""
+
+    name = "ghostscript"
+    produces_raster = True
+
+    @staticmethod
+    def add_arguments(group):
+        group.add_argument(
+            "--no-fontmap", action="store_true",
+            help="Disable custom fontmap (use original embedded fonts)"
+        )
+        group.add_argument(
+            "--batch", action="store_true",
+            help="Render all figures in one ghostscript process (--jobs processes) "
+                 "instead of one per file"
+        )
+        group.add_argument(
+            "--async", dest="use_async", action="store_true",
+            help="Run the ghostscript processes from an asyncio event loop with "
+                 "streamed output and clean Ctrl-C handling"
+        )
+        group.add_argument(
+            "--timeout", type=float,
+            help="With --async, kill a conversion that takes longer than this many seconds"
+        )
+
+    def __init__(self, args):
+        self.dpi = args.dpi
+        self.batch = args.batch
+        self.use_async = args.use_async
+        self.timeout = args.timeout
+        self.use_fontmap = not args.no_fontmap and FONTMAP_PATH.exists()
+        # Everything that affects the rendered pixels; a change to any of
+        # these (or to the EPS/fontmap contents) invalidates built PNGs
+        self.params = {
+            "stage": "eps->png", "dpi": self.dpi, "fontmap": self.use_fontmap,
+            "gs": tool_version("gs"),
+        }
+
+    def check(self) -> bool:
+        if self.batch and self.use_async:
+            print("ERROR: --batch and --async cannot be combined")
+            return False
+        if self.timeout is not None and not self.use_async:
+            print("ERROR: --timeout requires --async")
+            return False
+        return check_ghostscript()
+
+    def stages(self, figure):
+        eps_path = EPS_DIR / f"{figure.stem}.eps"
+        inputs = [eps_path, FONTMAP_PATH] if self.use_fontmap else [eps_path]
+        png_path = figure.png_dir / f"{figure.stem}.png"
+        return [Stage("png", png_path, inputs, self.params, raster=True)]
+
+    def run(self, work, jobs: int = 1):
+        pairs = [(EPS_DIR / f"{figure.stem}.eps", figure.png_dir / f"{figure.stem}.png")
+                 for figure, _ in work]
+        if not pairs:
+            return
+
+        if self.batch:
+            print(f"  Converting {len(pairs)} figures in {min(jobs, len(pairs))} "
+                  "ghostscript batch(es)")
+            results = convert_eps_files_batched(pairs, self.dpi, self.use_fontmap, jobs)
+            for (eps_path, png_path), ok in zip(pairs, results):
+                yield ok, [f"  {'Converted' if ok else 'FAILED'}: {eps_path.name} -> {png_path.name}"]
+            return
+
+        if self.use_async:
+            results = convert_eps_files_async(pairs, self.dpi, self.use_fontmap, jobs, self.timeout)
+            for (eps_path, png_path), (ok, messages) in zip(pairs, results):
+                yield ok, [f"  Converting: {eps_path.name} -> {png_path.name}"] + messages
+            return
+
+        def convert(pair):
+            eps_path, png_path = pair
+            messages = [f"  Converting: {eps_path.name} -> {png_path.name}"]
+            ok = convert_eps_to_png(eps_path, png_path, self.dpi, self.use_fontmap,
+                                    log=messages.append)
+            return ok, messages
+
+        # Each file is its own gs process, so threads are enough to overlap them
+        pool = ThreadPoolExecutor(max_workers=jobs)
+        try:
+            yield from pool.map(convert, pairs)
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def summary(self, figures):
+        return [describe_dirs("Output", [f.png_dir for f in figures])] if figures else []
@@ -0,0 +1,454 @@
+"""
+Inkscape font-fixing backend for the figure-build engine (figure_build.py).
+
+Converts each EPS to an editable SVG with its fonts replaced (Comic Sans MS
+and Arial become Source Sans Pro), then renders the SVG to PNG:
+
+1. EPS → PDF (Ghostscript, preserves vectors)
+2. PDF → SVG (Inkscape; the PDF is kept on tmpfs where available)
+3. Replace font families in SVG (while it is streamed to disk)
+4. Optimize the SVG: round coordinates, merge transforms, drop unused defs,
+   simplify polylines (svg_optimize.py)
+5. SVG → PNG (Inkscape)
+
+The SVGs are kept in Essentials-of-Paleomagnetism/SVGFiles/ for manual
+editing; the engine never overwrites one that was edited by hand. Used by
+convert_figures_inkscape.py.
+
+Requires:
+- ghostscript: brew install ghostscript
+- inkscape: brew install --cask inkscape
+"""
+
+import io
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import figure_profile
+import inkscape_shell
+import svg_optimize
+from figure_build import Stage, describe_dirs
+from figure_cache import tool_version
+from figure_registry import EPS_DIR, SVG_DIR
+from svg_fonts import iter_tag_chunks, rewrite_fonts, rewrite_fonts_in_file
+
+# Font replacement mappings
+FONT_REPLACEMENTS = {
+    "Comic Sans MS": "Source Sans Pro",
+    "ComicSansMS": "Source Sans Pro",
+    "Arial": "Source Sans Pro",
+    "ArialMT": "Source Sans Pro",
+}
+
+# Intermediate PDFs go to tmpfs where available
+TMP_ROOT = "/dev/shm" if Path("/dev/shm").is_dir() else None
+
+# Lines of a failed tool's stderr shown in the log
+STDERR_LINES = 10
+
+
+def check_dependencies():
+    """Check that required tools are available."""
+    missing = []
+
+    try:
+        subprocess.run(["gs", "--version"], capture_output=True, check=True)
+    except FileNotFoundError:
+        missing.append("ghostscript (gs)")
+
+    try:
+        subprocess.run(["inkscape", "--version"], capture_output=True, check=True)
+    except FileNotFoundError:
+        missing.append("inkscape")
+
+    if missing:
+        print(f"ERROR: Missing dependencies: {', '.join(missing)}")
+        print("Install with:")
+        print("  brew install ghostscript")
+        print("  brew install --cask inkscape")
+        return False
+    return True
+
+
+def log_stderr(stderr: str, log=print):
+    """Log the last STDERR_LINES lines of a failed tool's stderr."""
+    for line in (stderr or "").strip().splitlines()[-STDERR_LINES:]:
+        log(f"    {line}")
+
+
+def eps_to_pdf(eps_path: Path, pdf_path: Path, log=None) -> bool:
+    """Convert EPS to PDF using Ghostscript; logs the failure and Ghostscript's
+    stderr when `log` is given."""
+    cmd = [
+        "gs", "-dBATCH", "-dNOPAUSE", "-dEPSCrop",
+        "-sDEVICE=pdfwrite",
+        f"-sOutputFile={pdf_path}",
+        str(eps_path),
+    ]
+    result = figure_profile.run(cmd, "eps->pdf")
+    if result.returncode != 0 and log is not None:
+        log("  FAILED: EPS to PDF conversion")
+        log_stderr(result.stderr, log)
+    return result.returncode == 0
+
+
+def pdf_to_svg(pdf_path: Path, svg_path: Path) -> bool:
+    """Convert PDF to SVG using Inkscape."""
+    session = inkscape_shell.current_session()
+    if session is not None and session.supports(pdf_path, svg_path):
+        with figure_profile.span("pdf->svg"):
+            return session.export(pdf_path, svg_path)
+
+    cmd = [
+        "inkscape", str(pdf_path),
+        f"--export-filename={svg_path}",
+    ]
+    result = figure_profile.run(cmd, "pdf->svg")
+    return result.returncode == 0
+
+
+def replace_fonts_in_svg(svg_path: Path, log=print) -> bool:
+    """Replace font families in SVG file.
+
+    Only font declarations are rewritten (see svg_fonts.py), streaming the
+    file so large SVGs are never held in memory.
+    """
+    try:
+        with figure_profile.span("fonts"):
+            count = rewrite_fonts_in_file(svg_path, FONT_REPLACEMENTS)
+    except (OSError, UnicodeDecodeError) as e:
+        log(f"  Font replacement error: {e}")
+        return False
+
+    log(f"  Fonts: {count} substitution(s)")
+    return True
+
+
+def svg_to_png(svg_path: Path, png_path: Path, dpi: int = 300) -> bool:
+    """Convert SVG to PNG using Inkscape."""
+    session = inkscape_shell.current_session()
+    if session is not None and session.supports(svg_path, png_path):
+        with figure_profile.span("svg->png"):
+            return session.export(svg_path, png_path, dpi=dpi)
+
+    cmd = [
+        "inkscape", str(svg_path),
+        f"--export-filename={png_path}",
+        f"--export-dpi={dpi}",
+    ]
+    result = figure_profile.run(cmd, "svg->png")
+    return result.returncode == 0
+
+
+def eps_to_svg_stream(eps_path: Path, svg_path: Path, log=print):
+    """Convert EPS to SVG, replacing fonts while Inkscape writes the SVG.
+
+    Ghostscript writes the PDF to a temporary file on tmpfs where
+    available (Inkscape only reads SVG from stdin, so it cannot take the
+    PDF from a pipe). Inkscape streams the SVG to stdout, and fonts are
+    replaced chunk by chunk on the way to disk, so the SVG is never held
+    in memory. The SVG is only replaced once the whole pipeline has
+    succeeded. On failure, the stderr of the failing tool is logged.
+
+    When profiling, the two processes are recorded as the "eps->pdf" and
+    "pdf->svg" stages and the time spent rewriting fonts as "fonts".
+
+    Returns:
+        Number of font substitutions made, or None on failure
+    """
+    tmp_path = svg_path.with_name(svg_path.name + ".tmp")
+    with tempfile.TemporaryDirectory(dir=TMP_ROOT) as tmpdir:
+        pdf_path = Path(tmpdir) / "figure.pdf"
+        if not eps_to_pdf(eps_path, pdf_path, log):
+            return None
+
+        # stderr goes to a file so a chatty Inkscape cannot block on a full pipe
+        with tempfile.TemporaryFile(dir=tmpdir) as stderr:
+            started = time.perf_counter()
+            inkscape = subprocess.Popen(
+                ["inkscape", str(pdf_path), "--export-type=svg", "--export-filename=-"],
+                stdout=subprocess.PIPE, stderr=stderr,
+            )
+            try:
+                svg_text = io.TextIOWrapper(inkscape.stdout, encoding="utf-8", newline="")
+                with open(tmp_path, "w", encoding="utf-8", newline="") as dst:
+                    count = 0
+                    font_seconds = 0.0
+                    for chunk in iter_tag_chunks(svg_text):
+                        chunk_started = time.perf_counter()
+                        chunk, n = rewrite_fonts(chunk, FONT_REPLACEMENTS)
+                        font_seconds += time.perf_counter() - chunk_started
+                        count += n
+                        dst.write(chunk)
+                    written = dst.tell()
+                figure_profile.wait(inkscape, "pdf->svg", started)
+                figure_profile.record("fonts", font_seconds)
+
+                if inkscape.returncode != 0 or not written:
+                    log("  FAILED: PDF to SVG conversion")
+                    stderr.seek(0)
+                    log_stderr(stderr.read().decode("utf-8", "replace"), log)
+                    return None
+
+                os.replace(tmp_path, svg_path)
+                return count
+            except (OSError, UnicodeDecodeError) as e:
+                log(f"  FAILED: Writing SVG: {e}")
+                inkscape.kill()
+                inkscape.wait()
+                return None
+            finally:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+
+
+def optimize_svg_file(svg_path: Path, optimize: dict, log=print) -> bool:
+    """Optimize an SVG in place (see svg_optimize.py) and log the saving.
+
+    Args:
+        optimize: Keyword arguments for svg_optimize.optimize_file()
+            (precision, tolerance)
+    """
+    try:
+        with figure_profile.span("svg-optimize"):
+            before, after = svg_optimize.optimize_file(svg_path, **optimize)
+    except (OSError, svg_optimize.ET.ParseError) as e:
+        log(f"  SVG optimization error: {e}")
+        return False
+
+    log(f"  SVG optimized: {svg_optimize.format_saving(before, after)}")
+    return True
+
+
+def convert_eps_to_svg(eps_path: Path, svg_path: Path, log=print, optimize: dict = None) -> bool:
+    """Convert EPS to SVG with font replacement.
+
+    Pipeline: EPS -> PDF (tmpfs) -> SVG (pipe) -> font replacement -> SVG (saved)
+    -> optimization (when `optimize` is given, see optimize_svg_file())
+    SVG is saved for manual editing if needed.
+
+    A persistent Inkscape shell session cannot write to stdout, so when one
+    is active it exports the SVG to disk and fonts are replaced afterwards.
+    """
+    session = inkscape_shell.current_session()
+    if session is not None and session.supports(svg_path):
+        with tempfile.TemporaryDirectory(dir=TMP_ROOT) as tmpdir:
+            pdf_path = Path(tmpdir) / "temp.pdf"
+
+            # Step 1: EPS to PDF
+            if not eps_to_pdf(eps_path, pdf_path, log):
+                return False
+
+            # Step 2: PDF to SVG
+            if not pdf_to_svg(pdf_path, svg_path):
+                log("  FAILED: PDF to SVG conversion")
+                return False
+
+        # Step 3: Replace fonts in SVG
+        if not replace_fonts_in_svg(svg_path, log):
+            log("  FAILED: Font replacement")
+            return False
+    else:
+        count = eps_to_svg_stream(eps_path, svg_path, log)
+        if count is None:
+            return False
+        log(f"  Fonts: {count} substitution(s)")
+
+    # Step 4: Optimize the SVG
+    if optimize is not None and not optimize_svg_file(svg_path, optimize, log):
+        log("  FAILED: SVG optimization")
+        return False
+
+    return True
+
+
+def convert_eps_to_png(eps_path: Path, svg_path: Path, png_path: Path, dpi: int = 300,
+                       log=print, rebuild_svg: bool = False, optimize: dict = None) -> bool:
+    """Convert EPS to PNG with font replacement, saving SVG intermediate.
+
+    Pipeline: EPS -> PDF (tmpfs) -> SVG (saved) -> PNG
+
+    An existing SVG is reused (it may carry manual edits) unless
+    `rebuild_svg` is set.
+    """
+    # First create the SVG (or use existing if already converted)
+    if rebuild_svg or not svg_path.exists():
+        if not convert_eps_to_svg(eps_path, svg_path, log, optimize):
+            return False
+
+    # Convert SVG to PNG
+    if not svg_to_png(svg_path, png_path, dpi):
+        log("  FAILED: SVG to PNG conversion")
+        return False
+
+    return True
+
+
+def convert_figure(stem: str, stages, svg_output_dir: Path, png_output_dir: Path,
+                   dpi: int = 300, optimize: dict = None):
+    """Run the requested conversion stages for a single figure.
+
+    Report lines are collected rather than printed so that figures converted
+    in parallel worker processes do not interleave their output.
+
+    Args:
+        stem: Figure name without extension (e.g. "magnetite")
+        stages: Subset of ("svg", "png") to run, as planned by figure_build.plan_stages()
+        svg_output_dir: Directory for the editable SVG
+        png_output_dir: Directory for the final PNG
+        dpi: PNG resolution in dots per inch
+        optimize: SVG optimization settings (see optimize_svg_file()), or
+            None to keep Inkscape's SVG as written
+
+    Returns:
+        Tuple of (success, list of report lines)
+    """
+    with figure_profile.figure(stem):
+        return _convert_figure(stem, stages, svg_output_dir, png_output_dir, dpi, optimize)
+
+
+def _convert_figure(stem, stages, svg_output_dir, png_output_dir, dpi, optimize):
+    messages = []
+    log = messages.append
+
+    eps_path = EPS_DIR / f"{stem}.eps"
+    svg_path = svg_output_dir / f"{stem}.svg"
+    png_path = png_output_dir / f"{stem}.png"
+
+    if stages == ("png",):
+        # Convert existing SVG to PNG
+        log(f"  Converting: {stem}.svg -> {stem}.png")
+        return svg_to_png(svg_path, png_path, dpi), messages
+
+    if stages == ("svg",):
+        # Only generate SVG
+        log(f"  Converting: {stem}.eps -> {stem}.svg")
+        return convert_eps_to_svg(eps_path, svg_path, log, optimize), messages
+
+    # Full pipeline: EPS -> SVG -> PNG
+    log(f"  Converting: {stem}.eps -> {stem}.svg -> {stem}.png")
+    return convert_eps_to_png(eps_path, svg_path, png_path, dpi, log, rebuild_svg=True,
+                              optimize=optimize), messages
+
+
+class InkscapeBackend:
+    """EPS -> SVG (fonts replaced, kept for editing) -> PNG."""
+
+    name = "inkscape"
+
+    @staticmethod
+    def add_arguments(group):
+        group.add_argument(
+            "--svg-only", action="store_true",
+            help="Only generate SVG files (skip PNG conversion)"
+        )
+        group.add_argument(
+            "--svg-to-png", action="store_true",
+            help="Convert existing SVGs to PNG (use after manual SVG edits)"
+        )
+        group.add_argument(
+            "--inkscape-shell", action="store_true",
+            help="Reuse one long-lived 'inkscape --shell' session per worker (Inkscape 1.x)"
+        )
+        group.add_argument(
+            "--svg-precision", type=int, default=svg_optimize.PRECISION,
+            help=f"Decimals kept in SVG coordinates (default: {svg_optimize.PRECISION})"
+        )
+        group.add_argument(
+            "--svg-tolerance", type=float, default=svg_optimize.TOLERANCE,
+            help="Polyline simplification tolerance in SVG user units, 0 to disable "
+                 f"(default: {svg_optimize.TOLERANCE})"
+        )
+        group.add_argument(
+            "--no-svg-optimize", action="store_true",
+            help="Keep the SVG as Inkscape writes it (see svg_optimize.py)"
+        )
+        group.add_argument(
+            "--vector", action="store_true",
+            help="Publish figures as minified SVG where that is smaller than the PNG "
+                 "(see figure_vector.py)"
+        )
+
+    def __init__(self, args):
+        self.dpi = args.dpi
+        self.svg_only = args.svg_only
+        self.svg_to_png = args.svg_to_png
+        self.use_shell = args.inkscape_shell
+        self.produces_raster = not self.svg_only
+        self.vector = args.vector and self.produces_raster
+        self.optimize = None if args.no_svg_optimize else {
+            "precision": args.svg_precision, "tolerance": args.svg_tolerance,
+        }
+
+        # Everything besides the input file that affects each stage's output
+        self.svg_params = {
+            "stage": "eps->svg", "fonts": FONT_REPLACEMENTS, "optimize": self.optimize,
+            "gs": tool_version("gs"), "inkscape": tool_version("inkscape"),
+        }
+        self.png_params = {"stage": "svg->png", "dpi": self.dpi, "inkscape": tool_version("inkscape")}
+
+    def check(self) -> bool:
+        return check_dependencies()
+
+    @staticmethod
+    def svg_dir(figure) -> Path:
+        """Editable SVGs go to SVGFiles/<chapter folder>/."""
+        return SVG_DIR / figure.dir_name if figure.dir_name else SVG_DIR
+
+    def vector_source(self, figure) -> Path:
+        return self.svg_dir(figure) / f"{figure.stem}.svg"
+
+    def stages(self, figure):
+        eps_path = EPS_DIR / f"{figure.stem}.eps"
+        svg_path = self.svg_dir(figure) / f"{figure.stem}.svg"
+        png_path = figure.png_dir / f"{figure.stem}.png"
+
+        stages = []
+        if not self.svg_to_png:
+            # Hand-edited SVGs are kept unless --force
+            stages.append(Stage("svg", svg_path, [eps_path], self.svg_params, editable=True))
+        if not self.svg_only:
+            stages.append(Stage("png", png_path, [svg_path], self.png_params, raster=True))
+        return stages
+
+    def run(self, work, jobs: int = 1):
+        if not work:
+            return
+        for figure, _ in work:
+            self.svg_dir(figure).mkdir(parents=True, exist_ok=True)
+        convert = partial(convert_figure, dpi=self.dpi, optimize=self.optimize)
+        columns = (
+            [figure.stem for figure, _ in work],
+            [stages for _, stages in work],
+            [self.svg_dir(figure) for figure, _ in work],
+            [figure.png_dir for figure, _ in work],
+        )
+
+        # Figures are reported in input order regardless of which worker
+        # finishes first, so parallel runs print the same report as serial ones.
+        if self.use_shell:
+            inkscape_shell.activate()
+            pool_kwargs = {"initializer": inkscape_shell.activate}
+        else:
+            pool_kwargs = {}
+        pool = ProcessPoolExecutor(max_workers=jobs, **pool_kwargs) if jobs > 1 else None
+        try:
+            yield from pool.map(convert, *columns) if pool else map(convert, *columns)
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+
+    def summary(self, figures):
+        if not figures:
+            return []
+        lines = []
+        if not self.svg_to_png:
+            lines.append(describe_dirs("SVG", [self.svg_dir(f) for f in figures]))
+        if not self.svg_only:
+            lines.append(describe_dirs("PNG", [f.png_dir for f in figures]))
+        return lines
@@ -0,0 +1,214 @@
+"""
+Long-lived Inkscape shell session for batch figure conversion.
+
+Starting Inkscape costs a second or more, which dominates the time to export
+a small figure. InkscapeShell keeps one `inkscape --shell` process open and
+streams export commands to it, restarting it if it crashes or hangs.
+
+convert_figures_inkscape.py routes pdf_to_svg() and svg_to_png() through a
+session when run with --inkscape-shell. Each worker process gets its own
+session, created on first use.
+
+Usage:
+    from inkscape_shell import InkscapeShell
+
+    with InkscapeShell() as shell:
+        shell.export("fig.pdf", "fig.svg")
+        shell.export("fig.svg", "fig.png", dpi=300)
+
+Requires Inkscape 1.x (the shell action syntax changed from 0.92).
+"""
+
+import atexit
+import os
+import queue
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+# Seconds to wait for Inkscape to start or to finish one export
+STARTUP_TIMEOUT = 60
+EXPORT_TIMEOUT = 120
+
+# Characters that would split or terminate an action list
+_UNSAFE_PATH_CHARS = (";", "\n", "\r")
+
+
+class InkscapeShell:
+    """A restartable `inkscape --shell` subprocess.
+
+    Args:
+        executable: Inkscape binary (default: "inkscape")
+        timeout: Seconds allowed per export before the session is restarted
+    """
+
+    def __init__(self, executable: str = "inkscape", timeout: float = EXPORT_TIMEOUT):
+        self.executable = executable
+        self.timeout = timeout
+        self._proc = None
+        self._output = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def running(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def start(self):
+        """Start Inkscape and wait for its first prompt."""
+        self.close()
+        self._proc = subprocess.Popen(
+            [self.executable, "--shell"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        # Read stdout on a thread so waits for the prompt can time out
+        self._output = queue.Queue()
+        threading.Thread(
+            target=_pump, args=(self._proc.stdout, self._output), daemon=True,
+        ).start()
+        if not self._wait_for_prompt(STARTUP_TIMEOUT):
+            self.close()
+            raise RuntimeError("Inkscape shell did not start")
+
+    def close(self):
+        """Ask Inkscape to quit, killing it if it does not."""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            if proc.poll() is None:
+                proc.stdin.write(b"quit\n")
+                proc.stdin.flush()
+                proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+            proc.wait()
+        finally:
+            for stream in (proc.stdin, proc.stdout):
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+
+    def _wait_for_prompt(self, timeout: float) -> bool:
+        """Consume output until the "> " prompt, an exit, or the timeout."""
+        deadline = time.monotonic() + timeout
+        buffer = b""
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                chunk = self._output.get(timeout=remaining)
+            except queue.Empty:
+                return False
+            if chunk is None:
+                return False
+            buffer = (buffer + chunk)[-256:]
+            if buffer.rstrip().endswith(b">"):
+                return True
+
+    def run(self, actions, timeout: float = None) -> bool:
+        """Send one action list and wait for Inkscape to finish it.
+
+        The session is (re)started if needed. On timeout or crash the process
+        is killed so the next call starts a fresh one.
+
+        Returns:
+            True if Inkscape returned to its prompt
+        """
+        if not self.running:
+            try:
+                self.start()
+            except (OSError, RuntimeError):
+                return False
+        line = "; ".join(actions) + "\n"
+        try:
+            self._proc.stdin.write(line.encode("utf-8"))
+            self._proc.stdin.flush()
+        except OSError:
+            self.close()
+            return False
+        if not self._wait_for_prompt(timeout or self.timeout):
+            self.close()
+            return False
+        return True
+
+    @staticmethod
+    def supports(*paths) -> bool:
+        """Whether these paths can be passed through an action list."""
+        return not any(c in str(p) for p in paths for c in _UNSAFE_PATH_CHARS)
+
+    def export(self, input_path: Path, output_path: Path, dpi: int = None,
+               timeout: float = None) -> bool:
+        """Open a file and export it; the format follows the output suffix.
+
+        Returns:
+            True if the output file was written
+        """
+        output_path = Path(output_path)
+        started = time.time()
+        actions = [f"file-open:{Path(input_path).resolve()}"]
+        if dpi is not None:
+            actions.append(f"export-dpi:{dpi}")
+        actions += [
+            f"export-filename:{output_path.resolve()}",
+            "export-do",
+            "file-close",
+        ]
+        if not self.run(actions, timeout):
+            return False
+        # Inkscape reports most export failures on stderr only; check the file
+        try:
+            return output_path.stat().st_mtime >= started - 1
+        except FileNotFoundError:
+            return False
+
+
+def _pump(stream, out: queue.Queue):
+    """Copy a pipe into a queue until EOF (signalled with None)."""
+    fd = stream.fileno()
+    while True:
+        try:
+            chunk = os.read(fd, 4096)
+        except OSError:
+            chunk = b""
+        if not chunk:
+            out.put(None)
+            return
+        out.put(chunk)
+
+
+# --- Per-process session used by convert_figures_inkscape.py ---
+
+_enabled = False
+_session = None
+
+
+def activate():
+    """Route exports in this process through a shared session.
+
+    Also used as the ProcessPoolExecutor initializer, so each worker starts
+    its own Inkscape rather than sharing one inherited across fork().
+    """
+    global _enabled, _session
+    _enabled = True
+    _session = None
+
+
+def current_session():
+    """The process-wide session if activate() was called, else None."""
+    global _session
+    if not _enabled:
+        return None
+    if _session is None:
+        _session = InkscapeShell()
+        # Workers never run atexit; their Inkscape exits on stdin EOF instead
+        atexit.register(_session.close)
+    return _session
@@ -0,0 +1,187 @@
+"""
+Vectorized Neel relaxation of single-domain grains.
+
+A grain of volume V with anisotropy energy density K at temperature T has
+the relaxation time
+
+    tau = tau0 exp(K V / (k_B T))
+
+relaxation_time() evaluates it, and blocking_volume() inverts it for the
+volume whose relaxation time is tau. Arguments broadcast like NumPy
+ufuncs, so whole (tau x K x T) grids come from a single call with axes
+from np.ix_ (see Usage).
+
+Anisotropy changes with temperature through the saturation magnetization,
+
+    Ms(T) / Ms(T_ref) = ((Tc - T) / (Tc - T_ref))^gamma
+
+(ms_ratio(); 0 above Tc), and K(T) = K(T_ref) (Ms(T) / Ms(T_ref))^n with
+n = 2 for shape anisotropy (anisotropy()). blocking_temperature() finds the
+temperature at which a grain's relaxation time falls to the blocking time
+(100 s by default). Above it the grain is superparamagnetic. Every grain
+of a grid is solved at once.
+
+Defaults are for magnetite (Tc = 580 C, gamma = 0.38, T_ref = 20 C).
+Units are SI: volumes in m^3, K in J/m^3, temperatures in kelvin and
+times in seconds.
+
+The widget runtime (widget_runtime.py) carries a JS port of
+blocking_volume() and ms_ratio() that takes its constants from here.
+
+Usage:
+    import numpy as np
+    from neel import blocking_volume, blocking_temperature, relaxation_time
+
+    # Iso-tau curves: 3 relaxation times x 1000 K values at 2 temperatures
+    tau, K, T = np.ix_([100, 3.15e13, 1.42e17], np.linspace(10, 6000, 1000), [293.15, 823.15])
+    v = blocking_volume(tau, K, T)                 # (3, 1000, 2) in m^3
+
+    relaxation_time(v, K, T)                       # back to tau
+    blocking_temperature(1e-23, 2.5e4)             # K(T) ~ Ms(T)^2, tau = 100 s
+
+    python scripts/neel.py                          # Blocking table for magnetite grains
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+K_B = 1.380649e-23   # Boltzmann constant (J/K)
+TAU_0 = 1e-9         # Attempt time (s), typical value for magnetite
+
+# Relaxation time (s) at which a grain counts as blocked on laboratory timescales
+TAU_BLOCK = 100.0
+
+# Magnetite: Curie temperature, Ms(T) exponent and reference temperature (K)
+TC_MAGNETITE = 580.0 + 273.15
+GAMMA = 0.38
+T_ROOM = 20.0 + 273.15
+
+# Blocking temperatures: points in the table giving first guesses, Newton
+# steps at most and the step (K) below which a root counts as converged
+TABLE_SIZE = 2048
+MAX_ITER = 50
+T_TOL = 1e-9
+
+
+def relaxation_time(V, K, T, tau0: float = TAU_0):
+    """Relaxation time (s) of grains of volume V (m^3) and anisotropy K
+    (J/m^3) at temperature T (K). Overflows to inf for very stable grains."""
+    with np.errstate(over="ignore"):
+        return tau0 * np.exp(np.asarray(K) * V / (K_B * np.asarray(T, dtype=float)))
+
+
+def blocking_volume(tau, K, T, tau0: float = TAU_0):
+    """Grain volume (m^3) whose relaxation time is tau (s), for anisotropy K
+    (J/m^3) at temperature T (K)."""
+    return K_B * np.asarray(T, dtype=float) * np.log(np.asarray(tau, dtype=float) / tau0) / K
+
+
+def ms_ratio(T, Tc: float = TC_MAGNETITE, gamma: float = GAMMA, T_ref: float = T_ROOM):
+    """Saturation magnetization at T (K) relative to T_ref; 0 at and above Tc."""
+    reduced = (Tc - np.asarray(T, dtype=float)) / (Tc - T_ref)
+    return np.maximum(reduced, 0.0) ** gamma
+
+
+def anisotropy(K_ref, T, exponent: float = 2.0, Tc: float = TC_MAGNETITE,
+               gamma: float = GAMMA, T_ref: float = T_ROOM):
+    """Anisotropy energy density (J/m^3) at T (K), from its value K_ref at
+    T_ref, scaling as Ms(T)^exponent (2 for shape anisotropy)."""
+    return K_ref * ms_ratio(T, Tc, gamma, T_ref) ** exponent
+
+
+def blocking_temperature(V, K_ref, tau=TAU_BLOCK, exponent: float = 2.0,
+                         Tc: float = TC_MAGNETITE, gamma: float = GAMMA,
+                         T_ref: float = T_ROOM, tau0: float = TAU_0):
+    """Temperature at which grains' relaxation time falls to tau.
+
+    Solves K(T) V = k_B T ln(tau / tau0), with K(T) from anisotropy(), that
+    is T / ms_ratio(T)^exponent = u for u = K_ref V / (k_B ln(tau / tau0)),
+    the blocking temperature if K did not change. The left side grows from
+    0 to infinity between 0 and Tc, so every grain has one root there; it
+    is read off a table of the left side and polished by Newton steps.
+    With exponent=0 the root is u, capped at Tc.
+
+    Args:
+        V: Grain volumes (m^3)
+        K_ref: Anisotropy energy densities at T_ref (J/m^3)
+        tau: Blocking relaxation times (s), longer than tau0
+        exponent, Tc, gamma, T_ref: Temperature dependence of K, see
+            anisotropy() and ms_ratio()
+
+    Returns:
+        Blocking temperatures (K) with the broadcast shape of V, K_ref and
+        tau
+    """
+    u = np.asarray(K_ref, dtype=float) * V / (K_B * np.log(np.asarray(tau, dtype=float) / tau0))
+    p = exponent * gamma
+    if p == 0:
+        return np.minimum(u, Tc)
+
+    # ln u as a function of T, on a grid crowded towards 0 and Tc
+    T_table = Tc * (0.5 - 0.5 * np.cos(np.pi * np.linspace(0, 1, TABLE_SIZE)[1:-1]))
+    log_u_table = np.log(T_table) - p * np.log((Tc - T_table) / (Tc - T_ref))
+
+    log_u = np.log(np.maximum(u, np.finfo(float).tiny)).ravel()
+    T = np.interp(log_u, log_u_table, T_table)
+
+    # Newton steps on ln T - p ln((Tc - T) / (Tc - T_ref)) - ln u, halving
+    # the distance to 0 or Tc instead of stepping past them
+    active = np.flatnonzero(u.ravel() > 0)
+    for _ in range(MAX_ITER):
+        if not active.size:
+            break
+        Ta = T[active]
+        f = np.log(Ta) - p * np.log((Tc - Ta) / (Tc - T_ref)) - log_u[active]
+        step = Ta - f / (1 / Ta + p / (Tc - Ta))
+        step = np.where(step <= 0, 0.5 * Ta, np.where(step >= Tc, 0.5 * (Ta + Tc), step))
+        T[active] = step
+        active = active[np.abs(step - Ta) > T_TOL]
+    return np.where(u > 0, T.reshape(u.shape), 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Neel relaxation times and blocking temperatures")
+    parser.add_argument("--q", type=float, default=1.3, help="Aspect ratio of the grains (default: 1.3)")
+    parser.add_argument(
+        "--ms", type=float, default=480.0, help="Saturation magnetization in kA/m (default: 480)"
+    )
+    parser.add_argument(
+        "--widths", type=float, nargs="+", default=[20, 22.5, 25, 27.5, 30],
+        help="Grain widths in nm (default: 20 22.5 25 27.5 30)"
+    )
+    parser.add_argument(
+        "--tau", type=float, default=TAU_BLOCK,
+        help=f"Blocking relaxation time in s (default: {TAU_BLOCK:g})"
+    )
+    args = parser.parse_args()
+
+    from stoner_wohlfarth import prolate_anisotropy
+
+    K_ref = float(prolate_anisotropy(args.q, args.ms * 1e3))
+    width = np.asarray(args.widths) * 1e-9
+    V = np.pi / 6 * args.q * width ** 3
+    print(f"Magnetite prolate spheroids, q = {args.q:g}: K = {K_ref:.0f} J/m3 at {T_ROOM:.2f} K")
+
+    year = 365.25 * 24 * 3600
+    tau_room = relaxation_time(V, K_ref, T_ROOM)
+    T_b = blocking_temperature(V, K_ref, args.tau)
+    print(f"\n{'width (nm)':>10} {'V (zm3)':>8} {'tau at 20 C (yr)':>17} {'T_b (C)':>8}")
+    for w, v, t, tb in zip(args.widths, V, tau_room, T_b):
+        print(f"{w:10.1f} {v * 1e21:8.4f} {t / year:17.3g} {tb - 273.15:8.1f}")
+
+    # Round trip on a dense grid: blocking volume at T_b gives back tau
+    V_grid, K_grid = np.ix_(np.geomspace(1e-24, 1e-21, 1000), np.linspace(1e3, 5e4, 1000))
+    started = time.perf_counter()
+    T_grid = blocking_temperature(V_grid, K_grid, args.tau)
+    elapsed = time.perf_counter() - started
+    inside = T_grid < TC_MAGNETITE - 1e-6
+    tau_back = relaxation_time(V_grid, anisotropy(K_grid, T_grid), T_grid)
+    error = np.abs(np.log(tau_back[inside] / args.tau)).max()
+    print(f"\n{T_grid.size} blocking temperatures in {elapsed:.2f} s; "
+          f"max |ln(tau(T_b) / tau)| = {error:.1e}")
+
+
+if __name__ == "__main__":
+    main()
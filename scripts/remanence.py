@@ -0,0 +1,207 @@
+"""
+Monte Carlo remanence of single-domain grain populations.
+
+A population is a sample of grains with volumes V and anisotropy energy
+densities K drawn from a joint lognormal distribution
+(lognormal_population()). Each grain has its easy axis along the field
+and is described by Neel's two-state model. Its state p is the net
+fraction of its moment along the field. In a field B at temperature T, p
+relaxes towards the equilibrium
+
+    p_eq = tanh(Ms(T) V B / (k_B T))
+
+with the grain's relaxation time tau (neel.relaxation_time()). Over a
+step of duration dt in fixed conditions this is exact:
+
+    p <- p_eq + (p - p_eq) exp(-dt / tau)
+
+simulate() takes every grain through a history of such steps at once. A
+history can be a time series at fixed temperature (VRM), a cooling path
+(TRM) or grain growth (CRM), or any mix. Each step is one vectorized
+update of all grains, a few tens of milliseconds for 10^6 of them. After
+each step, grains with tau above the blocking time (100 s) are blocked:
+their state is remanence. The rest are superparamagnetic and lose their
+state when the field is switched off. Ms(T) and K(T) ~ Ms(T)^2 come from
+neel.py.
+
+Volumes are in m^3, K in J/m^3, Ms in A/m, fields in tesla, temperatures
+in kelvin and times in seconds.
+
+Usage:
+    import numpy as np
+    from neel import T_ROOM
+    from remanence import lognormal_population, simulate
+
+    V, K = lognormal_population(10**6, 0.19e-21, 1.3e3, sigma_V=0.4, sigma_K=0.3, seed=0)
+
+    # VRM at room temperature, sampled at times t (s)
+    t = np.logspace(0, 17, 35)
+    vrm, blocked, _ = simulate(V, K, np.diff(t, prepend=0), T_ROOM)
+
+    # TRM: cooling from 570 to 20 C in 10 C steps of 100 s each
+    trm, blocked, _ = simulate(V, K, 100, np.arange(570, 10, -10) + 273.15)
+
+    # CRM: grains growing to full size at room temperature
+    crm, blocked, _ = simulate(V, K, 100, T_ROOM, growth=np.linspace(0.03, 1, 30))
+
+    python scripts/remanence.py                       # VRM, TRM and CRM of an example population
+    python scripts/remanence.py --plot remanence.png  # ... and plot them
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from neel import GAMMA, K_B, TAU_BLOCK, TC_MAGNETITE, T_ROOM, anisotropy, ms_ratio, relaxation_time
+
+MS_MAGNETITE = 480e3     # Saturation magnetization of magnetite at room temperature (A/m)
+B_EARTH = 50e-6          # Default field (T)
+
+N_GRAINS = 10**5
+
+
+def lognormal_population(n: int, V_median: float, K_median: float, sigma_V: float = 0.3,
+                         sigma_K: float = 0.3, rho: float = 0.0, seed=None):
+    """Volumes and anisotropies of n grains from a joint lognormal distribution.
+
+    Args:
+        n: Number of grains
+        V_median: Median volume (m^3)
+        K_median: Median anisotropy energy density (J/m^3)
+        sigma_V, sigma_K: Standard deviations of ln V and ln K
+        rho: Correlation between ln V and ln K
+        seed: Random seed
+
+    Returns:
+        Tuple of (V, K), arrays of n values
+    """
+    rng = np.random.default_rng(seed)
+    z = rng.standard_normal((2, n))
+    ln_V = sigma_V * z[0]
+    ln_K = sigma_K * (rho * z[0] + np.sqrt(1.0 - rho**2) * z[1])
+    return V_median * np.exp(ln_V), K_median * np.exp(ln_K)
+
+
+def equilibrium(V, Ms, B, T):
+    """Net fraction of the moments of grains of volume V (m^3) along a field
+    B (T) in thermal equilibrium at T (K), for magnetization Ms (A/m)."""
+    return np.tanh(V * (Ms * B / (K_B * T)))
+
+
+def simulate(V, K_ref, dt, T, B=B_EARTH, growth=1.0, Ms: float = MS_MAGNETITE,
+             exponent: float = 2.0, tau_block: float = TAU_BLOCK, state=None,
+             Tc: float = TC_MAGNETITE, gamma: float = GAMMA):
+    """Remanence of a grain population through a history.
+
+    The history is a sequence of steps, each lasting dt (s) at temperature
+    T (K) in field B (T) with every volume scaled by growth. The four
+    broadcast to the number of steps, so any of them can be a scalar.
+
+    Args:
+        V: Grain volumes at full growth (m^3)
+        K_ref: Anisotropy energy densities at room temperature (J/m^3)
+        dt, T, B, growth: The history, see above
+        Ms: Saturation magnetization at room temperature (A/m)
+        exponent: K scales as Ms(T)^exponent (2 for shape anisotropy, 0
+            for anisotropy that does not change with temperature)
+        tau_block: Relaxation time (s) above which a grain is blocked
+        state: Initial state of each grain (default: 0, no remanence)
+        Tc, gamma: Ms(T) parameters, see neel.ms_ratio()
+
+    Returns:
+        Tuple of (remanence, blocked, state). remanence holds the remanence
+        after each step, relative to the saturation remanence of the
+        population (Ms at room temperature, full growth). blocked holds the
+        fraction of the grain volume that is blocked after each step, and
+        state holds the final state of each grain.
+    """
+    V = np.asarray(V, dtype=float)
+    K_ref = np.asarray(K_ref, dtype=float)
+    dt, T, B, growth = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(a, dtype=float)) for a in (dt, T, B, growth))
+    )
+    p = np.zeros(V.shape) if state is None else np.array(np.broadcast_to(state, V.shape), dtype=float)
+
+    energy = K_ref * V   # Energy barriers at room temperature and full growth (J)
+    saturation = Ms * V.sum()
+    remanence = np.empty(dt.size)
+    blocked = np.empty(dt.size)
+    for i in range(dt.size):
+        v = V * growth[i]
+        ms = Ms * ms_ratio(T[i], Tc, gamma)
+        # K(T) v = K_ref V * (K(T) / K_ref) * growth
+        tau = relaxation_time(energy, anisotropy(growth[i], T[i], exponent, Tc, gamma), T[i])
+        p_eq = equilibrium(v, ms, B[i], T[i])
+        p = p_eq + (p - p_eq) * np.exp(-dt[i] / tau)
+
+        stable_v = np.where(tau > tau_block, v, 0.0)
+        remanence[i] = ms * np.dot(stable_v, p) / saturation
+        blocked[i] = stable_v.sum() / v.sum()
+    return remanence, blocked, p
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo VRM, TRM and CRM of a grain population")
+    parser.add_argument(
+        "--grains", type=int, default=N_GRAINS, help=f"Grains in the population (default: {N_GRAINS})"
+    )
+    parser.add_argument(
+        "--v", type=float, default=0.19, help="Median grain volume in zm3 (default: 0.19)"
+    )
+    parser.add_argument(
+        "--k", type=float, default=1.3, help="Median anisotropy in kJ/m3 (default: 1.3)"
+    )
+    parser.add_argument(
+        "--sigma", type=float, nargs=2, default=[0.4, 0.3], metavar=("V", "K"),
+        help="Standard deviations of ln V and ln K (default: 0.4 0.3)"
+    )
+    parser.add_argument("--rho", type=float, default=0.0, help="Correlation of ln V and ln K (default: 0)")
+    parser.add_argument("--field", type=float, default=B_EARTH * 1e6, help="Field in uT (default: 50)")
+    parser.add_argument("--plot", type=Path, help="Also plot the remanence curves to this image file")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    V, K = lognormal_population(args.grains, args.v * 1e-21, args.k * 1e3,
+                                *args.sigma, rho=args.rho, seed=0)
+    B = args.field * 1e-6
+
+    year = 365.25 * 24 * 3600
+    t = np.logspace(0, np.log10(4.5e9 * year), 60)
+    T_cool = np.arange(570.0, 10.0, -10.0) + 273.15
+    growth = np.linspace(0.03, 1.0, 30)
+    histories = {
+        "VRM (20 C)": (t, simulate(V, K, np.diff(t, prepend=0), T_ROOM, B)),
+        "TRM (cooling)": (T_cool - 273.15, simulate(V, K, TAU_BLOCK, T_cool, B)),
+        "CRM (growth)": (growth, simulate(V, K, TAU_BLOCK, T_ROOM, B, growth=growth)),
+    }
+    elapsed = time.perf_counter() - started
+    steps = sum(len(x) for x, _ in histories.values())
+    print(f"{args.grains} grains, {steps} steps in {elapsed:.2f} s")
+
+    print(f"\n{'history':<14} {'Mr/Mrs':>10} {'blocked':>8}")
+    for label, (_, (m, blocked, _)) in histories.items():
+        print(f"{label:<14} {m[-1]:10.3e} {blocked[-1]:8.3f}")
+
+    if args.plot:
+        import matplotlib.pyplot as plt
+
+        fig, axes = plt.subplots(1, 3, figsize=(13, 3.8))
+        xlabels = [r"$t$  (yr)", r"$T$  ($\degree$C)", "Volume / final volume"]
+        scales = [1 / year, 1, 1]
+        for ax, (label, (x, (m, _, _))), xlabel, scale in zip(axes, histories.items(),
+                                                            xlabels, scales):
+            ax.plot(x * scale, m / m[-1], linewidth=2, color="#0072B2")
+            ax.set_title(label)
+            ax.set_xlabel(xlabel)
+            ax.set_ylim(0, 1.05)
+        axes[0].set_xscale("log")
+        axes[1].invert_xaxis()
+        axes[0].set_ylabel("Remanence / final remanence")
+        fig.savefig(args.plot, dpi=300, bbox_inches="tight", facecolor="white")
+        print(f"Plot: {args.plot}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+"""
+Vectorized Stoner-Wohlfarth stationary points and minimum tracking.
+
+A single-domain grain with uniaxial anisotropy K_u and magnetization Ms,
+in a field B at angle phi to its easy axis, has the energy density
+
+    eps(theta) = K_u sin^2(theta) - Ms B cos(phi - theta)
+
+where theta is the angle of the moment from the easy axis. Its stationary
+points are the roots of d eps / d theta.
+
+stationary_points() finds them for any number of fields and field angles
+at once:
+
+- d eps / d theta is evaluated on a periodic (..., B, theta) grid, in
+  blocks of CHUNK points to bound memory.
+- Every root is bracketed by a sign change between neighbouring grid points.
+- All roots are refined together with safeguarded Newton steps (bisection
+  when a step leaves its bracket) to machine precision.
+
+The result is therefore not limited to the grid spacing.
+
+sweep() follows the occupied minimum along a field path. At each field the
+moment rolls downhill from where it was, to the first minimum in that
+direction. It stays in its local minimum until that minimum vanishes, then
+drops into the next one: the switching behind hysteresis. Many sweeps (for
+example one per field angle) advance together, one field step at a time.
+
+hysteresis_loop() sweeps complete loops of single grains. population_loop()
+averages them over assemblages whose easy axes are random (random_axes())
+or textured (fisher_axes()), and loop_parameters() measures Mr/Ms and Bc.
+
+Angles are in radians and fields in tesla.
+
+Usage:
+    import numpy as np
+    from stoner_wohlfarth import prolate_anisotropy, stationary_points, sweep
+
+    K_u = prolate_anisotropy(1.5, 480e3)
+    b = np.linspace(0, 0.1, 101)
+    theta, stable = stationary_points(b, K_u, 480e3, phi=0.0)   # (101, roots)
+
+    # One sweep per field angle, starting antiparallel to the field
+    phi = np.deg2rad(np.arange(91))
+    path = sweep(b, K_u, 480e3, phi, theta_init=np.pi)          # (91, 101)
+
+    # Hysteresis loops: single grains, and 10000 randomly oriented grains
+    b, m = hysteresis_loop(0.15, K_u, 480e3, phi)                # (91, 1602)
+    b, m_random = population_loop(0.15, K_u, 480e3, random_axes(10000))
+    mr, bc = loop_parameters(b, m_random)                        # ~0.5, ~0.48 B_k
+
+    python scripts/stoner_wohlfarth.py                   # Mr/Ms and Bc of example loops
+    python scripts/stoner_wohlfarth.py --plot loops.png  # ... and plot them
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+MU0 = 4 * np.pi * 1e-7
+
+# Grid points around the circle used to bracket roots (0.5 degree spacing)
+N_THETA = 720
+
+# Grid points evaluated per block
+CHUNK = 1 << 21
+
+# Fields per loop branch, and field angles a population loop is built from
+N_FIELDS = 801
+N_PHI = 91
+
+# Newton/bisection iterations per root at most (bisection alone needs ~55)
+MAX_ITER = 100
+
+# Angles closer than this count as the same point when tracking
+ANGLE_TOL = 1e-9
+
+TWO_PI = 2 * np.pi
+
+
+def prolate_anisotropy(q, Ms):
+    """Shape anisotropy constant K_u (J/m^3) of a prolate spheroid.
+
+    Args:
+        q: Aspect ratio (long / short axis), greater than 1
+        Ms: Saturation magnetization (A/m)
+    """
+    q = np.asarray(q, dtype=float)
+    e = np.sqrt(1.0 - 1.0 / q**2)
+    N_a = (1.0 - e**2) / (2.0 * e**3) * (np.log((1.0 + e) / (1.0 - e)) - 2.0 * e)
+    N_b = (1.0 - N_a) / 2.0
+    return 0.5 * MU0 * (N_b - N_a) * np.asarray(Ms, dtype=float)**2
+
+
+def energy(theta, b, K_u, Ms, phi):
+    """Energy density (J/m^3) at moment angle theta."""
+    return K_u * np.sin(theta)**2 - Ms * b * np.cos(phi - theta)
+
+
+def denergy(theta, b, K_u, Ms, phi):
+    """First derivative of the energy density with respect to theta."""
+    return K_u * np.sin(2 * theta) - Ms * b * np.sin(phi - theta)
+
+
+def d2energy(theta, b, K_u, Ms, phi):
+    """Second derivative of the energy density with respect to theta."""
+    return 2 * K_u * np.cos(2 * theta) + Ms * b * np.cos(phi - theta)
+
+
+def _broadcast(*arrays):
+    return np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in arrays))
+
+
+def _refine(lo, hi, b, K_u, Ms, phi):
+    """Roots of denergy bracketed by [lo, hi], by safeguarded Newton steps."""
+    f_lo = denergy(lo, b, K_u, Ms, phi)
+    f_hi = denergy(hi, b, K_u, Ms, phi)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = np.where(f_lo == 0, lo, lo + f_lo / (f_lo - f_hi) * (hi - lo))
+    x = np.where(np.isfinite(x), x, 0.5 * (lo + hi))
+
+    # Iterate on the roots that have not converged yet; the few near a
+    # double root fall back to bisection and take longest
+    active = np.arange(x.size)
+    for _ in range(MAX_ITER):
+        if not active.size:
+            break
+        xa = x[active]
+        args = (b[active], K_u[active], Ms[active], phi[active])
+        f = denergy(xa, *args)
+        # Keep the bracket around the sign change
+        same = np.sign(f) == np.sign(f_lo[active])
+        lo[active] = np.where(same, xa, lo[active])
+        f_lo[active] = np.where(same, f, f_lo[active])
+        hi[active] = np.where(same, hi[active], xa)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = xa - f / d2energy(xa, *args)
+        step = np.where((step > lo[active]) & (step < hi[active]), step,
+                        0.5 * (lo[active] + hi[active]))
+        step = np.where(f == 0, xa, step)
+        x[active] = step
+        converged = np.abs(step - xa) <= 2 * np.finfo(float).eps * np.maximum(np.abs(xa), 1.0)
+        active = active[~converged]
+    return x
+
+
+def stationary_points(b, K_u, Ms, phi, n_theta: int = N_THETA):
+    """All stationary points of the energy, for broadcast parameters.
+
+    Args:
+        b: Field (T)
+        K_u: Anisotropy constant (J/m^3)
+        Ms: Saturation magnetization (A/m)
+        phi: Field angle from the easy axis (radians)
+        n_theta: Grid points around the circle used to bracket the roots;
+            roots closer together than the spacing (only just before a
+            minimum vanishes) are missed
+
+    Returns:
+        Tuple of (theta, stable), each of the broadcast shape of the
+        parameters plus a last axis of length the most roots found: theta
+        holds the roots in [0, 2 pi) in increasing order, padded with NaN,
+        and stable is True for minima
+    """
+    b, K_u, Ms, phi = _broadcast(b, K_u, Ms, phi)
+    shape = b.shape
+    b, K_u, Ms, phi = (a.ravel() for a in (b, K_u, Ms, phi))
+    n_rows = b.size
+
+    spacing = TWO_PI / n_theta
+    grid = np.arange(n_theta) * spacing
+    basis = np.stack([np.sin(2 * grid), np.cos(grid), np.sin(grid)])
+    # denergy = K_u sin(2 theta) - Ms B sin(phi) cos(theta) + Ms B cos(phi) sin(theta),
+    # so each row of the grid is one small matrix product
+    coeffs = np.stack([K_u, -Ms * b * np.sin(phi), Ms * b * np.cos(phi)], axis=1)
+
+    rows = []
+    cols = []
+    block = max(1, CHUNK // n_theta)
+    for start in range(0, n_rows, block):
+        d1 = coeffs[start:start + block] @ basis
+        bracket = d1 == 0
+        bracket[:, :-1] |= d1[:, :-1] * d1[:, 1:] < 0
+        bracket[:, -1] |= d1[:, -1] * d1[:, 0] < 0
+        r, c = np.nonzero(bracket)
+        rows.append(r + start)
+        cols.append(c)
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=int)
+    cols = np.concatenate(cols) if cols else np.zeros(0, dtype=int)
+
+    params = (b[rows], K_u[rows], Ms[rows], phi[rows])
+    roots = _refine(cols * spacing, (cols + 1) * spacing, *params)
+    stable_roots = d2energy(roots, *params) > 0
+    roots = np.mod(roots, TWO_PI)
+
+    # Pack each row's roots into the first columns, sorted by angle
+    n_roots = int(np.bincount(rows, minlength=n_rows).max()) if rows.size else 0
+    order = np.lexsort((roots, rows))
+    rows, roots, stable_roots = rows[order], roots[order], stable_roots[order]
+    rank = np.arange(rows.size) - np.searchsorted(rows, rows)
+    theta = np.full((n_rows, n_roots), np.nan)
+    stable = np.zeros((n_rows, n_roots), dtype=bool)
+    theta[rows, rank] = roots
+    stable[rows, rank] = stable_roots
+    return theta.reshape(shape + (n_roots,)), stable.reshape(shape + (n_roots,))
+
+
+def sweep(b_path, K_u, Ms, phi, theta_init, n_theta: int = N_THETA):
+    """Follow the occupied energy minimum along a field path.
+
+    At each field the moment moves downhill from its previous angle to the
+    first minimum in that direction, so it stays in a local minimum until
+    that minimum vanishes.
+
+    Args:
+        b_path: 1-D sequence of fields (T), in the order they are applied
+        K_u, Ms, phi: Grain parameters as in stationary_points(); their
+            broadcast shape S gives independent sweeps
+        theta_init: Moment angle before the first field, broadcastable to S
+        n_theta: Grid points used to bracket the roots
+
+    Returns:
+        Array of shape S + (len(b_path),) with the moment angle in [0, 2 pi)
+        after each field
+    """
+    b_path = np.asarray(b_path, dtype=float)
+    K_u, Ms, phi = _broadcast(K_u, Ms, phi)
+    shape = K_u.shape
+    theta, stable = stationary_points(b_path, K_u[..., None], Ms[..., None], phi[..., None],
+                                      n_theta)
+
+    state = np.mod(np.broadcast_to(np.asarray(theta_init, dtype=float), shape), TWO_PI)
+    path = np.empty(shape + (b_path.size,))
+    for k, b in enumerate(b_path):
+        downhill = np.where(denergy(state, b, K_u, Ms, phi) > 0, -1.0, 1.0)
+        offset = np.mod((theta[..., k, :] - state[..., None]) * downhill[..., None], TWO_PI)
+        offset = np.where(offset > TWO_PI - ANGLE_TOL, 0.0, offset)
+        offset = np.where(stable[..., k, :], offset, np.inf)
+        pick = np.argmin(offset, axis=-1)[..., None]
+        state = np.take_along_axis(theta[..., k, :], pick, axis=-1)[..., 0]
+        path[..., k] = state
+    return path
+
+
+def hysteresis_loop(b_max: float, K_u, Ms, phi, n_fields: int = N_FIELDS,
+                    n_theta: int = N_THETA):
+    """Complete hysteresis loops of single grains.
+
+    The field runs from +b_max down to -b_max (descending branch) and back
+    up (ascending branch), starting from the moment along the field. Only
+    the descending branch is swept: the energy is unchanged by theta ->
+    theta + pi, B -> -B, so the ascending branch is its mirror image.
+
+    Args:
+        b_max: Largest field (T); above the switching field for a closed loop
+        K_u, Ms, phi: Grain parameters as in stationary_points(); their
+            broadcast shape S gives one loop each
+        n_fields: Fields per branch
+
+    Returns:
+        Tuple of (b, m): the 2 * n_fields fields (T) along the loop, and
+        the moment along the field over Ms, of shape S + (2 * n_fields,)
+    """
+    K_u, Ms, phi = _broadcast(K_u, Ms, phi)
+    b_down = np.linspace(b_max, -b_max, n_fields)
+    theta = sweep(b_down, K_u, Ms, phi, theta_init=phi, n_theta=n_theta)
+    m_down = np.cos(phi[..., None] - theta)
+    return np.concatenate([b_down, -b_down]), np.concatenate([m_down, -m_down], axis=-1)
+
+
+def random_axes(n: int, seed=None):
+    """Angles (radians, 0-90 degrees) between the field and n easy axes
+    oriented uniformly at random in 3-D."""
+    rng = np.random.default_rng(seed)
+    return np.arccos(rng.random(n))
+
+
+def fisher_axes(n: int, kappa: float, mean_angle: float = 0.0, seed=None):
+    """Angles (radians, 0-90 degrees) between the field and n easy axes
+    drawn from a Fisher distribution.
+
+    Args:
+        n: Number of grains
+        kappa: Fisher concentration parameter (larger is more aligned)
+        mean_angle: Angle between the field and the mean easy axis (radians)
+        seed: Random seed
+    """
+    rng = np.random.default_rng(seed)
+    u, v = rng.random((2, n))
+    cos_t = 1.0 + np.log1p(u * np.expm1(-2.0 * kappa)) / kappa
+    sin_t = np.sqrt(np.clip(1.0 - cos_t**2, 0.0, 1.0))
+    # Component along the field after tilting the mean axis by mean_angle
+    along = cos_t * np.cos(mean_angle) + sin_t * np.sin(2 * np.pi * v) * np.sin(mean_angle)
+    # Easy axes are not directed: fold into 0-90 degrees
+    return np.arccos(np.clip(np.abs(along), 0.0, 1.0))
+
+
+def axis_weights(axes, n_phi: int = N_PHI):
+    """Weights of an assemblage's grains on n_phi field angles from 0 to 90
+    degrees.
+
+    Each grain is shared between the two angles either side of its own,
+    with linear weights, so `weights @ m` averages loops computed on
+    np.linspace(0, pi / 2, n_phi) over the grains.
+
+    Args:
+        axes: Angles between the field and each grain's easy axis, e.g.
+            from random_axes() or fisher_axes()
+
+    Returns:
+        Array of n_phi weights summing to 1
+    """
+    position = np.clip(np.asarray(axes, dtype=float), 0.0, np.pi / 2) / (np.pi / 2) * (n_phi - 1)
+    lower = np.minimum(position.astype(int), n_phi - 2)
+    frac = position - lower
+    weights = np.bincount(lower, 1.0 - frac, n_phi) + np.bincount(lower + 1, frac, n_phi)
+    return weights / position.size
+
+
+def population_loop(b_max: float, K_u: float, Ms: float, axes, n_fields: int = N_FIELDS,
+                    n_phi: int = N_PHI, n_theta: int = N_THETA):
+    """Hysteresis loop of an assemblage of identical grains.
+
+    Loops are computed for n_phi field angles and averaged with
+    axis_weights(), so thousands of grains cost no more than a few.
+
+    Args:
+        b_max: Largest field (T)
+        K_u: Anisotropy constant (J/m^3)
+        Ms: Saturation magnetization (A/m)
+        axes: Angles between the field and each grain's easy axis
+        n_fields: Fields per branch
+        n_phi: Field angles the loops are computed for
+
+    Returns:
+        Tuple of (b, m) as from hysteresis_loop(), m being the mean over
+        the grains
+    """
+    b, m = hysteresis_loop(b_max, K_u, Ms, np.linspace(0.0, np.pi / 2, n_phi), n_fields, n_theta)
+    return b, axis_weights(axes, n_phi) @ m
+
+
+def loop_parameters(b, m):
+    """Remanence ratio and coercivity of loops.
+
+    Args:
+        b, m: A loop as returned by hysteresis_loop() or population_loop()
+
+    Returns:
+        Tuple of (Mr/Ms, Bc in T), each of the shape of m without its last
+        axis; Bc is NaN for loops whose descending branch never reaches
+        m = 0
+    """
+    n = b.size // 2
+    b_down, m_down = b[:n], m[..., :n]
+
+    # Remanence: the descending branch at B = 0
+    j = min(np.searchsorted(-b_down, 0.0, side="right") - 1, n - 2)
+    t = b_down[j] / (b_down[j] - b_down[j + 1])
+    mr = m_down[..., j] + t * (m_down[..., j + 1] - m_down[..., j])
+
+    # Coercivity: where the descending branch first reaches m = 0
+    crossed = m_down <= 0
+    k = np.argmax(crossed, axis=-1)
+    found = crossed.any(axis=-1) & (k > 0)
+    k = np.maximum(k, 1)
+    m0 = np.take_along_axis(m_down, (k - 1)[..., None], axis=-1)[..., 0]
+    m1 = np.take_along_axis(m_down, k[..., None], axis=-1)[..., 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(m0 != m1, m0 / (m0 - m1), 0.0)
+    bc = -(b_down[k - 1] + t * (b_down[k] - b_down[k - 1]))
+    return mr, np.where(found, bc, np.nan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stoner-Wohlfarth hysteresis loops")
+    parser.add_argument("--q", type=float, default=1.5, help="Aspect ratio (default: 1.5)")
+    parser.add_argument(
+        "--ms", type=float, default=480.0, help="Saturation magnetization in kA/m (default: 480)"
+    )
+    parser.add_argument(
+        "--phi", type=float, nargs="+", default=[0, 22, 45, 70, 90],
+        help="Field angles in degrees for single-grain loops (default: 0 22 45 70 90)"
+    )
+    parser.add_argument(
+        "--grains", type=int, default=10000,
+        help="Grains in the random and textured assemblages (default: 10000)"
+    )
+    parser.add_argument(
+        "--kappa", type=float, default=10.0,
+        help="Fisher concentration of the textured assemblage (default: 10)"
+    )
+    parser.add_argument("--plot", type=Path, help="Also plot the loops to this image file")
+    args = parser.parse_args()
+
+    Ms = args.ms * 1e3
+    K_u = float(prolate_anisotropy(args.q, Ms))
+    b_k = 2 * K_u / Ms
+    b_max = 1.5 * b_k
+    print(f"K_u = {K_u:.0f} J/m3, microscopic coercivity {b_k * 1e3:.1f} mT")
+
+    started = time.perf_counter()
+    b, single = hysteresis_loop(b_max, K_u, Ms, np.deg2rad(args.phi))
+    # Both assemblages average the same loops
+    _, grid = hysteresis_loop(b_max, K_u, Ms, np.linspace(0.0, np.pi / 2, N_PHI))
+    assemblages = {
+        "random": axis_weights(random_axes(args.grains, seed=0)) @ grid,
+        f"Fisher k={args.kappa:g}": axis_weights(fisher_axes(args.grains, args.kappa, seed=0)) @ grid,
+    }
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{'loop':<16} {'Mr/Ms':>7} {'Bc (mT)':>8}")
+    labels = [f"phi={p:g}" for p in args.phi] + list(assemblages)
+    loops = np.vstack([single] + list(assemblages.values()))
+    for label, mr, bc in zip(labels, *loop_parameters(b, loops)):
+        print(f"{label:<16} {mr:7.3f} {bc * 1e3:8.1f}")
+    print(f"\n{len(labels)} loops in {elapsed:.2f} s")
+
+    if args.plot:
+        import matplotlib.pyplot as plt
+
+        fig, axes = plt.subplots(1, 2, figsize=(10, 4.2), sharey=True)
+        for label, m in zip(labels[:len(args.phi)], single):
+            axes[0].plot(b * 1e3, m, linewidth=1.5, label=label.replace("phi", r"$\phi$"))
+        for label, m in assemblages.items():
+            axes[1].plot(b * 1e3, m, linewidth=1.5, label=label.replace("k=", r"$\kappa$="))
+        for ax in axes:
+            ax.axhline(0, color="0.7", linewidth=0.8)
+            ax.axvline(0, color="0.7", linewidth=0.8)
+            ax.set_xlabel(r"$B$  (mT)")
+            ax.legend(fontsize=9, loc="lower right")
+        axes[0].set_ylabel(r"$M/M_s$")
+        fig.savefig(args.plot, dpi=300, bbox_inches="tight", facecolor="white")
+        print(f"Plot: {args.plot}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Single-pass font-family rewriting for SVG files.
+
+Replaces font names only where SVG declares fonts: `font-family`
+attributes, and the `font-family`, `font` and `-inkscape-font-specification`
+properties inside `style` attributes and <style> elements. Path data and
+text content are never touched.
+
+A font-family value is read as a comma-separated list. Each family is
+unquoted (plain quotes or the &quot;/&apos; entities of attribute values),
+matched as a whole name, so "ArialMT" maps as a whole rather than as
+"Arial" + "MT", and written back with its original quotes. A PostScript
+style suffix ("Arial-BoldMT", "Arial-ItalicMT") is moved into font-weight
+and font-style in the same declaration block, unless the block already
+sets them. Suffixed names in `font-family` attributes, and suffixes that
+are not a weight or style, are left alone. The
+-inkscape-font-specification value ("Arial, Bold") has its family
+replaced and its style kept.
+
+Files are processed in chunks cut at tag boundaries, so memory use stays
+flat however large the SVG is.
+
+Usage:
+    from svg_fonts import rewrite_fonts, rewrite_fonts_in_file
+
+    text, count = rewrite_fonts(svg_text, {"Arial": "Source Sans Pro"})
+    count = rewrite_fonts_in_file(svg_path, {"Arial": "Source Sans Pro"})
+"""
+
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+
+CHUNK_SIZE = 1 << 20
+
+# `style="..."` / `font-family='...'` attributes
+_ATTR_RE = re.compile(r"""(?<![\w:-])(style|font-family)(\s*=\s*)(["'])(.*?)\3""", re.S)
+
+# <style> elements (embedded CSS)
+_STYLE_ELEMENT_RE = re.compile(r"(<style\b[^>]*>)(.*?)(</style\s*>)", re.S)
+
+# Font-bearing declarations inside a style attribute or CSS block; values
+# may hold quoted strings and entities (&quot;), whose ';' does not end them
+_PROPERTY_RE = re.compile(
+    r"""(?<![\w-])(font-family|font|-inkscape-font-specification)(\s*:\s*)"""
+    r"""((?:"[^"]*"|'[^']*'|&\w+;|[^;}"'&])*)"""
+)
+
+# Rule bodies of a <style> element
+_RULE_RE = re.compile(r"(\{)([^{}]*)(\})")
+
+# One entry of a comma-separated family list, and a family's quotes
+_ITEM_RE = re.compile(
+    r"""(?:"[^"]*"|'[^']*'|&quot;.*?&quot;|&apos;.*?&apos;|&(?!quot;|apos;)|[^,"'&])+"""
+)
+_FAMILY_RE = re.compile(r"""(\s*)(?:("|'|&quot;|&apos;)(.*)\2|(.*?))(\s*)""", re.S)
+
+# PostScript style suffixes ("Arial-BoldItalicMT") and the CSS they imply
+_SUFFIX_RE = re.compile(r"(?:(Bold)|Regular|Roman)?(Italic|Oblique)?(?:MT|PS)?")
+
+
+@lru_cache(maxsize=None)
+def _name_pattern(names):
+    alternation = "|".join(re.escape(n) for n in sorted(names, key=len, reverse=True))
+    return re.compile(rf"(?<!\S)({alternation})(?:-(\w+))?$")
+
+
+def _suffix_css(suffix):
+    """CSS properties implied by a PostScript style suffix, or None if it
+    is not a weight or style."""
+    match = _SUFFIX_RE.fullmatch(suffix)
+    if not match or not suffix:
+        return None
+    css = {}
+    if match.group(1):
+        css["font-weight"] = "bold"
+    if match.group(2):
+        css["font-style"] = "italic"
+    return css
+
+
+def rewrite_fonts(text: str, replacements: dict):
+    """Replace font names in the font declarations of SVG markup.
+
+    Args:
+        text: SVG markup (a whole document, or a chunk ending on a tag boundary)
+        replacements: Mapping of old font name to new font name
+
+    Returns:
+        Tuple of (rewritten text, number of font names replaced)
+    """
+    pattern = _name_pattern(tuple(replacements))
+    count = 0
+
+    def family(item, implied, shorthand=False):
+        """Rewrite one family of a list; `implied` collects CSS from suffixes
+        (None where there is no declaration block to add it to)."""
+        nonlocal count
+        prefix = ""
+        if shorthand:
+            # Style and size ahead of a quoted family: "bold 12px 'Arial'"
+            split = re.match(r"(.*\s)(?=[\"']|&quot;|&apos;)", item, re.S)
+            if split:
+                prefix, item = split.group(1), item[split.end():]
+        lead, quote, quoted, name, trail = _FAMILY_RE.fullmatch(item).groups()
+        name = quoted if quote else name
+        quote = quote or ""
+        match = (pattern.search if shorthand and not quote else pattern.fullmatch)(name)
+        if not match:
+            return prefix + item
+        suffix = match.group(2)
+        if suffix is not None:
+            css = _suffix_css(suffix)
+            if css is None or implied is None:
+                return prefix + item
+            implied.update(css)
+        count += 1
+        name = name[:match.start()] + replacements[match.group(1)] + name[match.end():]
+        return f"{prefix}{lead}{quote}{name}{quote}{trail}"
+
+    def families(value, implied, shorthand=False):
+        # In the font shorthand, the first entry also holds style and size
+        return _ITEM_RE.sub(
+            lambda m: family(m.group(0), implied, shorthand and m.start() == 0), value
+        )
+
+    def specification(value):
+        lead, quote, quoted, spec, trail = _FAMILY_RE.fullmatch(value).groups()
+        spec = quoted if quote else spec
+        name, comma, style = spec.partition(",")
+        styles = {}
+        new_name = family(name, styles)
+        if new_name == name:
+            return value
+        if styles and not comma:
+            # Pango's "Family Style" form; a comma would need quoting
+            new_name += " " + " ".join(v.capitalize() for v in styles.values())
+        quote = quote or ""
+        return f"{lead}{quote}{new_name}{comma}{style}{quote}{trail}"
+
+    def block(css):
+        implied = {}
+
+        def declaration(m):
+            prop, sep, value = m.groups()
+            if prop == "-inkscape-font-specification":
+                value = specification(value)
+            else:
+                value = families(value, implied, shorthand=(prop == "font"))
+            return prop + sep + value
+
+        css = _PROPERTY_RE.sub(declaration, css)
+        missing = [
+            f"{prop}:{value}" for prop, value in implied.items()
+            if not re.search(rf"(?<![\w-]){prop}\s*:", css)
+        ]
+        if missing:
+            body = css.rstrip()
+            sep = "" if not body or body.endswith(";") else ";"
+            css = body + sep + ";".join(missing) + css[len(body):]
+        return css
+
+    def attribute(m):
+        name, sep, quote, value = m.groups()
+        value = families(value, None) if name == "font-family" else block(value)
+        return f"{name}{sep}{quote}{value}{quote}"
+
+    def style_element(m):
+        css = _RULE_RE.sub(lambda r: r.group(1) + block(r.group(2)) + r.group(3), m.group(2))
+        return m.group(1) + css + m.group(3)
+
+    text = _ATTR_RE.sub(attribute, text)
+    text = _STYLE_ELEMENT_RE.sub(style_element, text)
+    return text, count
+
+
+def iter_tag_chunks(stream, size: int = CHUNK_SIZE):
+    """Yield text from `stream` in pieces that end just after a '>'.
+
+    A piece never splits a tag (so attributes stay whole) or a <style>
+    element.
+    """
+    pending = ""
+    for block in iter(lambda: stream.read(size), ""):
+        pending += block
+        cut = pending.rfind(">") + 1
+        open_style = pending.rfind("<style", 0, cut)
+        if open_style != -1 and pending.find("</style", open_style, cut) == -1:
+            cut = open_style
+        if cut > 0:
+            yield pending[:cut]
+            pending = pending[cut:]
+    if pending:
+        yield pending
+
+
+def rewrite_fonts_stream(src, dst, replacements: dict) -> int:
+    """Copy SVG text from `src` to `dst`, rewriting fonts on the way.
+
+    Returns:
+        Number of font names replaced
+    """
+    total = 0
+    for chunk in iter_tag_chunks(src):
+        chunk, count = rewrite_fonts(chunk, replacements)
+        dst.write(chunk)
+        total += count
+    return total
+
+
+def rewrite_fonts_in_file(svg_path: Path, replacements: dict) -> int:
+    """Rewrite fonts in an SVG file in place (atomically).
+
+    Returns:
+        Number of font names replaced
+    """
+    svg_path = Path(svg_path)
+    tmp_path = svg_path.with_name(svg_path.name + ".tmp")
+    try:
+        with open(svg_path, "r", encoding="utf-8", newline="") as src, \
+                open(tmp_path, "w", encoding="utf-8", newline="") as dst:
+            count = rewrite_fonts_stream(src, dst, replacements)
+        os.replace(tmp_path, svg_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return count
@@ -0,0 +1,616 @@
+#!/usr/bin/env python
+"""
+Optimize SVG figures: smaller files that are quicker to rasterize.
+
+Inkscape's PDF import writes coordinates with six or more decimals, nests
+transforms several groups deep and keeps clip paths nothing uses. Each
+optimization below leaves the drawing visually unchanged at the chosen
+precision and tolerance:
+
+1. Round path data, points, geometry attributes and transforms to
+   `precision` decimals (transforms keep 3 more, since they scale
+   everything inside them)
+2. Merge transforms: a transform on a group with a single child moves into
+   the child (combined into one matrix), translations on paths are applied
+   to the path data, identity transforms and attribute-less groups go
+3. Remove <defs> entries (clip paths, gradients, ...) that nothing
+   references
+4. Simplify runs of straight segments (the polylines that plotted data
+   becomes) with Ramer-Douglas-Peucker within `tolerance` user units
+
+With minify, editor-only data is dropped as well: comments, <metadata>,
+Inkscape and Sodipodi elements and attributes, and the whitespace between
+tags. This is done for published SVGs, not for the editable ones in
+SVGFiles/.
+
+The Inkscape converter runs steps 1-4 on every SVG it writes, after fonts
+are replaced (disable with --no-svg-optimize), and figure_vector.py runs
+them with minify on the SVGs it publishes.
+
+Usage:
+    python scripts/svg_optimize.py ../Essentials-of-Paleomagnetism/SVGFiles/chapter11/*.svg
+    python scripts/svg_optimize.py --precision 1 --tolerance 0.2 figure.svg
+    python scripts/svg_optimize.py --minify book/figures/chapter11/fisher.svg
+
+    from svg_optimize import optimize_svg
+
+    svg_bytes = optimize_svg(svg_path.read_bytes(), precision=2, tolerance=0.05)
+"""
+
+import argparse
+import math
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import numpy as np
+
+SVG_NS = "http://www.w3.org/2000/svg"
+XLINK_NS = "http://www.w3.org/1999/xlink"
+INKSCAPE_NS = "http://www.inkscape.org/namespaces/inkscape"
+SODIPODI_NS = "http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd"
+
+# Editor-only namespaces dropped from published SVGs
+EDITOR_NAMESPACES = {
+    INKSCAPE_NS,
+    SODIPODI_NS,
+    "http://creativecommons.org/ns#",
+    "http://purl.org/dc/elements/1.1/",
+    "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+}
+
+# Decimals kept in coordinates (user units; 0.01 pt is 0.04 px at 300 dpi)
+PRECISION = 2
+
+# Largest deviation allowed when simplifying polylines, in user units
+TOLERANCE = 0.05
+
+# Extra decimals kept in transforms, which scale the coordinates inside them
+TRANSFORM_EXTRA_PRECISION = 3
+
+# Attributes holding plain numbers (with optional units)
+GEOMETRY_ATTRS = {
+    "x", "y", "width", "height", "cx", "cy", "r", "rx", "ry",
+    "x1", "y1", "x2", "y2", "viewBox",
+}
+
+# Properties that define their own coordinate space, so a transform cannot
+# be moved past an element that has them
+_SPACE_PROPERTIES = ("clip-path", "mask", "filter")
+
+# <defs> children that are used without an id reference
+_KEEP_IN_DEFS = {f"{{{SVG_NS}}}{tag}" for tag in ("style", "font", "font-face")}
+
+# Text whose whitespace is content
+_TEXT_TAGS = {f"{{{SVG_NS}}}{tag}" for tag in ("text", "tspan", "textPath")}
+
+ET.register_namespace("", SVG_NS)
+ET.register_namespace("xlink", XLINK_NS)
+ET.register_namespace("inkscape", INKSCAPE_NS)
+ET.register_namespace("sodipodi", SODIPODI_NS)
+ET.register_namespace("rdf", "http://www.w3.org/1999/02/22-rdf-syntax-ns#")
+ET.register_namespace("cc", "http://creativecommons.org/ns#")
+ET.register_namespace("dc", "http://purl.org/dc/elements/1.1/")
+
+_NUMBER_RE = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_PATH_TOKEN_RE = re.compile(r"([MmLlHhVvCcSsQqTtAaZz])|([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)")
+_TRANSFORM_RE = re.compile(r"(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)")
+_URL_RE = re.compile(r"url\(\s*['\"]?#([^)'\"]+)['\"]?\s*\)")
+
+# Number of arguments per path command
+_ARITY = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2, "A": 7, "Z": 0}
+
+_IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def _tag(name: str) -> str:
+    return f"{{{SVG_NS}}}{name}"
+
+
+def _namespace(name: str):
+    return name[1:].split("}", 1)[0] if name.startswith("{") else None
+
+
+def format_number(value: float, precision: int = None) -> str:
+    """Shortest text for `value` rounded to `precision` decimals (e.g. ".5")."""
+    if precision is None:
+        text = f"{value:.10g}"
+    else:
+        text = f"{value:.{precision}f}"
+        if "." in text:
+            text = text.rstrip("0").rstrip(".")
+    if text in ("-0", "", "-"):
+        return "0"
+    if text.startswith("0."):
+        return text[1:]
+    if text.startswith("-0."):
+        return "-" + text[2:]
+    return text
+
+
+def _join_numbers(numbers) -> str:
+    """Numbers separated by spaces, omitted before a minus sign."""
+    out = ""
+    for text in numbers:
+        if out and not text.startswith("-"):
+            out += " "
+        out += text
+    return out
+
+
+# -- Transforms --------------------------------------------------------------
+
+def parse_transform(text: str):
+    """The affine matrix (a, b, c, d, e, f) of a transform attribute, or None."""
+    matrix = _IDENTITY
+    end = 0
+    for match in _TRANSFORM_RE.finditer(text):
+        if text[end:match.start()].strip(" ,\t\n"):
+            return None
+        end = match.end()
+        kind = match.group(1)
+        args = [float(v) for v in _NUMBER_RE.findall(match.group(2))]
+        if kind == "matrix" and len(args) == 6:
+            step = tuple(args)
+        elif kind == "translate" and len(args) in (1, 2):
+            step = (1, 0, 0, 1, args[0], args[1] if len(args) == 2 else 0)
+        elif kind == "scale" and len(args) in (1, 2):
+            step = (args[0], 0, 0, args[-1], 0, 0)
+        elif kind == "rotate" and len(args) in (1, 3):
+            angle = math.radians(args[0])
+            cos, sin = math.cos(angle), math.sin(angle)
+            step = (cos, sin, -sin, cos, 0, 0)
+            if len(args) == 3:
+                cx, cy = args[1], args[2]
+                step = multiply((1, 0, 0, 1, cx, cy), multiply(step, (1, 0, 0, 1, -cx, -cy)))
+        elif kind == "skewX" and len(args) == 1:
+            step = (1, 0, math.tan(math.radians(args[0])), 1, 0, 0)
+        elif kind == "skewY" and len(args) == 1:
+            step = (1, math.tan(math.radians(args[0])), 0, 1, 0, 0)
+        else:
+            return None
+        matrix = multiply(matrix, step)
+    if text[end:].strip(" ,\t\n"):
+        return None
+    return matrix
+
+
+def multiply(m1, m2):
+    """Matrix product m1 x m2 (apply m2 first)."""
+    a1, b1, c1, d1, e1, f1 = m1
+    a2, b2, c2, d2, e2, f2 = m2
+    return (
+        a1 * a2 + c1 * b2, b1 * a2 + d1 * b2,
+        a1 * c2 + c1 * d2, b1 * c2 + d1 * d2,
+        a1 * e2 + c1 * f2 + e1, b1 * e2 + d1 * f2 + f1,
+    )
+
+
+def format_transform(matrix, precision: int = None) -> str:
+    """Shortest transform attribute for a matrix ("" for the identity)."""
+    p = None if precision is None else precision + TRANSFORM_EXTRA_PRECISION
+    values = [format_number(v, p) for v in matrix]
+    a, b, c, d, e, f = values
+    if (a, b, c, d) == ("1", "0", "0", "1"):
+        if (e, f) == ("0", "0"):
+            return ""
+        return f"translate({_join_numbers([e, f] if f != '0' else [e])})"
+    if (b, c, e, f) == ("0", "0", "0", "0"):
+        return f"scale({_join_numbers([a, d] if a != d else [a])})"
+    return f"matrix({_join_numbers(values)})"
+
+
+def _defines_space(element) -> bool:
+    style = element.get("style", "")
+    return any(element.get(name) or f"{name}:" in style for name in _SPACE_PROPERTIES)
+
+
+def merge_transforms(root, precision: int = None):
+    """Move, combine and apply transforms (see the module docstring)."""
+    # Push group transforms down single-child chains, outermost first
+    for group in root.iter(_tag("g")):
+        children = list(group)
+        if (len(children) != 1 or "transform" not in group.attrib
+                or _defines_space(group) or not isinstance(children[0].tag, str)):
+            continue
+        outer = parse_transform(group.get("transform"))
+        inner = parse_transform(children[0].get("transform", ""))
+        if outer is None or inner is None:
+            continue
+        children[0].set("transform", format_transform(multiply(outer, inner)))
+        del group.attrib["transform"]
+
+    for element in root.iter():
+        if "transform" not in element.attrib:
+            continue
+        matrix = parse_transform(element.get("transform"))
+        if matrix is None:
+            continue
+        # A translation moves path data exactly, unless something is
+        # positioned in the path's own user space (a clip, or a
+        # userSpaceOnUse gradient or pattern)
+        if (element.tag == _tag("path") and matrix[:4] == (1, 0, 0, 1)
+                and not _defines_space(element)
+                and not any(_URL_RE.search(element.get(name, ""))
+                            for name in ("style", "fill", "stroke"))):
+            segments = parse_path(element.get("d", ""))
+            if segments is not None:
+                element.set("d", format_path(translate_path(segments, matrix[4], matrix[5]),
+                                             precision))
+                matrix = _IDENTITY
+        text = format_transform(matrix, precision)
+        if text:
+            element.set("transform", text)
+        else:
+            del element.attrib["transform"]
+
+    collapse_groups(root)
+
+
+def collapse_groups(root):
+    """Replace groups that have no attributes with their children."""
+    for parent in list(root.iter()):
+        index = 0
+        while index < len(parent):
+            child = parent[index]
+            if child.tag == _tag("g") and not child.attrib:
+                parent.remove(child)
+                for offset, grandchild in enumerate(list(child)):
+                    parent.insert(index + offset, grandchild)
+                continue
+            index += 1
+
+
+# -- Path data ---------------------------------------------------------------
+
+def parse_path(d: str):
+    """Absolute path segments [(command, [args])] of path data, or None.
+
+    Relative commands are made absolute and H/V become L, so every segment
+    ends on an explicit point. Returns None for data that does not parse.
+    """
+    tokens = _PATH_TOKEN_RE.findall(d)
+    if "".join(t[0] or t[1] for t in tokens) != re.sub(r"[\s,]+", "", d):
+        return None
+
+    segments = []
+    x = y = start_x = start_y = 0.0
+    command = None
+    args = []
+    i = 0
+    while i < len(tokens):
+        letter, number = tokens[i]
+        if letter:
+            command = letter
+            i += 1
+            if command in "Zz":
+                segments.append(("Z", []))
+                x, y = start_x, start_y
+                continue
+        elif command is None or command in "Zz":
+            return None
+        arity = _ARITY[command.upper()]
+        args = [float(t[1]) for t in tokens[i:i + arity]]
+        if len(args) != arity or any(t[0] for t in tokens[i:i + arity]):
+            return None
+        # Arc flags may be written without separators ("a1 1 0 011 1");
+        # leave such data alone rather than guess
+        if command in "Aa" and any(tokens[i + k][1] not in ("0", "1") for k in (3, 4)):
+            return None
+        i += arity
+
+        upper = command.upper()
+        relative = command.islower()
+        if upper == "H":
+            args, upper = [args[0] + (x if relative else 0), y], "L"
+        elif upper == "V":
+            args, upper = [x, args[0] + (y if relative else 0)], "L"
+        elif relative:
+            if upper == "A":
+                args[5] += x
+                args[6] += y
+            else:
+                args = [v + (x if k % 2 == 0 else y) for k, v in enumerate(args)]
+        segments.append((upper, args))
+        x, y = args[-2], args[-1]
+        if upper == "M":
+            start_x, start_y = x, y
+            # Further coordinate pairs after a moveto are linetos
+            command = "l" if relative else "L"
+    return segments
+
+
+def translate_path(segments, dx: float, dy: float):
+    """Shift absolute segments by (dx, dy)."""
+    moved = []
+    for command, args in segments:
+        if command == "A":
+            args = args[:5] + [args[5] + dx, args[6] + dy]
+        else:
+            args = [v + (dx if k % 2 == 0 else dy) for k, v in enumerate(args)]
+        moved.append((command, args))
+    return moved
+
+
+def _rdp_keep(points, tolerance: float):
+    """Mask of the points Ramer-Douglas-Peucker keeps (endpoints always)."""
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        inner = points[first + 1:last]
+        chord = end - start
+        length = math.hypot(chord[0], chord[1])
+        if length == 0:
+            distances = np.hypot(inner[:, 0] - start[0], inner[:, 1] - start[1])
+        else:
+            distances = np.abs(chord[0] * (inner[:, 1] - start[1])
+                               - chord[1] * (inner[:, 0] - start[0])) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def simplify_path(segments, tolerance: float):
+    """Drop L points that lie within `tolerance` of the simplified polyline."""
+    out = []
+    run = []  # Indices into `out` of a run of L segments
+    run_start = current = subpath_start = (0.0, 0.0)
+
+    def flush():
+        if len(run) >= 2:
+            points = np.array([run_start] + [out[i][1] for i in run])
+            for i, kept in zip(run, _rdp_keep(points, tolerance)[1:]):
+                if not kept:
+                    out[i] = None
+        run.clear()
+
+    for command, args in segments:
+        if command == "L":
+            if not run:
+                run_start = current
+            run.append(len(out))
+        else:
+            flush()
+        out.append((command, args))
+        current = subpath_start if command == "Z" else tuple(args[-2:])
+        if command == "M":
+            subpath_start = current
+    flush()
+    return [segment for segment in out if segment is not None]
+
+
+def format_path(segments, precision: int = None) -> str:
+    """Compact absolute path data, using H/V where a coordinate repeats."""
+    parts = []
+    previous_command = None
+    x = y = None
+    for command, args in segments:
+        texts = [format_number(v, precision) for v in args]
+        if command == "L" and x is not None:
+            if texts[1] == y:
+                command, texts = "H", [texts[0]]
+            elif texts[0] == x:
+                command, texts = "V", [texts[1]]
+        if command != previous_command or command in "MZ":
+            parts.append(command + _join_numbers(texts))
+        else:
+            parts.append(_join_numbers(texts) if texts[0].startswith("-") else " " + _join_numbers(texts))
+        previous_command = command
+        if command == "H":
+            x = texts[0]
+        elif command == "V":
+            y = texts[0]
+        elif command == "Z":
+            x = y = None
+        else:
+            x, y = texts[-2], texts[-1]
+    return "".join(parts)
+
+
+# -- Whole-document passes ---------------------------------------------------
+
+def optimize_paths(root, precision: int = None, tolerance: float = 0):
+    """Round and simplify the path data of every <path>."""
+    for element in root.iter(_tag("path")):
+        segments = parse_path(element.get("d", ""))
+        if segments is None:
+            continue
+        if tolerance:
+            segments = simplify_path(segments, tolerance)
+        element.set("d", format_path(segments, precision))
+
+
+def round_attributes(root, precision: int):
+    """Round geometry attributes and polyline/polygon points."""
+    def rounded(text):
+        return _NUMBER_RE.sub(lambda m: format_number(float(m.group()), precision), text)
+
+    for element in root.iter():
+        for name in GEOMETRY_ATTRS.intersection(element.attrib):
+            element.set(name, rounded(element.get(name)))
+        if "points" in element.attrib:
+            numbers = [format_number(float(v), precision)
+                       for v in _NUMBER_RE.findall(element.get("points"))]
+            element.set("points", _join_numbers(numbers))
+        if "transform" in element.attrib:
+            matrix = parse_transform(element.get("transform"))
+            if matrix is not None:
+                text = format_transform(matrix, precision)
+                if text:
+                    element.set("transform", text)
+                else:
+                    del element.attrib["transform"]
+
+
+def _references(root):
+    """Ids referenced by url(#id) or href="#id" anywhere in the document."""
+    ids = set()
+    hrefs = ("href", f"{{{XLINK_NS}}}href")
+    for element in root.iter():
+        for name, value in element.attrib.items():
+            ids.update(_URL_RE.findall(value))
+            if name in hrefs and value.startswith("#"):
+                ids.add(value[1:])
+        if element.tag == _tag("style") and element.text:
+            ids.update(_URL_RE.findall(element.text))
+    return ids
+
+
+def remove_dead_defs(root) -> int:
+    """Remove <defs> children that nothing references; returns how many."""
+    removed = 0
+    while True:
+        referenced = _references(root)
+        dead = [
+            (defs, child) for defs in root.iter(_tag("defs")) for child in list(defs)
+            if isinstance(child.tag, str) and child.get("id") not in referenced
+            and child.tag not in _KEEP_IN_DEFS
+        ]
+        if not dead:
+            break
+        for defs, child in dead:
+            defs.remove(child)
+        removed += len(dead)
+    for parent in list(root.iter()):
+        for defs in parent.findall(_tag("defs")):
+            if len(defs) == 0:
+                parent.remove(defs)
+    return removed
+
+
+def strip_editor_data(root):
+    """Remove editor-only elements and attributes from `root` in place."""
+    for parent in root.iter():
+        for child in list(parent):
+            if (not isinstance(child.tag, str) or _namespace(child.tag) in EDITOR_NAMESPACES
+                    or child.tag == _tag("metadata")):
+                parent.remove(child)
+        for name in [n for n in parent.attrib if _namespace(n) in EDITOR_NAMESPACES]:
+            del parent.attrib[name]
+
+
+def strip_whitespace(root):
+    """Drop whitespace-only text between tags (text content is kept)."""
+    def walk(element, in_text):
+        in_text = in_text or element.tag in _TEXT_TAGS
+        if not in_text and element.text is not None and not element.text.strip():
+            element.text = None
+        for child in element:
+            if not in_text and child.tail is not None and not child.tail.strip():
+                child.tail = None
+            walk(child, in_text)
+
+    walk(root, False)
+
+
+def optimize_svg(data: bytes, precision: int = PRECISION, tolerance: float = TOLERANCE,
+                 minify: bool = False) -> bytes:
+    """Optimized version of an SVG document.
+
+    Args:
+        data: SVG document
+        precision: Decimals kept in coordinates, or None to keep them all
+        tolerance: Polyline simplification tolerance in user units (0: off)
+        minify: Also drop editor-only data and whitespace
+
+    Raises:
+        xml.etree.ElementTree.ParseError: If `data` is not well-formed XML
+    """
+    root = ET.fromstring(data)
+    if minify:
+        strip_editor_data(root)
+        strip_whitespace(root)
+    remove_dead_defs(root)
+    merge_transforms(root, precision)
+    optimize_paths(root, precision, tolerance)
+    if precision is not None:
+        round_attributes(root, precision)
+    return ET.tostring(root, encoding="utf-8", xml_declaration=not minify)
+
+
+def minify_svg(data: bytes) -> bytes:
+    """Minified version of an SVG document, with coordinates left as they are."""
+    return optimize_svg(data, precision=None, tolerance=0, minify=True)
+
+
+def optimize_file(svg_path: Path, output_path: Path = None, precision: int = PRECISION,
+                  tolerance: float = TOLERANCE, minify: bool = False):
+    """Optimize an SVG file (in place unless `output_path` is given).
+
+    An SVG the optimizations would not make smaller is left as it is.
+
+    Returns:
+        Tuple of (bytes before, bytes after)
+    """
+    svg_path = Path(svg_path)
+    output_path = Path(output_path) if output_path else svg_path
+    data = svg_path.read_bytes()
+    result = optimize_svg(data, precision, tolerance, minify)
+    if len(result) >= len(data):
+        result = data
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    tmp_path.write_bytes(result)
+    os.replace(tmp_path, output_path)
+    return len(data), len(result)
+
+
+def format_saving(before: int, after: int) -> str:
+    """e.g. "812.4 KB -> 301.2 KB (-63%)"."""
+    change = 100 * (after - before) / before if before else 0
+    return f"{before / 1024:.1f} KB -> {after / 1024:.1f} KB ({change:+.0f}%)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Optimize SVG figures")
+    parser.add_argument("svgs", nargs="+", type=Path, help="SVG files to optimize in place")
+    parser.add_argument(
+        "--precision", type=int, default=PRECISION,
+        help=f"Decimals kept in coordinates (default: {PRECISION})"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=TOLERANCE,
+        help=f"Path simplification tolerance in user units, 0 to disable (default: {TOLERANCE})"
+    )
+    parser.add_argument(
+        "--minify", action="store_true",
+        help="Also remove editor data (for published SVGs, not editable ones)"
+    )
+    args = parser.parse_args()
+
+    if args.precision < 0 or args.tolerance < 0:
+        print("ERROR: --precision and --tolerance must not be negative")
+        sys.exit(1)
+
+    failed = 0
+    total_before = 0
+    total_after = 0
+    for svg_path in args.svgs:
+        try:
+            before, after = optimize_file(svg_path, precision=args.precision,
+                                          tolerance=args.tolerance, minify=args.minify)
+        except (OSError, ET.ParseError) as e:
+            print(f"  FAILED: {svg_path} ({e})")
+            failed += 1
+            continue
+        total_before += before
+        total_after += after
+        print(f"  {svg_path.name}: {format_saving(before, after)}")
+
+    if total_before:
+        print(f"\nTotal: {format_saving(total_before, total_after)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+"""
+Embed the interactive widgets in the book as lazily loaded static files.
+
+The chapters used to read each *_widget.html in a code cell, base64-encode
+it and inject it as an `iframe src="data:..."`. That made each widget a
+third larger, put it inline in the chapter HTML (so it was downloaded
+before the page could paint) and kept the browser from caching it.
+
+Widgets are now published as ordinary files in widgets/ of the built
+site, with a content hash in each name (vrm_widget.3f2a9c01de.html). A
+changed file gets a new URL, so published files never go stale in a
+cache. Pages link the shared runtime (widget_runtime.py) by its hashed
+name as well, so changing the runtime renames every page.
+
+In the chapters, widget_html() emits an `<iframe loading="lazy">` for the
+published page, with the widget's static PNG as the iframe background.
+The browser fetches the widget and Plotly only when it scrolls near the
+viewport; until then, or without a network, the PNG shows.
+
+If figure_variants.py has written WebP variants of a fallback figure, the
+smallest one at least POSTER_WIDTH pixels wide is published instead of
+the full-resolution PNG.
+
+Widgets and their fallback figures are listed in WIDGETS. Publish them
+after building the book; iframe URLs start with $BASE_URL, like the rest
+of the site.
+
+Builds that publish the widgets set PUBLISH_WIDGETS=1 (the deploy workflow
+and `make build`, `make build-execute` and `make serve`). Without it, as
+under `make start`, nothing is published where the page could load it, so
+widget_html() falls back to the self-contained page with the runtime
+inlined, as a data: URI.
+
+Usage:
+    python scripts/widget_embed.py                      # Into book/_build/html/widgets/
+    python scripts/widget_embed.py --out site/widgets   # Elsewhere
+    python scripts/widget_embed.py --list               # Show the published names
+
+In a chapter code cell (run from book/chapters/):
+    sys.path.insert(0, str(Path('..', '..', 'scripts').resolve()))
+    from widget_embed import widget_html
+    HTML(widget_html('chapter7/vrm_widget.html'))
+"""
+
+import argparse
+import base64
+import hashlib
+import html
+import os
+import re
+import sys
+from pathlib import Path
+
+from figure_variants import load_manifest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+FIGURES_DIR = PROJECT_ROOT / "book" / "figures"
+PUBLISH_DIR = PROJECT_ROOT / "book" / "_build" / "html" / "widgets"
+
+# Widget pages (relative to book/figures) with the static figure shown
+# until the widget loads and a title for screen readers
+WIDGETS = {
+    "chapter5/flipping_field_widget.html": {
+        "fallback": "chapter5/flip.png",
+        "title": "Interactive Stoner-Wohlfarth flipping field",
+    },
+    "chapter7/vrm_widget.html": {
+        "fallback": "chapter7/neel-vrm.png",
+        "title": "Interactive VRM acquisition",
+    },
+    "chapter7/trm_widget.html": {
+        "fallback": "chapter7/neel-trm.png",
+        "title": "Interactive TRM acquisition during cooling",
+    },
+    "chapter7/crm_widget.html": {
+        "fallback": "chapter7/neel-crm.png",
+        "title": "Interactive CRM acquisition by grain growth",
+    },
+}
+
+RUNTIME_FILES = ("widget-runtime.css", "widget-runtime.js")
+
+# Smallest width (px) of a WebP variant used in place of a fallback PNG
+POSTER_WIDTH = 960
+
+# Characters of the SHA-256 hex digest kept in published names
+HASH_LENGTH = 10
+
+# Runtime links as written by widget_runtime.write_page()
+_RUNTIME_LINK = re.compile(r'(?:\.\./)+widgets/(widget-runtime\.(?:css|js))')
+_HASHED_NAME = re.compile(rf"\.[0-9a-f]{{{HASH_LENGTH}}}\.[a-z]+$")
+
+
+def hashed_name(name: str, content: bytes) -> str:
+    """`name` with a hash of `content` before the suffix (a.css -> a.<hash>.css)."""
+    stem, dot, suffix = Path(name).name.rpartition(".")
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    return f"{stem}.{digest}{dot}{suffix}"
+
+
+def _runtime_files():
+    """{runtime file: (published name, contents)}"""
+    # Imported here so figure_registry can list the fallbacks without NumPy
+    from widget_runtime import RUNTIME_DIR
+
+    files = {}
+    for name in RUNTIME_FILES:
+        content = (RUNTIME_DIR / name).read_bytes()
+        files[name] = (hashed_name(name, content), content)
+    return files
+
+
+def poster(fallback: str) -> str:
+    """The image shown before a widget loads (relative to book/figures).
+
+    Returns:
+        The smallest WebP variant of `fallback` at least POSTER_WIDTH wide
+        (or the widest one), if variants.json lists any that exist;
+        otherwise `fallback` itself
+    """
+    entry = load_manifest().get(fallback)
+    variants = sorted(
+        (width, path) for path, width in (entry or {}).get("sources", {}).get("image/webp", [])
+        if (FIGURES_DIR / path).exists()
+    )
+    if not variants:
+        return fallback
+    wide = [path for width, path in variants if width >= POSTER_WIDTH]
+    return wide[0] if wide else variants[-1][1]
+
+
+def _widget_files(widget: str, runtime_files):
+    """(published name, contents) of a widget page and of its poster image."""
+    page = (FIGURES_DIR / widget).read_text(encoding="utf-8")
+    page = _RUNTIME_LINK.sub(lambda m: runtime_files[m.group(1)][0], page).encode("utf-8")
+    image = poster(WIDGETS[widget]["fallback"])
+    content = (FIGURES_DIR / image).read_bytes()
+    return (hashed_name(widget, page), page), (hashed_name(image, content), content)
+
+
+def published_files():
+    """Contents of every published file.
+
+    Returns:
+        Dict of {published name: bytes} for the runtime, the widget pages
+        (linking the hashed runtime names) and their poster images
+    """
+    runtime_files = _runtime_files()
+    files = dict(runtime_files.values())
+    for widget in WIDGETS:
+        files.update(_widget_files(widget, runtime_files))
+    return files
+
+
+def widget_url(name: str, base_url: str = None) -> str:
+    """Site URL of a published file (under $BASE_URL/widgets/)."""
+    if base_url is None:
+        base_url = os.environ.get("BASE_URL", "")
+    return f"{base_url.rstrip('/')}/widgets/{name}"
+
+
+def inline_page(widget: str) -> str:
+    """A widget page with the runtime inlined, so it works as a data: URI."""
+    runtime_dir = FIGURES_DIR / "widgets"
+    page = (FIGURES_DIR / widget).read_text(encoding="utf-8")
+    page = page.replace(
+        '<link rel="stylesheet" href="../widgets/widget-runtime.css">',
+        "<style>\n" + (runtime_dir / "widget-runtime.css").read_text(encoding="utf-8") + "</style>")
+    return page.replace(
+        '<script src="../widgets/widget-runtime.js"></script>',
+        "<script>\n" + (runtime_dir / "widget-runtime.js").read_text(encoding="utf-8") + "</script>")
+
+
+def widget_html(widget: str, width: int = 700, height: int = 720, base_url: str = None,
+                published: bool = None) -> str:
+    """Markup embedding a widget.
+
+    Args:
+        widget: Widget page relative to book/figures (a key of WIDGETS)
+        width, height: Iframe size in pixels
+        base_url: Site prefix (default: $BASE_URL)
+        published: Whether the build publishes the hashed files (default:
+            $PUBLISH_WIDGETS is set)
+
+    Returns:
+        A lazily loaded `<iframe>` of the published widget, showing the
+        poster image until it has loaded; or, if the widgets are not
+        published, an `<iframe>` of the self-contained page
+    """
+    if widget not in WIDGETS:
+        raise KeyError(f"{widget} is not listed in widget_embed.WIDGETS")
+    if published is None:
+        published = bool(os.environ.get("PUBLISH_WIDGETS"))
+    title = html.escape(WIDGETS[widget]["title"], quote=True)
+    if not published:
+        data = base64.b64encode(inline_page(widget).encode("utf-8")).decode("ascii")
+        return (
+            f'<iframe src="data:text/html;base64,{data}" title="{title}"\n'
+            f'    width="{width}" height="{height}" frameborder="0"\n'
+            f'    style="border: 1px solid #ddd; max-width: 100%;">\n'
+            f'</iframe>'
+        )
+    (page, _), (image, _) = _widget_files(widget, _runtime_files())
+    return (
+        f'<iframe src="{widget_url(page, base_url)}" loading="lazy" title="{title}"\n'
+        f'    width="{width}" height="{height}" frameborder="0"\n'
+        f'    style="border: 1px solid #ddd; max-width: 100%;'
+        f" background: #fff url('{widget_url(image, base_url)}') center / contain no-repeat;\">\n"
+        f'</iframe>'
+    )
+
+
+def publish(out_dir: Path = PUBLISH_DIR):
+    """Write the published files, removing superseded hashed files.
+
+    Returns:
+        Dict of {"written": n, "unchanged": n, "removed": n}
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    files = published_files()
+    counts = {"written": 0, "unchanged": 0, "removed": 0}
+    for name, content in files.items():
+        path = out_dir / name
+        if path.exists():
+            counts["unchanged"] += 1
+            continue
+        path.write_bytes(content)
+        counts["written"] += 1
+        print(f"  {name} ({len(content) / 1e3:.1f} KB)")
+    for path in out_dir.iterdir():
+        if path.name not in files and _HASHED_NAME.search(path.name):
+            path.unlink()
+            counts["removed"] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish the book's widgets as content-hashed files")
+    parser.add_argument(
+        "--out", type=Path, default=PUBLISH_DIR,
+        help=f"Directory served as <site>/widgets/ (default: {PUBLISH_DIR.relative_to(PROJECT_ROOT)})"
+    )
+    parser.add_argument(
+        "--list", action="store_true",
+        help="Print the published names without writing anything"
+    )
+    args = parser.parse_args()
+
+    try:
+        files = published_files()
+    except FileNotFoundError as exc:
+        print(f"ERROR: {exc.filename} not found")
+        print("Regenerate the widgets first, e.g.: cd scripts && python chapter7_vrm_interactive.py")
+        sys.exit(1)
+
+    if args.list:
+        for name, content in files.items():
+            print(f"  {name} ({len(content) / 1e3:.1f} KB)")
+        return
+
+    print(f"Publishing widgets to {args.out}")
+    counts = publish(args.out)
+    print(f"Done: {counts['written']} written, {counts['unchanged']} unchanged, "
+          f"{counts['removed']} superseded files removed")
+
+
+if __name__ == "__main__":
+    main()
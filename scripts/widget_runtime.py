@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+"""
+Shared runtime for the interactive HTML widgets.
+
+The widget generators (flipping_field.py and the chapter 7 VRM/TRM/CRM
+scripts) all need the same stylesheet, Plotly and font tags, Neel
+relaxation helpers and slider play/reset logic. These are written once to
+book/figures/widgets/ as widget-runtime.css and widget-runtime.js. Each
+widget page links them and carries only its markup, its data and a short
+init script. When a chapter page shows several widgets, the browser
+fetches, parses and compiles the runtime once and reuses the cached copy.
+
+JS API (global `Widget`):
+  kB, tau0                    Boltzmann constant (J/K), attempt time (s)
+  calcV(tau, T_K, K_J)        Grain volume (zm^3) with relaxation time tau
+  vCurve(tau, T_K, K_J, vMax) calcV over an array of K, clipped to [0, vMax]
+  msRatio(T_K)                Magnetite Ms(T) relative to 20 C
+  interp(x_new, x, y)         Linear interpolation (x ascending)
+  axis(title, extra)          Plotly axis, legend, layout and annotation
+  legend(extra)               styles shared by the widgets
+  layout(extra)
+  note(x, y, text, color, size)
+  plot(id, traces, layout)    Plotly.newPlot without the mode bar
+  player(opts)                Slider with Play/Pause and Reset buttons
+
+The Neel helpers are JS ports of neel.blocking_volume() and
+neel.ms_ratio(), with the constants filled in from neel.py.
+
+Usage:
+    python widget_runtime.py     # Rewrite the runtime files
+
+    from widget_runtime import write_page
+    write_page(output_path, title, body, script)   # In a widget generator
+"""
+
+import os
+from pathlib import Path
+
+from neel import GAMMA, K_B, T_ROOM, TAU_0, TC_MAGNETITE
+
+PROJECT_ROOT = Path(__file__).parent.parent
+RUNTIME_DIR = PROJECT_ROOT / "book" / "figures" / "widgets"
+
+PLOTLY_URL = "https://cdn.plot.ly/plotly-2.35.2.min.js"
+FONTS_URL = ("https://fonts.googleapis.com/css2?family=Source+Serif+4:ital,opsz,wght@"
+             "0,8..60,300;0,8..60,400;0,8..60,600;1,8..60,400"
+             "&family=JetBrains+Mono:wght@400&display=swap")
+
+RUNTIME_CSS = """\
+/* Shared widget styles (generated by scripts/widget_runtime.py) */
+*{box-sizing:border-box;margin:0;padding:0}
+body{
+  font-family:'Source Serif 4',Georgia,serif;
+  background:#f8f7f4;
+  color:#1e293b;
+  padding:20px 20px 40px;
+  min-height:100vh;
+}
+.container{max-width:620px;margin:0 auto}
+
+.description{
+  font-size:0.84rem;
+  color:#475569;
+  line-height:1.55;
+  margin-bottom:14px;
+}
+.description b{color:#1e293b}
+.description .pill{
+  font-family:'JetBrains Mono',monospace;
+  font-size:0.8rem;
+  background:#ece9e3;
+  padding:1px 5px;border-radius:3px;
+}
+
+.controls{
+  display:flex;align-items:center;gap:12px;
+  flex-wrap:wrap;
+  margin-bottom:12px;
+  padding:10px 14px;
+  background:#fff;
+  border:1px solid #d6d3cd;
+  border-radius:8px;
+  box-shadow:0 1px 3px rgba(0,0,0,0.04);
+}
+.controls label{font-size:0.9rem;font-weight:600;white-space:nowrap}
+.slider-wrap{flex:1;min-width:180px;display:flex;align-items:center;gap:10px}
+.slider-wrap input[type=range]{
+  flex:1;height:6px;-webkit-appearance:none;appearance:none;
+  background:#d6d3cd;border-radius:3px;outline:none;cursor:pointer;
+}
+.slider-wrap input[type=range]::-webkit-slider-thumb{
+  -webkit-appearance:none;width:18px;height:18px;
+  background:#b91c1c;border:2px solid #fff;border-radius:50%;
+  box-shadow:0 1px 4px rgba(0,0,0,0.25);cursor:pointer;
+}
+.slider-wrap input[type=range]::-moz-range-thumb{
+  width:18px;height:18px;
+  background:#b91c1c;border:2px solid #fff;border-radius:50%;
+  box-shadow:0 1px 4px rgba(0,0,0,0.25);cursor:pointer;
+}
+.time-val{
+  font-family:'JetBrains Mono',monospace;
+  font-size:1.05rem;font-weight:600;
+  min-width:90px;text-align:right;
+  color:#b91c1c;
+}
+.btn{
+  font-family:inherit;font-size:0.82rem;font-weight:600;
+  padding:5px 12px;border:1px solid #d6d3cd;border-radius:5px;
+  background:#fff;color:#1e293b;cursor:pointer;
+  transition:background 0.15s,border-color 0.15s;
+  white-space:nowrap;
+}
+.btn:hover{background:#f1f0ec;border-color:#94a3b8}
+.btn.active{background:#b91c1c;color:#fff;border-color:#b91c1c}
+
+.status{
+  font-size:0.86rem;line-height:1.6;
+  padding:7px 14px;
+  margin-bottom:10px;
+  background:#fff;
+  border:1px solid #d6d3cd;
+  border-radius:8px;
+}
+.status .lbl{font-weight:600}
+
+#plot{
+  background:#fff;
+  border:1px solid #d6d3cd;
+  border-radius:8px;
+  box-shadow:0 1px 3px rgba(0,0,0,0.04);
+  overflow:hidden;
+}
+"""
+
+RUNTIME_JS = r"""/* Shared widget runtime (generated by scripts/widget_runtime.py) */
+var Widget = (function() {
+  var kB = %%K_B%%;
+  var tau0 = %%TAU_0%%;
+  var FONT = 'Source Serif 4, Georgia, serif';
+  var C = {text:'#1e293b', grid:'#e8e6e1', ax:'#334155', border:'#d6d3cd'};
+
+  /* --- Neel relaxation --- */
+
+  /* Grain volume (zm³) with relaxation time tau (s) at T_K (K) for an
+     anisotropy energy density K_J (J/m³) */
+  function calcV(tau, T_K, K_J) {
+    return (kB * T_K * Math.log(tau / tau0)) / Math.max(K_J, 1e-5) * 1e21;
+  }
+
+  /* calcV over an array of K_J, clipped to [0, vMax] for plotting */
+  function vCurve(tau, T_K, K_J, vMax) {
+    var out = new Array(K_J.length);
+    for (var i = 0; i < K_J.length; i++)
+      out[i] = Math.min(Math.max(calcV(tau, T_K, K_J[i]), 0), vMax);
+    return out;
+  }
+
+  /* Magnetite Ms(T_K) relative to room temperature; 0 above Tc */
+  function msRatio(T_K) {
+    if (T_K >= %%TC%%) return 0;
+    return Math.pow((%%TC%% - T_K) / (%%TC%% - %%T_ROOM%%), %%GAMMA%%);
+  }
+
+  /* Linear interpolation; x_arr must be sorted ascending */
+  function interp(x_new, x_arr, y_arr) {
+    var n = x_new.length, nArr = x_arr.length;
+    var result = new Array(n);
+    for (var i = 0; i < n; i++) {
+      var xn = x_new[i];
+      if (xn <= x_arr[0])        { result[i] = y_arr[0]; continue; }
+      if (xn >= x_arr[nArr - 1]) { result[i] = y_arr[nArr - 1]; continue; }
+      var lo = 0, hi = nArr - 1;
+      while (hi - lo > 1) {
+        var mid = (lo + hi) >> 1;
+        if (x_arr[mid] <= xn) lo = mid; else hi = mid;
+      }
+      var frac = (xn - x_arr[lo]) / (x_arr[hi] - x_arr[lo]);
+      result[i] = y_arr[lo] + frac * (y_arr[hi] - y_arr[lo]);
+    }
+    return result;
+  }
+
+  /* --- Plot styling --- */
+
+  function axis(title, extra) {
+    var a = {
+      showgrid:true, gridcolor:C.grid, gridwidth:1,
+      zeroline:false, linecolor:C.ax, linewidth:1.5, mirror:true,
+      ticks:'inside', ticklen:5,
+      tickfont:{family:FONT, size:11},
+    };
+    if (title) a.title = {text:title, font:{size:13}};
+    return Object.assign(a, extra);
+  }
+
+  function legend(extra) {
+    return Object.assign({
+      bgcolor:'rgba(255,255,255,0.92)',
+      bordercolor:C.border, borderwidth:1,
+      font:{size:11},
+      x:0.98, y:0.98, xanchor:'right', yanchor:'top',
+      borderpad:6,
+    }, extra);
+  }
+
+  function layout(extra) {
+    return Object.assign({
+      width:600, height:390,
+      margin:{l:68, r:24, t:10, b:50},
+      paper_bgcolor:'transparent',
+      plot_bgcolor:'#fff',
+      font:{family:FONT, size:12, color:C.text},
+      legend:legend(),
+      hovermode:'closest',
+    }, extra);
+  }
+
+  /* Text label on a white background */
+  function note(x, y, text, color, size) {
+    return {x:x, y:y, text:text, showarrow:false,
+            font:{size:size || 12, color:color, family:FONT},
+            bgcolor:'rgba(255,255,255,0.85)', borderpad:2};
+  }
+
+  function plot(id, traces, lay) {
+    return Plotly.newPlot(id, traces, lay, {displayModeBar:false, responsive:true});
+  }
+
+  /* --- Slider with Play/Pause and Reset ---
+     opts.slider, opts.play, opts.reset: element ids
+     opts.show(idx):   draw frame idx (the player sets the slider)
+     opts.label:       play button text (default 'Play')
+     opts.step:        +1 plays toward slider.max, -1 toward slider.min
+     opts.interval:    ms between frames (default 200)
+     opts.forwardOnly: the slider cannot be dragged back past the
+                       furthest frame reached; Reset starts over */
+  function player(opts) {
+    var slider = document.getElementById(opts.slider);
+    var btnPlay = document.getElementById(opts.play);
+    var btnReset = document.getElementById(opts.reset);
+    var step = opts.step || 1;
+    var playHTML = '&#9654; ' + (opts.label || 'Play');
+    var timer = null, reached = null;
+
+    function first() { return step > 0 ? Number(slider.min) : Number(slider.max); }
+    function past(idx) { return idx < Number(slider.min) || idx > Number(slider.max); }
+
+    function show(idx) {
+      slider.value = idx;
+      if (reached === null || (idx - reached) * step > 0) reached = idx;
+      opts.show(idx);
+    }
+
+    function stop() {
+      clearInterval(timer);
+      timer = null;
+      btnPlay.innerHTML = playHTML;
+      btnPlay.classList.remove('active');
+    }
+
+    function reset() {
+      stop();
+      reached = null;
+      show(first());
+    }
+
+    slider.addEventListener('input', function() {
+      var idx = parseInt(this.value);
+      if (opts.forwardOnly && reached !== null && (idx - reached) * step < 0) {
+        this.value = reached;
+        return;
+      }
+      show(idx);
+    });
+
+    btnPlay.addEventListener('click', function() {
+      if (timer !== null) { stop(); return; }
+      btnPlay.innerHTML = '&#9646;&#9646; Pause';
+      btnPlay.classList.add('active');
+      var idx = parseInt(slider.value);
+      timer = setInterval(function() {
+        idx += step;
+        if (past(idx)) { stop(); return; }
+        show(idx);
+      }, opts.interval || 200);
+    });
+
+    btnReset.addEventListener('click', reset);
+
+    return {show:show, stop:stop, reset:reset};
+  }
+
+  return {
+    kB:kB, tau0:tau0, FONT:FONT, colors:C,
+    calcV:calcV, vCurve:vCurve, msRatio:msRatio, interp:interp,
+    axis:axis, legend:legend, layout:layout, note:note, plot:plot,
+    player:player,
+  };
+})();
+"""
+for _name, _value in (("K_B", K_B), ("TAU_0", TAU_0), ("TC", TC_MAGNETITE),
+                      ("T_ROOM", T_ROOM), ("GAMMA", GAMMA)):
+    RUNTIME_JS = RUNTIME_JS.replace(f"%%{_name}%%", repr(_value))
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+<link rel="stylesheet" href="{fonts}">
+<link rel="stylesheet" href="{runtime}/widget-runtime.css">
+<script src="{plotly}"></script>
+<script src="{runtime}/widget-runtime.js"></script>
+{style}</head>
+<body>
+{body}
+<script>
+{script}
+</script>
+</body>
+</html>
+"""
+
+
+def write_runtime(out_dir: Path = RUNTIME_DIR):
+    """Write widget-runtime.css and widget-runtime.js, if they changed.
+
+    Returns:
+        List of the two paths
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name, content in (("widget-runtime.css", RUNTIME_CSS), ("widget-runtime.js", RUNTIME_JS)):
+        path = out_dir / name
+        if not path.exists() or path.read_text(encoding="utf-8") != content:
+            path.write_text(content, encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def page(title: str, body: str, script: str, css: str = "", runtime_url: str = "../widgets"):
+    """HTML for a widget page that links the shared runtime.
+
+    Args:
+        title: Page title
+        body: Widget markup
+        script: Init script run after the runtime has loaded
+        css: Styles used only by this widget
+        runtime_url: URL of the directory holding the runtime files,
+            relative to the page
+
+    Returns:
+        The page as a string
+    """
+    style = f"<style>\n{css.strip()}\n</style>\n" if css.strip() else ""
+    return PAGE_TEMPLATE.format(title=title, fonts=FONTS_URL, plotly=PLOTLY_URL,
+                                runtime=runtime_url, style=style,
+                                body=body.strip(), script=script.strip())
+
+
+def write_page(output_path, title: str, body: str, script: str, css: str = ""):
+    """Write a widget page and the runtime it links.
+
+    Returns:
+        Path of the page
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    write_runtime()
+    runtime_url = Path(os.path.relpath(RUNTIME_DIR.resolve(), output_path.resolve().parent)).as_posix()
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(page(title, body, script, css, runtime_url))
+    return output_path
+
+
+def main():
+    for path in write_runtime():
+        print(f"Written to {path} ({path.stat().st_size / 1e3:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()